@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+
+import logging
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Concurrency, wait-queue length and max queue wait (seconds) per model-call pool.
+# Lower priority numbers are served first when both pools are waiting.
+ADMISSION_POOLS = {
+    "chat": {
+        "limit": int(os.getenv("CHAT_MODEL_CONCURRENCY", "8")),
+        "queue_limit": int(os.getenv("CHAT_QUEUE_LIMIT", "32")),
+        "queue_timeout": float(os.getenv("CHAT_QUEUE_TIMEOUT", "10")),
+        "priority": 0
+    },
+    "ingest": {
+        "limit": int(os.getenv("INGEST_MODEL_CONCURRENCY", "2")),
+        "queue_limit": int(os.getenv("INGEST_QUEUE_LIMIT", "8")),
+        "queue_timeout": float(os.getenv("INGEST_QUEUE_TIMEOUT", "120")),
+        "priority": 1
+    },
+}
+# Upper bound on concurrent upstream model calls across all pools
+MODEL_CONCURRENCY_LIMIT = int(os.getenv("MODEL_CONCURRENCY_LIMIT", "8"))
+
+
+class AdmissionRejected(Exception):
+    """Raised when a model-call pool cannot admit more work"""
+
+    def __init__(self, pool: str, reason: str, status_code: int, retry_after: int = 1):
+        super().__init__(f"{pool} capacity exhausted: {reason}")
+        self.pool = pool
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def admission_error(e: AdmissionRejected) -> HTTPException:
+    """HTTP error telling the client to back off and retry"""
+    return HTTPException(
+        status_code=e.status_code,
+        detail=f"Server busy: {str(e)}",
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+
+class AdmissionController:
+    """Bounded concurrency governor for Gemini/embedding calls.
+
+    Each pool has its own concurrency limit and a bounded wait queue; a full
+    queue is rejected immediately (429) and a wait that outlasts the pool's
+    queue_timeout is rejected with 503. All pools also share a global limit,
+    and a pool yields to any higher-priority pool that has waiters, so chat
+    queries overtake bulk ingest.
+    """
+
+    def __init__(self, pools: Dict[str, Dict[str, Any]] = None, total_limit: int = MODEL_CONCURRENCY_LIMIT):
+        pools = ADMISSION_POOLS if pools is None else pools
+        self.total_limit = total_limit
+        self._condition = threading.Condition()
+        self._pools = {
+            name: {
+                **config,
+                "in_use": 0,
+                "waiting": 0,
+                "max_waiting": 0,
+                "admitted": 0,
+                "rejected_queue_full": 0,
+                "rejected_timeout": 0,
+                "wait_seconds_total": 0.0,
+                "wait_seconds_max": 0.0
+            }
+            for name, config in pools.items()
+        }
+
+    def _total_in_use(self) -> int:
+        return sum(pool["in_use"] for pool in self._pools.values())
+
+    def _can_run(self, pool: Dict[str, Any]) -> bool:
+        if pool["in_use"] >= pool["limit"] or self._total_in_use() >= self.total_limit:
+            return False
+        return not any(
+            other["waiting"] for other in self._pools.values() if other["priority"] < pool["priority"]
+        )
+
+    @contextmanager
+    def slot(self, pool_name: str, timeout: Optional[float] = None):
+        """Hold one model-call slot from pool_name for the duration of the block.
+
+        timeout (seconds) shortens the pool's queue wait, e.g. to a request deadline.
+        """
+        pool = self._pools[pool_name]
+        start = time.monotonic()
+        queue_timeout = pool["queue_timeout"] if timeout is None else min(timeout, pool["queue_timeout"])
+        with self._condition:
+            if not self._can_run(pool):
+                if pool["waiting"] >= pool["queue_limit"]:
+                    pool["rejected_queue_full"] += 1
+                    logger.warning(f"⛔ Rejecting {pool_name} request: queue full ({pool['waiting']} waiting)")
+                    raise AdmissionRejected(pool_name, "queue full", 429)
+
+                pool["waiting"] += 1
+                pool["max_waiting"] = max(pool["max_waiting"], pool["waiting"])
+                deadline = start + queue_timeout
+                try:
+                    while not self._can_run(pool):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            pool["rejected_timeout"] += 1
+                            logger.warning(f"⛔ Rejecting {pool_name} request: waited {queue_timeout:.2f}s")
+                            raise AdmissionRejected(pool_name, "queue wait timed out", 503, max(1, int(queue_timeout)))
+                        self._condition.wait(remaining)
+                finally:
+                    pool["waiting"] -= 1
+                    # Lower-priority pools may be blocked on our waiter count
+                    self._condition.notify_all()
+
+            waited = time.monotonic() - start
+            pool["in_use"] += 1
+            pool["admitted"] += 1
+            pool["wait_seconds_total"] += waited
+            pool["wait_seconds_max"] = max(pool["wait_seconds_max"], waited)
+        try:
+            yield
+        finally:
+            with self._condition:
+                pool["in_use"] -= 1
+                self._condition.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Queue depth, utilisation and wait-time metrics per pool"""
+        with self._condition:
+            pools = {}
+            for name, pool in self._pools.items():
+                pools[name] = {
+                    key: pool[key]
+                    for key in ("limit", "queue_limit", "in_use", "waiting", "max_waiting", "admitted",
+                                "rejected_queue_full", "rejected_timeout", "wait_seconds_max")
+                }
+                pools[name]["wait_seconds_avg"] = pool["wait_seconds_total"] / pool["admitted"] if pool["admitted"] else 0.0
+            return {"total_limit": self.total_limit, "total_in_use": self._total_in_use(), "pools": pools}
+
+
+# Process-wide governor shared by every caller of the model clients
+model_admission = AdmissionController()
@@ -0,0 +1,244 @@
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+from llama_index.core import Settings
+
+import profiling
+from context_packer import ContextPacker
+from deadline import Deadline, DeadlineExceeded, MIN_RETRIEVAL_MS, MIN_SYNTHESIS_MS
+from qa_store import exact_source, normalize_question
+from resilience import BackendUnavailable
+from utils.configs import context_prompt, decompose_prompt, prompt
+
+import logging
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Most sub-queries (document_search steps) one question is split into; the rest are dropped
+AGENT_MAX_STEPS = int(os.getenv("AGENT_MAX_STEPS", "4"))
+# Wall-time cap for planning, retrieval and synthesis together (the request deadline still applies)
+AGENT_TIME_BUDGET_MS = int(os.getenv("AGENT_TIME_BUDGET_MS", "20000"))
+# Cap on the prompt tokens sent to the LLM for planning and synthesis together
+AGENT_TOKEN_BUDGET = int(os.getenv("AGENT_TOKEN_BUDGET", "4000"))
+# Set AGENT_LLM_PLANNING=1 to have the LLM split questions that are not visibly multi-part
+# when they are at least AGENT_PLAN_MIN_WORDS long (one extra LLM call before retrieval)
+AGENT_LLM_PLANNING = os.getenv("AGENT_LLM_PLANNING", "0") == "1"
+AGENT_PLAN_MIN_WORDS = int(os.getenv("AGENT_PLAN_MIN_WORDS", "15"))
+# Fewest words a fragment needs to become a sub-query of its own
+AGENT_PART_MIN_WORDS = int(os.getenv("AGENT_PART_MIN_WORDS", "3"))
+
+# Threads that run the sub-query searches of one question side by side
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("AGENT_WORKERS", "16")), thread_name_prefix="agent")
+
+PART_BOUNDARY = re.compile(r"(?<=[?؟])\s+|;\s*|\n+")
+LIST_MARKER = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s*")
+QUESTION_LEAD = re.compile(
+    r"^(?:how|what|why|when|where|which|who|whose|can|could|do|does|did|is|are|was|were|will|would|should"
+    r"|explain|describe|list|compare|tell|show|give)\b",
+    re.IGNORECASE
+)
+
+
+def split_question(text: str, questions_only: bool = True) -> List[str]:
+    """Distinct parts of a question separated by question marks, semicolons or lines.
+
+    With questions_only, a part must end in a question mark, start with a
+    question word or be a list item, so asides like "I forgot it" or a
+    trailing "Thanks" do not become sub-queries.
+    """
+    parts = []
+    seen = set()
+    for part in PART_BOUNDARY.split(text):
+        listed = bool(LIST_MARKER.match(part))
+        part = LIST_MARKER.sub("", part).strip()
+        key = normalize_question(part)
+        # Skip empty fragments, repeats and lead-ins like "Please answer the following:"
+        if len(key) < 3 or key in seen or part.endswith(":"):
+            continue
+        if not listed and len(key.split()) < AGENT_PART_MIN_WORDS:
+            continue
+        if questions_only and not (listed or part.endswith(("?", "؟")) or QUESTION_LEAD.match(part)):
+            continue
+        seen.add(key)
+        parts.append(part)
+    return parts
+
+
+class ParallelAgent:
+    """Answers multi-part questions with one round of concurrent document searches.
+
+    plan() splits a question into at most max_steps sub-queries, by its
+    punctuation or, with AGENT_LLM_PLANNING, for long single-sentence
+    questions with one LLM call.
+    run() looks every sub-query up in the exact-match store and, on a miss,
+    runs the usual retrieval route for it; all sub-queries are searched
+    concurrently and the LLM is called once to answer from the combined
+    context. Steps, wall time and prompt tokens are capped.
+    """
+
+    def __init__(
+        self,
+        rag_system,
+        max_steps: int = AGENT_MAX_STEPS,
+        time_budget_ms: int = AGENT_TIME_BUDGET_MS,
+        token_budget: int = AGENT_TOKEN_BUDGET
+    ):
+        self.rag = rag_system
+        self.max_steps = max_steps
+        self.time_budget_ms = time_budget_ms
+        self.token_budget = token_budget
+
+    def count_tokens(self, text: str) -> int:
+        return self.rag.context_packer.count_tokens(text)
+
+    def plan(self, message: str, deadline: Deadline) -> Dict[str, Any]:
+        """Sub-queries for message; a single one means the regular search path is used"""
+        budget = Deadline(max(1.0, min(deadline.remaining_ms(), self.time_budget_ms)))
+        plan = {"sub_queries": split_question(message), "planner": "rules", "tokens": 0, "deadline": budget}
+
+        if (
+            len(plan["sub_queries"]) <= 1
+            and AGENT_LLM_PLANNING
+            and len(message.split()) >= AGENT_PLAN_MIN_WORDS
+            and budget.allows(2 * MIN_SYNTHESIS_MS)
+        ):
+            plan_prompt = decompose_prompt.format(max_steps=self.max_steps, query=message)
+            plan_tokens = self.count_tokens(prompt) + self.count_tokens(plan_prompt)
+            # Planning may use at most a quarter of the budget; synthesis needs the rest
+            if plan_tokens <= self.token_budget // 4:
+                try:
+                    response = self.rag.backends["llm"].call(
+                        Settings.llm.complete, plan_prompt, deadline=budget, idempotent=False
+                    )
+                    plan["tokens"] = plan_tokens
+                    sub_queries = split_question(response.text, questions_only=False)
+                    if len(sub_queries) > 1:
+                        plan["sub_queries"] = sub_queries
+                        plan["planner"] = "llm"
+                except (DeadlineExceeded, BackendUnavailable) as e:
+                    logger.info(f"⏱️ Agent planning skipped: {e}")
+
+        plan["truncated"] = len(plan["sub_queries"]) > self.max_steps
+        plan["sub_queries"] = plan["sub_queries"][:self.max_steps]
+        return plan
+
+    def _search(self, sub_query: str, filters: Optional[Dict[str, Any]], budget: Deadline, snapshot) -> Dict[str, Any]:
+        """One document_search step: exact match first, then the per-type retrieval route"""
+        step = {"sub_query": sub_query, "answer": None, "nodes": [], "sources": [], "degraded": False}
+        exact_match = self.rag.find_exact_match(sub_query, filters, snapshot.exact_qa_pairs)
+        if exact_match:
+            step["answer"] = exact_match["answer"]
+            step["sources"] = [exact_source(exact_match)]
+            return step
+        if not budget.allows(MIN_RETRIEVAL_MS):
+            step["degraded"] = True
+            return step
+
+        hit = self.rag._retrieve_relevant(sub_query, filters, budget, snapshot.indexes)
+        step["sources"] = hit["sources"]
+        step["degraded"] = hit["degraded"]
+        if hit["sources"] and "original_answer" in hit["sources"][0]:
+            # Q&A pairs are answered verbatim
+            step["answer"] = hit["sources"][0]["original_answer"]
+        else:
+            step["nodes"] = hit["nodes"]
+        return step
+
+    def run(
+        self,
+        message: str,
+        plan: Dict[str, Any],
+        filters: Optional[Dict[str, Any]],
+        deadline: Deadline,
+        snapshot
+    ) -> Dict[str, Any]:
+        """Search all planned sub-queries concurrently and answer with one synthesis"""
+        started = time.perf_counter()
+        budget = plan["deadline"]
+        sub_queries = plan["sub_queries"]
+        logger.info(f"🤖 Agent: {len(sub_queries)} sub-queries ({plan['planner']}): {sub_queries}")
+
+        futures = [
+            _executor.submit(profiling.wrap(self._search), sub_query, filters, budget, snapshot)
+            for sub_query in sub_queries
+        ]
+        done, not_done = wait(futures, timeout=budget.remaining_ms() / 1000)
+        # Steps still queued never start; running ones stop at their next backend call,
+        # which fails at once now that the budget is spent
+        for future in not_done:
+            future.cancel()
+        steps = []
+        for sub_query, future in zip(sub_queries, futures):
+            if future in done and future.exception() is None:
+                steps.append(future.result())
+            else:
+                logger.warning(f"⚠️ Agent step did not finish: {sub_query}")
+                steps.append({"sub_query": sub_query, "answer": None, "nodes": [], "sources": [], "degraded": True})
+
+        found = [step for step in steps if step["answer"] or step["nodes"]]
+        degraded = any(step["degraded"] for step in steps)
+        if not found:
+            result = self.rag._no_answer(degraded=degraded)
+        else:
+            result = self._synthesize(message, found, plan["tokens"], budget)
+            result["degraded"] = result["degraded"] or degraded
+
+        result["agent"] = {
+            "sub_queries": sub_queries,
+            "planner": plan["planner"],
+            "steps": len(steps),
+            "answered_steps": len(found),
+            "truncated": plan["truncated"],
+            "tokens_used": plan["tokens"] + result["prompt_tokens"],
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+        return result
+
+    def _synthesize(self, message: str, steps: List[Dict[str, Any]], plan_tokens: int, budget: Deadline) -> Dict[str, Any]:
+        """One answer for all sub-queries; Q&A answers are passed through verbatim"""
+        sources = [dict(source, sub_query=step["sub_query"]) for step in steps for source in step["sources"]]
+        if all(step["answer"] for step in steps):
+            answer = "\n\n".join(step["answer"] for step in steps)
+            return {"answer": answer, "sources": sources, "prompt_tokens": 0, "degraded": False}
+
+        # Whatever the planning and the fixed prompt parts leave is shared by the chunk-backed steps
+        answered = [f"Sub-question: {step['sub_query']}\nAnswer: {step['answer']}" for step in steps if step["answer"]]
+        searched = [step for step in steps if not step["answer"]]
+        fixed_tokens = (
+            self.count_tokens(prompt)
+            + self.count_tokens(context_prompt.format(context="\n\n".join(answered), query=message))
+            + sum(self.count_tokens(f"Sub-question: {step['sub_query']}\n") for step in searched)
+        )
+        context_budget = self.token_budget - plan_tokens - fixed_tokens
+
+        if context_budget > 0 and budget.allows(MIN_SYNTHESIS_MS):
+            packer = ContextPacker(token_budget=context_budget // len(searched), tokenizer=self.rag.context_packer.tokenizer)
+            sections = answered + [
+                f"Sub-question: {step['sub_query']}\n{packer.pack(step['sub_query'], step['nodes'])['context']}"
+                for step in searched
+            ]
+            prompt_text = context_prompt.format(context="\n\n".join(sections), query=message)
+            prompt_tokens = self.count_tokens(prompt) + self.count_tokens(prompt_text)
+            logger.info(f"Agent synthesizing {len(steps)} sub-answers with {prompt_tokens} prompt tokens")
+            try:
+                response = self.rag.backends["llm"].call(
+                    Settings.llm.complete, prompt_text, deadline=budget, idempotent=False
+                )
+                return {"answer": response.text, "sources": sources, "prompt_tokens": prompt_tokens, "degraded": False}
+            except DeadlineExceeded:
+                logger.info("⏱️ Agent synthesis overran its budget, returning best chunks")
+            except BackendUnavailable as e:
+                logger.warning(f"⚠️ LLM unavailable ({e}), returning best chunks")
+        else:
+            logger.info(f"⏱️ Skipping agent synthesis: {context_budget} tokens, {budget.remaining_ms():.0f}ms left")
+
+        # Same fallback as the single-query path, once per sub-query
+        parts = [
+            step["answer"] or self.rag.context_packer.pack(step["sub_query"], step["nodes"][:1])["context"]
+            for step in steps
+        ]
+        return {"answer": "\n\n".join(parts), "sources": sources, "prompt_tokens": 0, "degraded": True}
@@ -0,0 +1,105 @@
+"""Deadline benchmark with a fake slow LLM.
+
+Replaces Settings.llm with an LLM that sleeps --llm-ms before answering and
+runs the chat synthesis step (token-budgeted packing, then the LLM call
+under the "llm" backend policy) with a range of request deadlines. For each
+deadline it reports the wall time, whether the answer came from the LLM or
+from the best-chunk fallback, and whether the response was flagged
+degraded; a run that overshoots its deadline by more than --slack-ms fails.
+It also checks that QueryRequest rejects non-positive and oversized
+deadline_ms values.
+
+Run from the app directory:
+    python benchmarks/deadline_benchmark.py [--llm-ms 3000] [--deadlines 500 1500 2500 5000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from llama_index.core import Settings  # noqa: E402
+from llama_index.core.llms import CompletionResponse, CompletionResponseGen, CustomLLM, LLMMetadata  # noqa: E402
+from llama_index.core.llms.callbacks import llm_completion_callback  # noqa: E402
+from llama_index.core.schema import NodeWithScore, TextNode  # noqa: E402
+from pydantic import ValidationError  # noqa: E402
+
+from context_packer import ContextPacker  # noqa: E402
+from deadline import MIN_SYNTHESIS_MS, Deadline  # noqa: E402
+from pydantic_models import QueryRequest  # noqa: E402
+from rag_system import AgenticRAGSystem  # noqa: E402
+from resilience import backend_policies  # noqa: E402
+
+
+class SlowLLM(CustomLLM):
+    """Answers every prompt after sleeping delay_ms"""
+
+    delay_ms: float = 3000
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name="slow-llm")
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        time.sleep(self.delay_ms / 1000)
+        return CompletionResponse(text="LLM answer")
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        def gen() -> CompletionResponseGen:
+            time.sleep(self.delay_ms / 1000)
+            yield CompletionResponse(text="LLM answer", delta="LLM answer")
+        return gen()
+
+
+def check_request_bounds():
+    """deadline_ms must be a positive number of milliseconds within the cap"""
+    for value in (0, -1, 10 ** 9):
+        try:
+            QueryRequest(question="q", deadline_ms=value)
+        except ValidationError:
+            continue
+        raise SystemExit(f"QueryRequest accepted deadline_ms={value}")
+    QueryRequest(question="q", deadline_ms=1500)
+    print("QueryRequest rejects deadline_ms of 0, -1 and 1e9")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-ms", type=float, default=3000)
+    parser.add_argument("--deadlines", type=float, nargs="+", default=[500, 1500, 2500, 5000])
+    parser.add_argument("--slack-ms", type=float, default=150, help="allowed overshoot of a deadline")
+    args = parser.parse_args()
+
+    check_request_bounds()
+    Settings.llm = SlowLLM(delay_ms=args.llm_ms)
+    # Only the parts of the system the synthesis step uses; no vector store or Weaviate needed
+    rag = AgenticRAGSystem.__new__(AgenticRAGSystem)
+    rag.context_packer = ContextPacker()
+    rag.backends = backend_policies
+    nodes = [NodeWithScore(node=TextNode(text=f"Chunk {i}: the warranty period is two years."), score=0.9)
+             for i in range(3)]
+    sources = [{"file_name": "policy.pdf", "page_number": i + 1} for i in range(3)]
+    # Load the tokenizer up front so the first run is not charged for it
+    rag.context_packer.pack("warm up", nodes)
+
+    print(f"LLM latency {args.llm_ms:.0f} ms, synthesis skipped below {MIN_SYNTHESIS_MS} ms")
+    print(f"{'deadline ms':>12}{'elapsed ms':>12}{'answer':>10}{'degraded':>10}")
+    failures = 0
+    for deadline_ms in args.deadlines:
+        started = time.perf_counter()
+        result = rag._synthesize("How long is the warranty?", nodes, sources, Deadline(deadline_ms))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        answer = "llm" if result["answer"] == "LLM answer" else "chunk"
+        print(f"{deadline_ms:>12.0f}{elapsed_ms:>12.1f}{answer:>10}{str(result['degraded']):>10}")
+        if elapsed_ms > deadline_ms + args.slack_ms:
+            failures += 1
+    if failures:
+        raise SystemExit(f"{failures} runs overshot their deadline by more than {args.slack_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Hit-rate benchmark for exact-match question keys.
+
+Builds a synthetic English/Arabic FAQ, then asks each question again with the
+kind of variation real users type: changed punctuation, whitespace runs,
+letter case, full-width characters, Arabic diacritics and alef/yeh/teh
+marbuta variants. For the previous key (question.strip().lower()) and for
+normalize_question it reports how many queries hit the constant-time lookup,
+how many more the difflib scan rescues, and the mean lookup time.
+It first checks that questions differing only in meaningful symbols get
+different keys, and that a key stored with two different answers is never
+returned as an exact match, in memory or from the mapped index file.
+
+Run from the app directory:
+    python benchmarks/exact_match_benchmark.py [--pairs 1000] [--queries 500]
+"""
+import argparse
+import difflib
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from llama_index.core import Document  # noqa: E402
+
+from qa_store import (  # noqa: E402
+    CompactQAStore, MappedQAIndex, match_question, normalize_question, store_qa_documents, write_qa_index
+)
+
+ENGLISH_WORDS = (
+    "account password reset invoice delivery order refund warranty policy payment card "
+    "branch hours mobile app login transfer limit fee statement address update contact"
+).split()
+ARABIC_WORDS = (
+    "ما هي ساعات العمل في الفرع كيف يمكنني تغيير كلمة المرور إلى أين أرسل الفاتورة "
+    "متى يصل الطلب هل توجد رسوم على التحويل البطاقة الائتمانية مكتبة الحساب"
+).split()
+ARABIC_MARKS = ["َ", "ُ", "ِ", "ّ", "ْ", "ً"]
+ARABIC_VARIANTS = {"ا": "أإآ", "أ": "اإ", "إ": "اأ", "ي": "ى", "ى": "ي", "ة": "ه", "ه": "ة"}
+FULL_WIDTH = {chr(c): chr(c + 0xFEE0) for c in range(0x21, 0x7F)}
+
+
+def legacy_key(text: str) -> str:
+    """Key used before normalize_question"""
+    return text.strip().lower()
+
+
+def synthetic_questions(count: int, seed: int = 11):
+    rng = random.Random(seed)
+    for i in range(count):
+        if i % 2:
+            yield " ".join(rng.choices(ARABIC_WORDS, k=8)) + f" {i}؟"
+        else:
+            yield " ".join(rng.choices(ENGLISH_WORDS, k=8)).capitalize() + f" {i}?"
+
+
+def perturb(question: str, rng: random.Random) -> str:
+    """A user-typed variant of question"""
+    kind = rng.choice(["same", "punctuation", "whitespace", "case", "full_width", "diacritics", "letters"])
+    if kind == "punctuation":
+        return question.rstrip("?؟") + rng.choice(["", " ?", "!", "..", "?؟"])
+    if kind == "whitespace":
+        return "  " + question.replace(" ", rng.choice(["  ", "\t", "  "]), 2) + " "
+    if kind == "case":
+        return question.upper() if rng.random() < 0.5 else question.title()
+    if kind == "full_width":
+        return "".join(FULL_WIDTH.get(c, c) for c in question)
+    if kind == "diacritics":
+        return "".join(c + (rng.choice(ARABIC_MARKS) if "ء" <= c <= "ي" and rng.random() < 0.4 else "")
+                       for c in question)
+    if kind == "letters":
+        return "".join(rng.choice(ARABIC_VARIANTS[c]) if c in ARABIC_VARIANTS and rng.random() < 0.5 else c
+                       for c in question)
+    return question
+
+
+def check_key_collisions():
+    """Symbol-only differences keep keys apart; colliding keys are no exact-match answer"""
+    distinct = ["What is C++?", "What is C#?", "What is C?", "What is node.js?", "What is tcp/ip?", "What is snake_case?"]
+    keys = [normalize_question(question) for question in distinct]
+    if len(set(keys)) != len(keys):
+        raise SystemExit(f"Distinct questions share keys: {keys}")
+    if normalize_question("What is C++ ?!") != normalize_question("what is c++"):
+        raise SystemExit("Punctuation around a question changed its key")
+
+    qa_pairs = CompactQAStore()
+    store_qa_documents([
+        Document(text="", metadata={"type": "qa_pair", "original_question": question, "original_answer": answer,
+                                    "file_name": file_name})
+        for question, answer, file_name in (
+            ("What is C++?", "A systems language.", "a.csv"),
+            ("What is C#?", "A .NET language.", "a.csv"),
+            ("what is c++", "A C extension.", "b.csv"),
+        )
+    ], qa_pairs)
+    with tempfile.TemporaryDirectory() as work_dir:
+        path = os.path.join(work_dir, "qa.idx")
+        write_qa_index(qa_pairs, path)
+        for store in (qa_pairs, MappedQAIndex(path)):
+            if match_question("What is C++?", store) is not None:
+                raise SystemExit(f"{type(store).__name__} answered a key stored with two different answers")
+            match = match_question("what is c#", store)
+            if match is None or match["answer"] != "A .NET language.":
+                raise SystemExit(f"{type(store).__name__} lost the unambiguous C# pair: {match}")
+    print("Symbol-only variants get distinct keys; ambiguous keys skip the exact match")
+
+
+def run(key_fn, questions, queries):
+    store = CompactQAStore()
+    for i, question in enumerate(questions):
+        store[key_fn(question)] = {"original_question": question, "original_answer": f"answer {i}"}
+    keys = list(store)
+
+    constant_hits = fuzzy_hits = 0
+    start = time.perf_counter()
+    for query, expected in queries:
+        key = key_fn(query)
+        if key in store:
+            constant_hits += store[key]["original_answer"] == expected
+            continue
+        # Same fallback as find_exact_match: best difflib ratio, accepted at 0.95
+        best_key, best_ratio = None, 0.0
+        for stored in keys:
+            ratio = difflib.SequenceMatcher(None, key, stored).ratio()
+            if ratio > best_ratio:
+                best_key, best_ratio = stored, ratio
+        if best_ratio >= 0.95 and store[best_key]["original_answer"] == expected:
+            fuzzy_hits += 1
+    elapsed = time.perf_counter() - start
+    return constant_hits, fuzzy_hits, elapsed / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pairs", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    check_key_collisions()
+    questions = list(synthetic_questions(args.pairs))
+    rng = random.Random(3)
+    queries = []
+    for _ in range(args.queries):
+        i = rng.randrange(len(questions))
+        queries.append((perturb(questions[i], rng), f"answer {i}"))
+
+    print(f"{args.pairs} stored pairs, {args.queries} perturbed queries")
+    print(f"{'key':<20}{'O(1) hits':>12}{'+ difflib':>12}{'missed':>10}{'ms/lookup':>12}")
+    for name, key_fn in (("strip().lower()", legacy_key), ("normalize_question", normalize_question)):
+        constant_hits, fuzzy_hits, ms = run(key_fn, questions, queries)
+        missed = len(queries) - constant_hits - fuzzy_hits
+        print(f"{name:<20}{constant_hits / len(queries):>12.1%}{fuzzy_hits / len(queries):>12.1%}"
+              f"{missed / len(queries):>10.1%}{ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
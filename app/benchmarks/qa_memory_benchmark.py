@@ -0,0 +1,115 @@
+"""Memory benchmark for the exact-match Q&A store.
+
+Builds N synthetic FAQ pairs and reports bytes per pair (tracemalloc) for the
+previous dict-of-dicts layout (with its 300/1000-char truncation) and for
+CompactQAStore without truncation, plus the size of the mapped index file.
+
+Run from the app directory:
+    python benchmarks/qa_memory_benchmark.py [--pairs 200000]
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from qa_store import CompactQAStore, write_qa_index  # noqa: E402
+
+WORDS = (
+    "account password reset invoice delivery order refund warranty policy payment card "
+    "branch hours mobile app login transfer limit fee statement address update contact"
+).split()
+
+
+def synthetic_pairs(count: int, seed: int = 7):
+    """FAQ-like rows: ~12-word questions, ~60-word answers, a handful of files"""
+    rng = random.Random(seed)
+    files = [f"faq_{i}.xlsx" for i in range(5)]
+    for i in range(count):
+        question = " ".join(rng.choices(WORDS, k=12)) + f" {i}?"
+        answer = " ".join(rng.choices(WORDS, k=60)) + "."
+        yield {
+            "original_question": question,
+            "original_answer": answer,
+            "source": f"excel_row_{i + 1}",
+            "file_name": rng.choice(files),
+            "page_number": i + 1,
+            "document_type": "excel",
+            "sheet_name": "Sheet1"
+        }
+
+
+def build_dict_store(pairs):
+    """The layout _store_exact_qa_pairs used before CompactQAStore"""
+    store = {}
+    for entry in pairs:
+        original_q = entry["original_question"]
+        original_a = entry["original_answer"]
+        if len(original_q) > 300:
+            original_q = original_q[:300] + "..."
+        if len(original_a) > 1000:
+            original_a = original_a[:1000] + "..."
+        store[original_q.lower()] = {
+            'original_question': original_q,
+            'original_answer': original_a,
+            'source': entry["source"],
+            'file_name': entry["file_name"],
+            'page_number': entry["page_number"],
+            'document_type': entry["document_type"],
+            'sheet_name': entry["sheet_name"][:20]
+        }
+    return store
+
+
+def build_compact_store(pairs):
+    store = CompactQAStore()
+    for entry in pairs:
+        store[entry["original_question"].lower()] = entry
+    return store
+
+
+def measure(builder, count: int):
+    """Heap bytes retained by the store builder returns"""
+    gc.collect()
+    tracemalloc.start()
+    store = builder(synthetic_pairs(count))
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return store, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", type=int, default=200_000, help="Number of synthetic Q&A pairs")
+    args = parser.parse_args()
+
+    dict_store, dict_bytes = measure(build_dict_store, args.pairs)
+    del dict_store
+    compact_store, compact_bytes = measure(build_compact_store, args.pairs)
+
+    raw_text = sum(
+        len(e["original_question"].encode()) * 2 + len(e["original_answer"].encode())
+        for e in synthetic_pairs(args.pairs)
+    )
+    index_path = os.path.join(tempfile.mkdtemp(), "qa.idx")
+    write_qa_index(compact_store, index_path)
+
+    print(f"pairs: {args.pairs}")
+    print(f"raw key+question+answer text: {raw_text / args.pairs:8.1f} bytes/pair")
+    print(f"dict of dicts:                {dict_bytes / args.pairs:8.1f} bytes/pair")
+    print(f"CompactQAStore:               {compact_bytes / args.pairs:8.1f} bytes/pair "
+          f"({compact_bytes / dict_bytes:.0%} of dict)")
+    print(f"overhead beyond raw text:     dict {(dict_bytes - raw_text) / args.pairs:.1f}, "
+          f"compact {(compact_bytes - raw_text) / args.pairs:.1f} bytes/pair")
+    print(f"mapped index file:            {os.path.getsize(index_path) / args.pairs:8.1f} bytes/pair on disk, "
+          f"shared by all workers")
+
+
+if __name__ == "__main__":
+    main()
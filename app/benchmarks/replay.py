@@ -0,0 +1,197 @@
+"""Replay recorded chat traffic against a running instance.
+
+Reads a JSONL traffic log written with REQUEST_LOG_PATH set and sends each
+recorded question to /chat/ or /ask_question/ at a fixed rate, as fast as
+--concurrency allows, or at the recorded inter-arrival times. Reports
+throughput, p50/p95/p99 latency and how often each answer path (exact,
+fuzzy_exact, semantic_high, no_answer) served the replayed questions.
+
+On a schedule (--rate or --original-timing), latency runs from when a
+request was due, not from when a free worker got round to sending it, so
+time spent queued behind a slow server counts (no coordinated omission);
+send_lag_ms reports that queueing delay on its own.
+
+Run from the app directory:
+    python benchmarks/replay.py traffic.jsonl [--url http://127.0.0.1:8000]
+        [--concurrency 8] [--rate 20 | --original-timing [--speedup 2]] [--limit 1000]
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
+
+from request_log import match_type_of  # noqa: E402
+
+
+def load_log(path: str, limit: int = 0):
+    """Recorded requests that carry a question, oldest first"""
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if entry.get("question"):
+                entries.append(entry)
+    entries.sort(key=lambda entry: entry.get("ts", 0))
+    return entries[:limit] if limit else entries
+
+
+def percentile(values, fraction: float) -> float:
+    """Nearest-rank percentile of values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def send(base_url: str, entry: dict, endpoint: str, timeout: float, scheduled: Optional[float] = None) -> dict:
+    """Send one recorded question; returns status, latency and the path that answered it.
+
+    scheduled is the perf_counter time the request was due; latency is measured
+    from it when given, and from the actual send otherwise.
+    """
+    body = {"question": entry["question"]}
+    for field in ("use_agent", "filters", "deadline_ms"):
+        if entry.get(field) is not None:
+            body[field] = entry[field]
+    request = urllib.request.Request(
+        base_url.rstrip("/") + (endpoint or entry.get("endpoint") or "/chat/"),
+        data=json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            result = json.loads(response.read())
+            status = response.status
+    except urllib.error.HTTPError as e:
+        result, status = None, e.code
+    except (urllib.error.URLError, OSError):
+        result, status = None, 0
+    finished = time.perf_counter()
+    if scheduled is None:
+        scheduled = start
+
+    return {
+        "status": status,
+        "latency_ms": (finished - scheduled) * 1000,
+        "send_lag_ms": max(0.0, start - scheduled) * 1000,
+        "match_type": match_type_of(result) if result is not None else None,
+        "degraded": bool(result and result.get("degraded")),
+        "recorded_match_type": entry.get("match_type")
+    }
+
+
+def replay(entries, base_url: str, concurrency: int, rate: float, original_timing: bool,
+           speedup: float, endpoint: str, timeout: float):
+    """Drive the instance with entries on the requested schedule; returns per-request outcomes"""
+    outcomes = []
+    lock = threading.Lock()
+
+    def run(entry, scheduled):
+        outcome = send(base_url, entry, endpoint, timeout, scheduled)
+        with lock:
+            outcomes.append(outcome)
+            done = len(outcomes)
+        if done % 100 == 0:
+            print(f"  {done}/{len(entries)} requests done", file=sys.stderr)
+
+    first_ts = entries[0].get("ts", 0) if entries else 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for i, entry in enumerate(entries):
+            if original_timing:
+                send_at = (entry.get("ts", first_ts) - first_ts) / speedup
+            elif rate:
+                send_at = i / rate
+            else:
+                # As fast as possible: no schedule to fall behind, so latency starts at the send
+                executor.submit(run, entry, None)
+                continue
+            delay = send_at - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(run, entry, start + send_at)
+    return outcomes, time.perf_counter() - start
+
+
+def summarize(outcomes, duration: float) -> dict:
+    ok = [outcome for outcome in outcomes if outcome["status"] == 200]
+    latencies = [outcome["latency_ms"] for outcome in ok]
+    send_lags = [outcome["send_lag_ms"] for outcome in outcomes]
+    paths = Counter(outcome["match_type"] for outcome in ok)
+    latency_by_path = defaultdict(list)
+    for outcome in ok:
+        latency_by_path[outcome["match_type"]].append(outcome["latency_ms"])
+    path_changes = sum(
+        1 for outcome in ok
+        if outcome["recorded_match_type"] and outcome["recorded_match_type"] != outcome["match_type"]
+    )
+
+    return {
+        "requests": len(outcomes),
+        "ok": len(ok),
+        "errors": dict(Counter(outcome["status"] for outcome in outcomes if outcome["status"] != 200)),
+        "duration_s": round(duration, 2),
+        "throughput_rps": round(len(outcomes) / duration, 2) if duration else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50), 1),
+            "p95": round(percentile(latencies, 0.95), 1),
+            "p99": round(percentile(latencies, 0.99), 1),
+            "max": round(max(latencies), 1) if latencies else 0.0
+        },
+        "send_lag_ms": {
+            "p50": round(percentile(send_lags, 0.50), 1),
+            "p99": round(percentile(send_lags, 0.99), 1),
+            "max": round(max(send_lags), 1) if send_lags else 0.0
+        },
+        "hit_rate": {path: round(count / len(ok), 4) for path, count in paths.most_common()} if ok else {},
+        "p95_ms_by_path": {path: round(percentile(values, 0.95), 1) for path, values in latency_by_path.items()},
+        "degraded_rate": round(sum(outcome["degraded"] for outcome in ok) / len(ok), 4) if ok else 0.0,
+        "answer_path_changed_vs_recording": path_changes
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="JSONL traffic log recorded with REQUEST_LOG_PATH")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=0, help="requests per second (0 = as fast as possible)")
+    parser.add_argument("--original-timing", action="store_true", help="replay at the recorded inter-arrival times")
+    parser.add_argument("--speedup", type=float, default=1.0, help="time compression for --original-timing")
+    parser.add_argument("--endpoint", default=None, help="send everything here instead of the recorded endpoint")
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    entries = load_log(args.log, args.limit)
+    if not entries:
+        sys.exit(f"No replayable requests in {args.log}")
+    mode = "original timing" if args.original_timing else (f"{args.rate} req/s" if args.rate else "max rate")
+    print(f"Replaying {len(entries)} requests against {args.url} ({mode}, concurrency {args.concurrency})",
+          file=sys.stderr)
+
+    outcomes, duration = replay(
+        entries, args.url, args.concurrency, args.rate, args.original_timing,
+        args.speedup, args.endpoint, args.timeout
+    )
+    print(json.dumps(summarize(outcomes, duration), indent=2))
+
+
+if __name__ == "__main__":
+    main()
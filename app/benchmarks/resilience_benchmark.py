@@ -0,0 +1,114 @@
+"""Tail-latency and error-rate benchmark for the backend call policies.
+
+Drives a fault-injecting stand-in for a vector-store or model client (a base
+latency, a fraction of slow calls and a fraction of transient errors) once
+with plain calls and once through a BackendPolicy with retries and hedging.
+Reports p50/p95/p99 latency and the error rate for both, then simulates an
+outage and reports how quickly callers fail once the circuit has opened.
+
+Run from the app directory:
+    python benchmarks/resilience_benchmark.py [--calls 400] [--slow-rate 0.05] [--error-rate 0.02]
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from resilience import BackendPolicy, BackendUnavailable, CircuitBreaker  # noqa: E402
+
+
+class FlakyBackend:
+    """Sleeps base_ms per call, slow_ms on slow_rate of calls, and raises on error_rate of calls"""
+
+    def __init__(self, base_ms: float, slow_ms: float, slow_rate: float, error_rate: float, seed: int = 5):
+        self.base_ms = base_ms
+        self.slow_ms = slow_ms
+        self.slow_rate = slow_rate
+        self.error_rate = error_rate
+        self.down = False
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, query: str) -> str:
+        with self._lock:
+            roll = self._rng.random()
+            jitter = self._rng.uniform(0.8, 1.2)
+        if self.down:
+            time.sleep(self.base_ms / 1000)
+            raise ConnectionError("backend down")
+        if roll < self.error_rate:
+            raise ConnectionError("transient error")
+        slow = roll < self.error_rate + self.slow_rate
+        time.sleep((self.slow_ms if slow else self.base_ms) * jitter / 1000)
+        return f"result for {query}"
+
+
+def percentile(values, fraction: float) -> float:
+    """Nearest-rank percentile of values"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def measure(call, calls: int):
+    latencies, errors = [], 0
+    for i in range(calls):
+        start = time.perf_counter()
+        try:
+            call(f"q{i}")
+        except Exception:
+            errors += 1
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, errors
+
+
+def report(name: str, latencies, errors: int):
+    print(f"{name:<12}{percentile(latencies, 0.50):>10.1f}{percentile(latencies, 0.95):>10.1f}"
+          f"{percentile(latencies, 0.99):>10.1f}{errors / len(latencies):>10.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--base-ms", type=float, default=20)
+    parser.add_argument("--slow-ms", type=float, default=500)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    args = parser.parse_args()
+
+    print(f"{args.calls} calls: {args.base_ms:.0f} ms base, {args.slow_rate:.0%} at {args.slow_ms:.0f} ms, "
+          f"{args.error_rate:.0%} transient errors")
+    print(f"{'':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>10}")
+
+    backend = FlakyBackend(args.base_ms, args.slow_ms, args.slow_rate, args.error_rate)
+    report("plain", *measure(backend, args.calls))
+
+    backend = FlakyBackend(args.base_ms, args.slow_ms, args.slow_rate, args.error_rate)
+    policy = BackendPolicy("bench", timeout=2.0, retries=2, hedge=True,
+                           breaker=CircuitBreaker("bench", failure_threshold=50))
+    report("policy", *measure(lambda query: policy.call(backend, query), args.calls))
+    stats = policy.snapshot()
+    print(f"  retries={stats['retries']} hedges={stats['hedges']} hedge_wins={stats['hedge_wins']} "
+          f"hedge_delay_ms={stats['hedge_delay_ms']}")
+
+    # Outage: the first calls pay for their retries, then the open circuit fails callers immediately
+    backend.down = True
+    policy = BackendPolicy("outage", timeout=2.0, retries=2, breaker=CircuitBreaker("outage", failure_threshold=5))
+    latencies = []
+    for i in range(50):
+        start = time.perf_counter()
+        try:
+            policy.call(backend, f"q{i}")
+        except BackendUnavailable:
+            pass
+        latencies.append((time.perf_counter() - start) * 1000)
+    stats = policy.snapshot()
+    print(f"outage: first call {latencies[0]:.1f} ms, after the circuit opened p50 "
+          f"{percentile(latencies[5:], 0.50):.3f} ms ({stats['circuit_rejections']} of 50 rejected without a call)")
+
+
+if __name__ == "__main__":
+    main()
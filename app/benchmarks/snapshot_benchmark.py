@@ -0,0 +1,104 @@
+"""Size and load-time benchmark for snapshot archives.
+
+Builds synthetic corpora of increasing size (chunk-sized texts with page
+metadata, random embeddings of the Gemini embedding width, one Q&A pair per
+ten chunks), writes each as a snapshot archive and reads it back. For every
+corpus size it reports archive bytes per node, export time, and import time
+split into reading the archive and inserting the pre-embedded nodes into an
+in-memory vector index. Import makes no embedding calls; the reference
+column is what re-embedding the same chunks would cost at --embed-ms per
+batch of 100.
+
+Run from the app directory:
+    python benchmarks/snapshot_benchmark.py [--sizes 1000 5000 20000] [--dim 768] [--embed-ms 300]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+from llama_index.core import Settings, StorageContext, VectorStoreIndex  # noqa: E402
+from llama_index.core.embeddings import MockEmbedding  # noqa: E402
+from llama_index.core.schema import TextNode  # noqa: E402
+from llama_index.core.vector_stores import SimpleVectorStore  # noqa: E402
+
+from qa_store import CompactQAStore, normalize_question  # noqa: E402
+from snapshot_archive import read_manifest, read_nodes, read_qa_pairs, write_archive  # noqa: E402
+
+WORDS = (
+    "warranty policy invoice delivery refund account branch transfer statement payment "
+    "customer service contract period coverage claim document section clause annual"
+).split()
+
+
+def synthetic_corpus(count: int, dim: int, seed: int = 7):
+    rng = random.Random(seed)
+    vectors = np.random.RandomState(seed).rand(count, dim).astype(np.float32)
+    nodes = []
+    qa_pairs = CompactQAStore()
+    for i in range(count):
+        text = " ".join(rng.choices(WORDS, k=120)) + "."
+        nodes.append(TextNode(
+            id_=f"node-{i}",
+            text=text,
+            metadata={"file_name": f"doc{i // 50}.pdf", "page_number": i % 50 + 1, "document_type": "pdf",
+                      "source": f"doc{i // 50}.pdf_page_{i % 50 + 1}", "type": "pdf_page"},
+            embedding=vectors[i].tolist()
+        ))
+        if i % 10 == 0:
+            question = f"What does section {i} say about {rng.choice(WORDS)}?"
+            qa_pairs[normalize_question(question)] = {
+                "original_question": question, "original_answer": text[:200], "source": f"csv_row_{i}",
+                "file_name": "faq.csv", "page_number": 1, "document_type": "csv", "sheet_name": ""
+            }
+    return nodes, qa_pairs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--embed-ms", type=float, default=300, help="assumed latency of one 100-text embedding call")
+    args = parser.parse_args()
+    Settings.embed_model = MockEmbedding(embed_dim=args.dim)
+
+    print(f"{'nodes':>8}{'MB':>9}{'KB/node':>9}{'export s':>10}{'read s':>9}{'insert s':>10}"
+          f"{'import s':>10}{'re-embed s':>12}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for size in args.sizes:
+            nodes, qa_pairs = synthetic_corpus(size, args.dim)
+            path = os.path.join(work_dir, f"{size}.snap")
+
+            started = time.perf_counter()
+            write_archive(path, {"pdf": nodes}, qa_pairs, {"embed_model": "mock"})
+            export_s = time.perf_counter() - started
+            archive_bytes = os.path.getsize(path)
+            del nodes
+
+            started = time.perf_counter()
+            with zipfile.ZipFile(path) as archive:
+                manifest = read_manifest(archive)
+                batches = list(read_nodes(archive, manifest, "pdf"))
+                read_qa_pairs(archive)
+            read_s = time.perf_counter() - started
+
+            started = time.perf_counter()
+            index = VectorStoreIndex([], storage_context=StorageContext.from_defaults(vector_store=SimpleVectorStore()))
+            for batch in batches:
+                index.insert_nodes(batch)
+            insert_s = time.perf_counter() - started
+
+            re_embed_s = size / 100 * args.embed_ms / 1000
+            print(f"{size:>8}{archive_bytes / 1e6:>9.1f}{archive_bytes / size / 1024:>9.2f}{export_s:>10.2f}"
+                  f"{read_s:>9.2f}{insert_s:>10.2f}{read_s + insert_s:>10.2f}{re_embed_s:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
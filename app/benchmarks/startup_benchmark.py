@@ -0,0 +1,111 @@
+"""Startup-time benchmark.
+
+Reports a per-package import-time breakdown for `import main` (from
+`python -X importtime`) and, unless --skip-server is given, the time from
+launching uvicorn until /health and /ready first answer 200.
+
+Run from the app directory:
+    python benchmarks/startup_benchmark.py [--module main] [--top 15] [--skip-server]
+"""
+import argparse
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_breakdown(module: str):
+    """Total import time of module and self time grouped by top-level package (seconds)"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    per_package = defaultdict(int)
+    total_us = 0
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        per_package[name.split(".")[0]] += int(self_us)
+        if name == module:
+            total_us = int(cumulative_us)
+    return wall, total_us / 1e6, {name: us / 1e6 for name, us in per_package.items()}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(url: str, deadline: float):
+    """Seconds until url first answers 200, or None if the deadline passes"""
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - start
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.05)
+    return None
+
+
+def probe_times(module: str, timeout: float):
+    """Launch uvicorn on module's app and time the first successful /health and /ready responses"""
+    port = _free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", f"{module}:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=APP_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=os.environ.copy()
+    )
+    try:
+        deadline = start + timeout
+        health = _wait_for(f"http://127.0.0.1:{port}/health", deadline)
+        health = None if health is None else time.perf_counter() - start
+        ready = _wait_for(f"http://127.0.0.1:{port}/ready", deadline)
+        ready = None if ready is None else time.perf_counter() - start
+        return health, ready
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="Module whose import and app start-up are measured (e.g. faq_server)")
+    parser.add_argument("--top", type=int, default=15, help="Number of packages to list")
+    parser.add_argument("--skip-server", action="store_true", help="Only measure import time")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds to wait for /ready")
+    args = parser.parse_args()
+
+    wall, total, per_package = import_breakdown(args.module)
+    print(f"import {args.module}: {total:.3f}s cumulative ({wall:.3f}s including interpreter start)")
+    print(f"{'package':<32}{'self time (s)':>14}")
+    for name, seconds in sorted(per_package.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{name:<32}{seconds:>14.3f}")
+
+    if not args.skip_server:
+        health, ready = probe_times(args.module, args.timeout)
+        print(f"first /health 200: {'timeout' if health is None else f'{health:.3f}s'}")
+        print(f"first /ready 200:  {'timeout' if ready is None else f'{ready:.3f}s'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Offline bulk ingester for large document libraries.
+
+Walks a directory tree, parses and chunks files in parallel worker processes,
+embeds the chunks into the shared Weaviate collections in batches and
+publishes the exact-match Q&A pairs to the shared Q&A index file. Progress is
+checkpointed per file and per embedding batch to a JSON state file, so a
+rerun after a crash or Ctrl-C skips finished files and batches. Files whose
+size or modification time changed since they were ingested are replaced.
+
+Servers pick the data up when they run with the same QA_INDEX_PATH (shared
+collections are not reset at startup in that mode).
+
+Run from the app directory:
+    python bulk_ingest.py /data/library --qa-index /srv/rag/qa.idx [--state ingest_state.json] [--workers 4]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import logging
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Publish the Q&A index after this many finished files (and always at the end)
+PUBLISH_EVERY_FILES = 50
+
+
+def discover_files(root: Path) -> List[Path]:
+    """Supported files under root, in a stable order"""
+    from doc_processor import SUPPORTED_EXTENSIONS
+    return sorted(path for path in root.rglob("*") if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS)
+
+
+def parse_file(path: str, file_name: str) -> Tuple[str, Dict[str, list], list, Dict[str, int]]:
+    """Worker: parse and chunk one file; returns its nodes per content type and its Q&A documents"""
+    from context_packer import ContextPacker
+    from doc_processor import DocumentProcessor
+    from rag_system import chunk_documents
+
+    doc_processor = DocumentProcessor(num_workers=1)
+    documents = doc_processor.load_file(path, file_name)
+    nodes_by_type, dedup_stats = chunk_documents(doc_processor, documents, ContextPacker().count_tokens)
+    qa_documents = [doc for doc in documents if doc.metadata.get("type") == "qa_pair"]
+    return file_name, nodes_by_type, qa_documents, dedup_stats
+
+
+class IngestState:
+    """Per-file progress persisted to a JSON file after every change"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = {}
+        if path.exists():
+            with open(path) as f:
+                self.files = json.load(f).get("files", {})
+
+    def save(self):
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"files": self.files, "saved_at": time.time()}, f)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def fingerprint(path: Path) -> Dict[str, Any]:
+        stat = path.stat()
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    def is_current(self, file_name: str, path: Path, statuses: Tuple[str, ...]) -> bool:
+        """Whether file_name's entry is for the file as it is now and in one of statuses"""
+        entry = self.files.get(file_name)
+        if not entry or entry.get("status") not in statuses:
+            return False
+        return all(entry.get(key) == value for key, value in self.fingerprint(path).items())
+
+
+class Throughput:
+    """Running totals printed after every file"""
+
+    def __init__(self, total_files: int):
+        self.total_files = total_files
+        self.files = 0
+        self.nodes = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+
+    def add(self, nodes: int, size: int, file_name: str):
+        self.files += 1
+        self.nodes += nodes
+        self.bytes += size
+        elapsed = time.perf_counter() - self.started
+        files_per_s = self.files / elapsed if elapsed else 0.0
+        eta = (self.total_files - self.files) / files_per_s if files_per_s else 0.0
+        print(
+            f"[{self.files}/{self.total_files}] {file_name}: "
+            f"{files_per_s:.2f} files/s, {self.nodes / elapsed:.1f} chunks/s, "
+            f"{self.bytes / elapsed / 1e6:.2f} MB/s, ETA {eta / 60:.1f} min",
+            flush=True
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root", help="directory tree to ingest")
+    parser.add_argument("--qa-index", default=os.getenv("QA_INDEX_PATH"), help="shared Q&A index file (QA_INDEX_PATH)")
+    parser.add_argument("--state", default="ingest_state.json", help="checkpoint file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="parse/chunk processes")
+    parser.add_argument("--publish-every", type=int, default=PUBLISH_EVERY_FILES)
+    args = parser.parse_args()
+
+    if not args.qa_index:
+        sys.exit("--qa-index (or QA_INDEX_PATH) is required: servers read bulk-ingested data in shared-index mode")
+    # Must be set before rag_system is imported so collections are shared, not reset
+    os.environ["QA_INDEX_PATH"] = args.qa_index
+
+    from qa_store import CompactQAStore
+    from rag_system import INGEST_BATCH_SIZE, AgenticRAGSystem
+
+    root = Path(args.root).resolve()
+    state = IngestState(Path(args.state))
+    files = {path.relative_to(root).as_posix(): path for path in discover_files(root)}
+    pending = {name: path for name, path in files.items() if not state.is_current(name, path, ("done",))}
+    print(f"{len(files)} files under {root}, {len(files) - len(pending)} already ingested, {len(pending)} to go")
+    if not pending:
+        return
+
+    rag = AgenticRAGSystem()
+    snapshot = rag.snapshots.current
+    # Files embedded since the last publish, and their Q&A pairs
+    unpublished = []
+    qa_pairs = CompactQAStore()
+    published_pairs = len(snapshot.exact_qa_pairs)
+
+    def publish():
+        nonlocal qa_pairs, published_pairs
+        # Applied to the latest shared version, so servers' uploads meanwhile are kept
+        shared = rag.shared_qa_index.update(remove_files=unpublished, added=qa_pairs)
+        published_pairs = len(shared)
+        for name in unpublished:
+            state.files[name]["status"] = "done"
+        state.save()
+        unpublished.clear()
+        qa_pairs = CompactQAStore()
+
+    throughput = Throughput(len(pending))
+    names = iter(sorted(pending))
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        in_flight = {}
+
+        def refill():
+            # Keep a bounded window of parsed files waiting for embedding
+            while len(in_flight) < 2 * args.workers:
+                name = next(names, None)
+                if name is None:
+                    return
+                in_flight[executor.submit(parse_file, str(pending[name]), name)] = name
+
+        refill()
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = in_flight.pop(future)
+                path = pending[name]
+                try:
+                    _, nodes_by_type, qa_documents, _ = future.result()
+                except Exception as e:
+                    logger.error(f"❌ Could not parse {name}: {e}")
+                    state.files[name] = {**IngestState.fingerprint(path), "status": "failed", "error": str(e)}
+                    state.save()
+                    continue
+
+                entry = state.files.get(name, {})
+                resuming = state.is_current(name, path, ("embedding", "embedded"))
+                if not resuming and entry:
+                    # An older version of this file was ingested; swap it out (no server reads this snapshot)
+                    rag._rehome_duplicates(snapshot, {name})
+                    rag._delete_file_nodes(snapshot.vector_stores, name)
+                batches = [
+                    (content_type, nodes[start:start + INGEST_BATCH_SIZE])
+                    for content_type, nodes in nodes_by_type.items()
+                    for start in range(0, len(nodes), INGEST_BATCH_SIZE)
+                ]
+                batches_done = entry.get("batches_done", 0) if resuming else 0
+                state.files[name] = {
+                    **IngestState.fingerprint(path),
+                    "status": "embedding",
+                    "batches_done": batches_done,
+                    "batches_total": len(batches)
+                }
+
+                # Node IDs are deterministic, so a batch interrupted mid-way is simply rewritten
+                for i in range(batches_done, len(batches)):
+                    content_type, batch = batches[i]
+                    rag.build_indexes({content_type: batch}, snapshot)
+                    state.files[name]["batches_done"] = i + 1
+                    state.save()
+
+                rag._store_exact_qa_pairs(qa_documents, qa_pairs)
+                state.files[name]["status"] = "embedded"
+                state.save()
+                throughput.add(sum(len(nodes) for nodes in nodes_by_type.values()), path.stat().st_size, name)
+
+                unpublished.append(name)
+                if len(unpublished) >= args.publish_every:
+                    publish()
+            refill()
+
+    publish()
+    failed = [name for name, entry in state.files.items() if entry.get("status") == "failed"]
+    print(f"Done: {throughput.files} files, {throughput.nodes} chunks, {published_pairs} Q&A pairs published"
+          + (f", {len(failed)} failed (see {args.state})" if failed else ""))
+
+
+if __name__ == "__main__":
+    main()
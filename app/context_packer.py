@@ -0,0 +1,99 @@
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from llama_index.core import Settings
+from llama_index.core.schema import NodeWithScore
+import logging
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Token budget for the retrieved context sent to the LLM
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?؟])\s+|\n+")
+WORD = re.compile(r"\w+")
+
+
+def _terms(text: str) -> set:
+    """Lower-cased content words of a text"""
+    return {word for word in WORD.findall(text.lower()) if len(word) > 2 or word.isdigit()}
+
+
+def _sentence_key(sentence: str) -> str:
+    """Whitespace/case-insensitive key used to spot text repeated by chunk overlap"""
+    return " ".join(sentence.lower().split())
+
+
+class ContextPacker:
+    """Packs retrieved chunks into a token-budgeted LLM context.
+
+    Chunks are split into sentences, sentences already seen in a higher-ranked
+    chunk (the chunk overlap) are dropped, and the sentences sharing the most
+    terms with the query are kept until the budget is spent. Kept sentences
+    stay in their original order under a short citation header per chunk.
+    """
+
+    def __init__(self, token_budget: int = CONTEXT_TOKEN_BUDGET, tokenizer: Optional[Callable[[str], List]] = None):
+        self.token_budget = token_budget
+        self.tokenizer = tokenizer
+
+    def count_tokens(self, text: str) -> int:
+        """Number of tokens in text according to the configured tokenizer"""
+        tokenizer = self.tokenizer or Settings.tokenizer
+        return len(tokenizer(text))
+
+    def pack(self, query: str, nodes: List[NodeWithScore]) -> Dict[str, Any]:
+        """Select the most relevant, non-duplicate sentences of nodes within the token budget"""
+        query_terms = _terms(query)
+        seen = set()
+        candidates = []  # (relevance, node rank, position, sentence, tokens)
+        duplicate_sentences = 0
+
+        for rank, node in enumerate(nodes):
+            for position, sentence in enumerate(SENTENCE_BOUNDARY.split(node.node.get_content())):
+                sentence = sentence.strip()
+                if not sentence:
+                    continue
+                key = _sentence_key(sentence)
+                if key in seen:
+                    duplicate_sentences += 1
+                    continue
+                seen.add(key)
+                relevance = len(query_terms & _terms(sentence))
+                candidates.append((relevance, rank, position, sentence, self.count_tokens(sentence)))
+
+        # Most relevant first; ties go to better-ranked chunks and earlier sentences
+        candidates.sort(key=lambda c: (-c[0], c[1], c[2]))
+
+        selected = []
+        used_tokens = 0
+        for candidate in candidates:
+            tokens = candidate[4]
+            if used_tokens + tokens > self.token_budget:
+                continue
+            selected.append(candidate)
+            used_tokens += tokens
+
+        # Restore document order within each chunk
+        blocks = []
+        for rank, node in enumerate(nodes):
+            sentences = [c[3] for c in sorted(selected, key=lambda c: c[2]) if c[1] == rank]
+            if not sentences:
+                continue
+            metadata = node.node.metadata
+            header = f"[{metadata.get('file_name', 'Unknown')}, page {metadata.get('page_number', 'Unknown')}]"
+            blocks.append(header + "\n" + " ".join(sentences))
+
+        context = "\n\n".join(blocks)
+        logger.info(
+            f"Packed {len(selected)}/{len(candidates)} sentences from {len(nodes)} chunks "
+            f"({duplicate_sentences} overlapping sentences dropped, {used_tokens}/{self.token_budget} tokens)"
+        )
+        return {
+            "context": context,
+            "context_tokens": self.count_tokens(context),
+            "sentences_kept": len(selected),
+            "sentences_dropped": len(candidates) - len(selected) + duplicate_sentences
+        }
@@ -0,0 +1,37 @@
+import os
+import time
+from typing import Optional
+
+# Default time budget for a /chat/ request when the client does not send one (0 = unlimited)
+CHAT_DEADLINE_MS = int(os.getenv("CHAT_DEADLINE_MS", "30000"))
+# Below this much remaining budget an LLM synthesis is not attempted
+MIN_SYNTHESIS_MS = int(os.getenv("MIN_SYNTHESIS_MS", "2000"))
+# Below this much remaining budget vector retrieval is not attempted
+MIN_RETRIEVAL_MS = int(os.getenv("MIN_RETRIEVAL_MS", "250"))
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a call does not finish within the request's remaining budget"""
+
+
+class Deadline:
+    """Absolute point in time by which a request must be answered"""
+
+    def __init__(self, timeout_ms: Optional[float]):
+        self.timeout_ms = timeout_ms
+        self.expires_at = None if not timeout_ms else time.monotonic() + timeout_ms / 1000
+
+    @classmethod
+    def for_request(cls, deadline_ms: Optional[int] = None) -> "Deadline":
+        """Client-supplied budget, or the server default"""
+        return cls(deadline_ms if deadline_ms is not None else CHAT_DEADLINE_MS)
+
+    def remaining_ms(self) -> float:
+        """Milliseconds left (infinite when unbounded)"""
+        if self.expires_at is None:
+            return float("inf")
+        return max(0.0, (self.expires_at - time.monotonic()) * 1000)
+
+    def allows(self, needed_ms: float) -> bool:
+        """Whether at least needed_ms of budget remain"""
+        return self.remaining_ms() >= needed_ms
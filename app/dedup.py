@@ -0,0 +1,200 @@
+import os
+import re
+import uuid
+import zlib
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from llama_index.core import Document
+from llama_index.core.schema import TextNode
+
+import logging
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Set DEDUP_ENABLED=0 to index every chunk as-is
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1") == "1"
+# Estimated Jaccard similarity above which two chunks count as duplicates
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+# A line on at least this share of a PDF's pages is treated as header/footer boilerplate
+REPEATED_LINE_FRACTION = float(os.getenv("REPEATED_LINE_FRACTION", "0.5"))
+REPEATED_LINE_MIN_PAGES = 3
+
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 8  # 8 bands x 8 rows: pairs above ~0.77 similarity become candidates
+SHINGLE_SIZE = 5
+MERSENNE_PRIME = (1 << 31) - 1
+
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.randint(0, MERSENNE_PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+WORD = re.compile(r"\w+")
+# Page counters ("Page 3", "p. 3 of 12", "3/12") and bare line numbers; other digits are content
+PAGE_MARKER = re.compile(r"\b(?:page|pg|p)\.?\s*\d+(?:\s*(?:of|/)\s*\d+)?\b|\b\d+\s*(?:of|/)\s*\d+\b")
+LINE_NUMBER = re.compile(r"^\d{1,4}(?:\s+|$)")
+
+
+def _line_key(line: str) -> str:
+    """Normalized form of a line; only page counters and line numbers collapse, so prices or dates still differ"""
+    key = " ".join(line.lower().split())
+    return PAGE_MARKER.sub("#", LINE_NUMBER.sub("# ", key)).strip()
+
+
+def strip_repeated_lines(
+    documents: List[Document],
+    count_tokens: Callable[[str], int]
+) -> Tuple[List[Document], Dict[str, int]]:
+    """Remove lines that repeat across the pages of a PDF (headers, footers, legal notices)"""
+    pages_by_file = defaultdict(list)
+    for i, doc in enumerate(documents):
+        if doc.metadata.get("document_type") == "pdf":
+            pages_by_file[doc.metadata.get("file_name")].append(i)
+
+    documents = list(documents)
+    lines_removed = 0
+    tokens_saved = 0
+    for file_name, page_indexes in pages_by_file.items():
+        if len(page_indexes) < REPEATED_LINE_MIN_PAGES:
+            continue
+        line_counts = Counter()
+        for i in page_indexes:
+            line_counts.update({_line_key(line) for line in documents[i].text.splitlines() if len(line.strip()) > 3})
+        min_pages = max(REPEATED_LINE_MIN_PAGES, REPEATED_LINE_FRACTION * len(page_indexes))
+        boilerplate = {key for key, count in line_counts.items() if count >= min_pages}
+        if not boilerplate:
+            continue
+
+        for i in page_indexes:
+            doc = documents[i]
+            kept, removed = [], []
+            for line in doc.text.splitlines():
+                (removed if _line_key(line) in boilerplate else kept).append(line)
+            if removed and "".join(kept).strip():
+                lines_removed += len(removed)
+                tokens_saved += count_tokens("\n".join(removed))
+                documents[i] = Document(text="\n".join(kept), metadata=doc.metadata)
+        logger.info(f"Stripped {len(boilerplate)} repeated lines from {file_name}")
+
+    return documents, {"repeated_lines_removed": lines_removed, "repeated_line_tokens_saved": tokens_saved}
+
+
+def _minhash(text: str) -> np.ndarray:
+    """MinHash signature of a text's word shingles"""
+    words = WORD.findall(text.lower())
+    size = min(SHINGLE_SIZE, max(1, len(words)))
+    shingles = {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles)
+    )
+    return ((_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % MERSENNE_PRIME).min(axis=1)
+
+
+def _citation(node: TextNode) -> str:
+    metadata = node.metadata
+    return f"{metadata.get('file_name', 'unknown')} (page {metadata.get('page_number', '?')})"
+
+
+def _exclude_provenance(node: TextNode, *keys: str):
+    """Keep provenance keys out of the embedded and LLM-visible text"""
+    for excluded in (node.excluded_embed_metadata_keys, node.excluded_llm_metadata_keys):
+        excluded.extend(key for key in keys if key not in excluded)
+
+
+def rehomed_duplicate(node: TextNode, removed_files: Set[str]) -> Optional[TextNode]:
+    """Copy of a merged chunk owned by the first file it stands in for that is not being removed.
+
+    The copy keeps the embedding, so storing it costs no embedding call.
+    Returns None when no other file shares the chunk.
+    """
+    sources = [
+        (file_name, page) for file_name, page in
+        zip(node.metadata.get("duplicate_files", []), node.metadata.get("duplicate_pages", []))
+        if file_name not in removed_files
+    ]
+    if not sources:
+        return None
+    (file_name, page), remaining = sources[0], sources[1:]
+    metadata = {
+        **node.metadata,
+        "file_name": file_name,
+        "duplicate_files": [name for name, _ in remaining],
+        "duplicate_pages": [page for _, page in remaining],
+    }
+    if page:
+        metadata["page_number"] = page
+    else:
+        metadata.pop("page_number", None)
+    own_citation = _citation(TextNode(text="", metadata=metadata))
+    metadata["duplicate_sources"] = [
+        citation for citation in node.metadata.get("duplicate_sources", [])
+        if citation != own_citation and citation.rsplit(" (page ", 1)[0] not in removed_files
+    ]
+    return TextNode(
+        text=node.text,
+        id_=str(uuid.uuid5(uuid.NAMESPACE_URL, f"{node.node_id}:{file_name}")),
+        metadata=metadata,
+        excluded_embed_metadata_keys=list(node.excluded_embed_metadata_keys),
+        excluded_llm_metadata_keys=list(node.excluded_llm_metadata_keys),
+        embedding=node.embedding,
+    )
+
+
+def deduplicate_nodes(
+    nodes: List[TextNode],
+    count_tokens: Callable[[str], int],
+    threshold: float = DEDUP_THRESHOLD
+) -> Tuple[List[TextNode], Dict[str, int]]:
+    """Drop near-duplicate chunks across all files, keeping the first occurrence.
+
+    Candidates come from MinHash LSH banding and are confirmed by estimated
+    Jaccard similarity. Each kept chunk lists the citations of the chunks
+    merged into it under the duplicate_sources metadata key, and the other
+    files (with pages) it stands in for under duplicate_files and
+    duplicate_pages, so deleting its own file can hand it over to one of them.
+    """
+    rows = NUM_PERMUTATIONS // LSH_BANDS
+    buckets = defaultdict(list)  # (band, band hash) -> kept node positions
+    kept: List[TextNode] = []
+    signatures: List[np.ndarray] = []
+    removed = 0
+    tokens_saved = 0
+
+    for node in nodes:
+        signature = _minhash(node.get_content())
+        band_keys = [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(LSH_BANDS)]
+
+        duplicate_of = None
+        for band_key in band_keys:
+            for candidate in buckets.get(band_key, ()):
+                if np.mean(signatures[candidate] == signature) >= threshold:
+                    duplicate_of = candidate
+                    break
+            if duplicate_of is not None:
+                break
+
+        if duplicate_of is None:
+            for band_key in band_keys:
+                buckets[band_key].append(len(kept))
+            kept.append(node)
+            signatures.append(signature)
+            continue
+
+        original = kept[duplicate_of]
+        citation = _citation(node)
+        if citation != _citation(original) and citation not in original.metadata.get("duplicate_sources", []):
+            original.metadata.setdefault("duplicate_sources", []).append(citation)
+            _exclude_provenance(original, "duplicate_sources")
+        file_name = node.metadata.get("file_name")
+        if file_name != original.metadata.get("file_name") and file_name not in original.metadata.get("duplicate_files", []):
+            original.metadata.setdefault("duplicate_files", []).append(file_name)
+            original.metadata.setdefault("duplicate_pages", []).append(node.metadata.get("page_number") or 0)
+            _exclude_provenance(original, "duplicate_files", "duplicate_pages")
+        removed += 1
+        tokens_saved += count_tokens(node.get_content())
+
+    if removed:
+        logger.info(f"Removed {removed} near-duplicate chunks ({tokens_saved} tokens)")
+    return kept, {"duplicate_chunks_removed": removed, "duplicate_tokens_saved": tokens_saved}
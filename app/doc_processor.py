@@ -1,8 +1,9 @@
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-import pandas as pd
-from typing import List
-import PyPDF2
-import openpyxl
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
 from llama_index.core import (
     Document
 )
@@ -14,38 +15,157 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class DocumentProcessor:
-    def __init__(self):
-        self.node_parser = SentenceSplitter(
-            chunk_size=1024,  # Increased from 512 to 1024
-            chunk_overlap=100  # Increased proportionally
+# Number of worker processes used to chunk documents (1 = chunk in-process); one pool
+# of this size is shared by all uploads, so concurrent uploads queue for it
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS", "1"))
+# Below this many documents per worker the pool start-up cost outweighs the gain
+MIN_DOCS_PER_WORKER = 32
+
+# File types the loaders understand
+SUPPORTED_EXTENSIONS = ('.pdf', '.csv', '.xlsx', '.xls')
+
+CHUNK_SIZE = 1024  # Increased from 512 to 1024
+CHUNK_OVERLAP = 100  # Increased proportionally
+
+# Namespace for deterministic document and node IDs
+NODE_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "rag-llama-index/nodes")
+
+
+def document_id(metadata: Dict[str, Any]) -> str:
+    """Stable document ID derived from where the document came from"""
+    key = "|".join(str(metadata.get(field, "")) for field in ("file_name", "sheet_name", "source"))
+    return str(uuid.uuid5(NODE_ID_NAMESPACE, key))
+
+
+def deterministic_id_func(i: int, doc) -> str:
+    """Node ID for the i-th chunk of a document, stable across runs and processes"""
+    return str(uuid.uuid5(NODE_ID_NAMESPACE, f"{doc.doc_id}:{i}"))
+
+
+def build_node_parser(chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> SentenceSplitter:
+    """Create the sentence splitter used for chunking"""
+    return SentenceSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        id_func=deterministic_id_func
+    )
+
+
+def split_document(node_parser: SentenceSplitter, text: str, metadata: Dict[str, Any]) -> List[TextNode]:
+    """Split a single document into nodes, retrying with minimal metadata on failure"""
+    try:
+        # Create a new document with optimized metadata
+        optimized_doc = Document(
+            id_=document_id(metadata),
+            text=text,
+            metadata=metadata
         )
+        
+        doc_nodes = node_parser.get_nodes_from_documents([optimized_doc])
+        logger.debug(f"doc nodes are {doc_nodes}")
+        return doc_nodes
+        
+    except Exception as e:
+        logger.warning(f"Error processing document with metadata {metadata.get('source', 'unknown')}: {str(e)}")
+        # Try with minimal metadata as fallback
+        try:
+            minimal_metadata = {
+                "file_name": str(metadata.get('file_name', 'unknown'))[:50],
+                "page_number": metadata.get('page_number', 1),
+                "source": str(metadata.get('source', 'unknown'))[:30]
+            }
+            minimal_doc = Document(
+                id_=document_id(minimal_metadata),
+                text=text,
+                metadata=minimal_metadata
+            )
+            doc_nodes = node_parser.get_nodes_from_documents([minimal_doc])
+            logger.info(f"Successfully processed document with minimal metadata")
+            return doc_nodes
+        except Exception as e2:
+            logger.error(f"Failed to process document even with minimal metadata: {str(e2)}")
+            return []
+
+
+# Process pool shared by every DocumentProcessor; started on first use
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def chunk_pool() -> ProcessPoolExecutor:
+    """The shared chunking pool, started on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=CHUNK_WORKERS)
+            logger.info(f"Started chunking pool with {CHUNK_WORKERS} processes")
+        return _pool
 
-    def extract_text_from_pdf(self, pdf_path: str, filename: str) -> List[Document]:
-        """Extract text from PDF file"""
+
+def shutdown_chunk_pool():
+    """Stop the shared chunking pool's processes (on app shutdown)"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _chunk_shard(payload: Tuple[List[Tuple[str, Dict[str, Any]]], int, int]) -> List[TextNode]:
+    """Worker entry point: chunk a contiguous shard of documents"""
+    shard, chunk_size, chunk_overlap = payload
+    node_parser = build_node_parser(chunk_size, chunk_overlap)
+    nodes = []
+    for text, metadata in shard:
+        nodes.extend(split_document(node_parser, text, metadata))
+    return nodes
+
+
+class DocumentProcessor:
+    def __init__(self, num_workers: Optional[int] = None):
+        self.chunk_size = CHUNK_SIZE
+        self.chunk_overlap = CHUNK_OVERLAP
+        self.node_parser = build_node_parser(self.chunk_size, self.chunk_overlap)
+        self.num_workers = CHUNK_WORKERS if num_workers is None else num_workers
+
+    def load_file(self, source: Union[str, BinaryIO], filename: str) -> List[Document]:
+        """Parse one file with the loader for its extension; unsupported types yield nothing"""
+        name = filename.lower()
+        if name.endswith('.pdf'):
+            return self.extract_text_from_pdf(source, filename)
+        if name.endswith('.csv'):
+            return self.load_qa_from_csv(source, filename)
+        if name.endswith(('.xlsx', '.xls')):
+            return self.load_qa_from_excel(source, filename)
+        logger.warning(f"Skipping unsupported file type: {filename}")
+        return []
+
+    def extract_text_from_pdf(self, pdf_source: Union[str, BinaryIO], filename: str) -> List[Document]:
+        """Extract text from a PDF file path or an open binary stream"""
+        import PyPDF2  # Parsers are imported on first use to keep start-up fast
+        
         documents = []
         try:
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                total_pages = len(pdf_reader.pages)
-                logger.info(f"Processing PDF {filename} with {total_pages} pages")
-
-                for page_num, page in enumerate(pdf_reader.pages, 1):
-                    text = page.extract_text()
-                    if text.strip():
-                        doc = Document(
-                            text=text,
-                            metadata={
-                                "file_name": filename,
-                                "page_number": page_num,
-                                "total_pages": total_pages,
-                                "source": f"{filename}_page_{page_num}",
-                                "document_type": "pdf"
-                            }
-                        )
-                        documents.append(doc)
-                    else:
-                        logger.warning(f"Empty page {page_num} in {filename}")
+            pdf_reader = PyPDF2.PdfReader(pdf_source)
+            total_pages = len(pdf_reader.pages)
+            logger.info(f"Processing PDF {filename} with {total_pages} pages")
+
+            for page_num, page in enumerate(pdf_reader.pages, 1):
+                text = page.extract_text()
+                if text.strip():
+                    doc = Document(
+                        text=text,
+                        metadata={
+                            "file_name": filename,
+                            "page_number": page_num,
+                            "total_pages": total_pages,
+                            "source": f"{filename}_page_{page_num}",
+                            "document_type": "pdf"
+                        }
+                    )
+                    documents.append(doc)
+                else:
+                    logger.warning(f"Empty page {page_num} in {filename}")
                         
         except Exception as e:
             logger.error(f"Error processing PDF {filename}: {str(e)}")
@@ -53,11 +173,14 @@ class DocumentProcessor:
 
         return documents
 
-    def load_qa_from_csv(self, csv_path: str) -> List[Document]:
-        """Load Q&A pairs from CSV file for both exact and semantic matching"""
+    def load_qa_from_csv(self, csv_source: Union[str, BinaryIO], filename: Optional[str] = None) -> List[Document]:
+        """Load Q&A pairs from a CSV path or binary stream for both exact and semantic matching"""
+        import pandas as pd
+        
         documents = []
+        file_name = filename or Path(csv_source).name
         try:
-            df = pd.read_csv(csv_path)
+            df = pd.read_csv(csv_source)
             logger.info(f"Processing CSV with {len(df)} rows")
             
             # Handle different possible column names
@@ -82,7 +205,7 @@ class DocumentProcessor:
             
             if question_col and answer_col:
                 logger.info(f"Using Q&A columns: {question_col} -> {answer_col}")
-                return self._process_qa_data(df, question_col, answer_col, csv_path, 'csv')
+                return self._process_qa_data(df, question_col, answer_col, file_name, 'csv')
             else:
                 logger.warning(f"Could not find question/answer columns in CSV. Available columns: {df.columns.tolist()}")
                 
@@ -92,11 +215,15 @@ class DocumentProcessor:
 
         return documents
 
-    def load_qa_from_excel(self, excel_path: str) -> List[Document]:
-        """Load Q&A pairs from Excel file for both exact and semantic matching"""
+    def load_qa_from_excel(self, excel_source: Union[str, BinaryIO], filename: Optional[str] = None) -> List[Document]:
+        """Load Q&A pairs from an Excel path or binary stream for both exact and semantic matching"""
+        import openpyxl
+        import pandas as pd
+        
         documents = []
+        file_name = filename or Path(excel_source).name
         try:
-            workbook = openpyxl.load_workbook(excel_path, read_only=True)
+            workbook = openpyxl.load_workbook(excel_source, read_only=True)
             
             for sheet_name in workbook.sheetnames:
                 sheet = workbook[sheet_name]
@@ -123,7 +250,7 @@ class DocumentProcessor:
                             str(first_row[1]).lower().strip() in ['answer', 'a', 'جواب', 'إجابة']):
                             df = df.iloc[1:].reset_index(drop=True)
                     
-                    documents = self._process_qa_data(df, 0, 1, excel_path, 'excel', sheet_name)
+                    documents = self._process_qa_data(df, 0, 1, file_name, 'excel', sheet_name)
                     
                     if documents:
                         logger.info(f"Successfully loaded {len(documents)} Q&A pairs from sheet {sheet_name}")
@@ -135,8 +262,10 @@ class DocumentProcessor:
 
         return documents
 
-    def _process_qa_data(self, df, question_col, answer_col, file_path, doc_type, sheet_name=None):
+    def _process_qa_data(self, df, question_col, answer_col, file_name, doc_type, sheet_name=None):
         """Common method to process Q&A data from CSV/Excel with optimized metadata"""
+        import pandas as pd
+        
         documents = []
         
         for idx, row in df.iterrows():
@@ -156,7 +285,7 @@ class DocumentProcessor:
                 
                 # Optimized metadata with shorter keys and values
                 metadata = {
-                    "file_name": Path(file_path).name,
+                    "file_name": file_name,
                     "page_number": idx + 1,
                     "source": f"{doc_type}_row_{idx + 1}",
                     "type": "qa_pair",
@@ -174,43 +303,55 @@ class DocumentProcessor:
                 
         return documents
 
-    def create_nodes_with_metadata(self, all_documents: List[Document]) -> List[TextNode]:
-        """Create nodes from documents using the node parser with metadata optimization"""
+    def create_nodes_with_metadata(
+        self,
+        all_documents: List[Document],
+        num_workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        chunk_overlap: Optional[int] = None
+    ) -> List[TextNode]:
+        """Create nodes from documents using the node parser with metadata optimization.
+
+        chunk_size/chunk_overlap override the processor defaults for this call.
+        With more than one worker the documents are split into contiguous shards
+        that are chunked in the shared process pool (at most CHUNK_WORKERS
+        processes, however many uploads run at once); shards are reassembled in input order
+        and node IDs are derived from document metadata, so the output is the same
+        as a single-process run.
+        """
+        chunk_size = self.chunk_size if chunk_size is None else chunk_size
+        chunk_overlap = self.chunk_overlap if chunk_overlap is None else chunk_overlap
+        num_workers = self.num_workers if num_workers is None else num_workers
+        num_workers = min(num_workers, CHUNK_WORKERS, len(all_documents) // MIN_DOCS_PER_WORKER)
+        
+        if num_workers <= 1:
+            if (chunk_size, chunk_overlap) == (self.chunk_size, self.chunk_overlap):
+                node_parser = self.node_parser
+            else:
+                node_parser = build_node_parser(chunk_size, chunk_overlap)
+            nodes = []
+            for doc in all_documents:
+                logger.debug(f"text are {doc.text}")
+                nodes.extend(split_document(node_parser, doc.text, doc.metadata))
+            return nodes
+        
+        # Several shards per worker so one slow shard does not stall the pool
+        shard_count = num_workers * 4
+        shard_size = -(-len(all_documents) // shard_count)
+        payloads = [
+            (
+                [(doc.text, doc.metadata) for doc in all_documents[i:i + shard_size]],
+                chunk_size,
+                chunk_overlap
+            )
+            for i in range(0, len(all_documents), shard_size)
+        ]
+        logger.info(f"Chunking {len(all_documents)} documents in {len(payloads)} shards across {num_workers} processes")
+        
         nodes = []
-        for doc in all_documents:
-            try:
-                # Create a copy with optimized metadata
-                logger.info(f"text are {doc.text}")
-                
-                # Create a new document with optimized metadata
-                optimized_doc = Document(
-                    text=doc.text,
-                    metadata=doc.metadata
-                )
-                
-                doc_nodes = self.node_parser.get_nodes_from_documents([optimized_doc])
-                logger.info(f"doc nodes are {doc_nodes}")
-                nodes.extend(doc_nodes)
-                
-            except Exception as e:
-                logger.warning(f"Error processing document with metadata {doc.metadata.get('source', 'unknown')}: {str(e)}")
-                # Try with minimal metadata as fallback
-                try:
-                    minimal_doc = Document(
-                        text=doc.text,
-                        metadata={
-                            "file_name": str(doc.metadata.get('file_name', 'unknown'))[:50],
-                            "page_number": doc.metadata.get('page_number', 1),
-                            "source": str(doc.metadata.get('source', 'unknown'))[:30]
-                        }
-                    )
-                    doc_nodes = self.node_parser.get_nodes_from_documents([minimal_doc])
-                    nodes.extend(doc_nodes)
-                    logger.info(f"Successfully processed document with minimal metadata")
-                except Exception as e2:
-                    logger.error(f"Failed to process document even with minimal metadata: {str(e2)}")
-                    continue
-                
+        # map() yields results in submission order, keeping node order deterministic
+        for shard_nodes in chunk_pool().map(_chunk_shard, payloads):
+            nodes.extend(shard_nodes)
         return nodes
     
     def _optimize_metadata(self, metadata: dict) -> dict:
@@ -0,0 +1,230 @@
+"""FAQ-only serving mode.
+
+Answers /chat/ from a precompiled Q&A index file with the same exact,
+normalized and fuzzy lookup as the full system, without loading llama_index,
+the LLM or a Weaviate client. The file is the shared Q&A index format: the
+one QA_INDEX_PATH workers publish, the qa.idx inside a snapshot archive, or
+the output of the compile command below. A replaced file is picked up
+without a restart.
+
+With FAQ_SEMANTIC_FALLBACK=1, questions the FAQ cannot answer go through
+the full RAG system, which is built in the background after start-up and
+needs QA_INDEX_PATH so it serves the shared collections instead of resetting
+them. Until it is ready, misses get the no-answer response flagged degraded.
+
+Run from the app directory:
+    python faq_server.py compile /srv/rag/faq.qaidx faq.csv products.xlsx
+    FAQ_INDEX_PATH=/srv/rag/faq.qaidx python faq_server.py serve [--port 8000]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from admission import AdmissionRejected, admission_error
+from pydantic_models import ChatResponse, QueryRequest
+from qa_store import QA_INDEX_PATH, CompactQAStore, SharedQAIndex, exact_source, match_question, store_qa_documents, write_qa_index
+
+import logging
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Precompiled Q&A index file to serve (defaults to the full system's shared index)
+FAQ_INDEX_PATH = os.getenv("FAQ_INDEX_PATH", QA_INDEX_PATH)
+# Send questions the FAQ cannot answer to the full semantic search path
+FAQ_SEMANTIC_FALLBACK = os.getenv("FAQ_SEMANTIC_FALLBACK", "0") == "1"
+
+NO_ANSWER = "No information available in our RAG system."
+
+app = FastAPI(title="FAQ Server", version="1.0.0")
+
+
+class FAQResponder:
+    """Answers from a mapped Q&A index file and keeps the conversation history"""
+
+    def __init__(self, path: str):
+        self.qa_index = SharedQAIndex(path)
+        self.conversation_history: List[Dict[str, str]] = []
+        self._lock = threading.Lock()
+
+    def answer(self, question: str, filters: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Exact or fuzzy FAQ answer, or None when the FAQ has none"""
+        qa_pairs = self.qa_index.current()
+        if qa_pairs is None:
+            return None
+        exact_match = match_question(question, qa_pairs, filters)
+        if exact_match is None:
+            return None
+        return {
+            "answer": exact_match["answer"],
+            "sources": [exact_source(exact_match)],
+            "prompt_tokens": 0,
+            "degraded": False
+        }
+
+    def record(self, question: str, answer: str) -> int:
+        """Append one exchange to the history; returns its conversation id"""
+        with self._lock:
+            self.conversation_history.append({"role": "user", "content": question})
+            self.conversation_history.append({"role": "assistant", "content": answer})
+            return len(self.conversation_history) // 2
+
+
+faq = FAQResponder(FAQ_INDEX_PATH) if FAQ_INDEX_PATH else None
+# Full RAG system for misses; only built with FAQ_SEMANTIC_FALLBACK
+fallback_system = None
+fallback_state = {"status": "loading" if FAQ_SEMANTIC_FALLBACK else "disabled", "error": None}
+
+
+def initialize_fallback():
+    """Build the full RAG system; runs in a background thread so FAQ answers start immediately"""
+    global fallback_system
+    try:
+        if not QA_INDEX_PATH:
+            raise RuntimeError("QA_INDEX_PATH must be set: without it the RAG system resets the collections")
+        # Imported here so the llama_index / Weaviate stack never loads without the fallback
+        from rag_system import AgenticRAGSystem
+
+        started = time.perf_counter()
+        fallback_system = AgenticRAGSystem()
+        fallback_state["status"] = "ready"
+        logger.info(f"✅ Semantic fallback ready in {time.perf_counter() - started:.2f}s")
+    except Exception as e:
+        fallback_state["status"] = "failed"
+        fallback_state["error"] = str(e)
+        logger.error(f"❌ Semantic fallback unavailable: {str(e)}")
+
+
+@app.on_event("startup")
+async def startup_event():
+    if faq is None:
+        raise RuntimeError("Set FAQ_INDEX_PATH (or QA_INDEX_PATH) to the Q&A index file to serve")
+    if FAQ_SEMANTIC_FALLBACK:
+        threading.Thread(target=initialize_fallback, name="faq-fallback", daemon=True).start()
+
+
+def respond(query: QueryRequest) -> Dict[str, Any]:
+    filters = query.filters.model_dump(exclude_none=True) if query.filters else None
+    result = faq.answer(query.question, filters)
+    if result is None and fallback_system is not None:
+        from deadline import Deadline
+        result = fallback_system.chat(
+            query.question, use_agent=query.use_agent, filters=filters,
+            deadline=Deadline.for_request(query.deadline_ms)
+        )
+    elif result is None:
+        # Degraded while a configured fallback is loading or broken, not when there is none
+        result = {
+            "answer": NO_ANSWER,
+            "sources": [],
+            "prompt_tokens": 0,
+            "degraded": fallback_state["status"] in ("loading", "failed")
+        }
+    result["conversation_id"] = faq.record(query.question, result["answer"])
+    return result
+
+
+@app.post("/chat/", response_model=ChatResponse)
+async def chat_with_faq(query: QueryRequest):
+    """Answer from the FAQ index, falling back to semantic search when enabled"""
+    if not query.question.strip():
+        raise HTTPException(status_code=400, detail="Question cannot be empty")
+
+    try:
+        result = await run_in_threadpool(respond, query)
+        return ChatResponse(
+            answer=result["answer"],
+            sources=result["sources"],
+            conversation_id=result["conversation_id"],
+            prompt_tokens=result.get("prompt_tokens"),
+            degraded=result.get("degraded", False),
+            agent=result.get("agent")
+        )
+    except AdmissionRejected as e:
+        # The semantic fallback is over capacity: tell the client when to retry, as main.py does
+        raise admission_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
+
+
+@app.get("/conversation_history/")
+async def get_conversation_history():
+    """Get conversation history"""
+    return {"conversation_history": faq.conversation_history.copy()}
+
+
+@app.post("/clear_conversation/")
+async def clear_conversation():
+    """Clear conversation history"""
+    faq.conversation_history = []
+    if fallback_system is not None:
+        fallback_system.clear_conversation_history()
+    return {"message": "Conversation history cleared successfully"}
+
+
+@app.get("/health")
+async def health_check():
+    """Liveness check"""
+    return {"status": "healthy", "mode": "faq", "fallback": fallback_state["status"]}
+
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check; 503 until the Q&A index file is mapped (the fallback may still be loading)"""
+    qa_pairs = faq.qa_index.current()
+    body = {
+        "ready": qa_pairs is not None,
+        "index_path": FAQ_INDEX_PATH,
+        "index_version": qa_pairs.version if qa_pairs is not None else None,
+        "qa_pairs": len(qa_pairs) if qa_pairs is not None else 0,
+        "fallback": fallback_state
+    }
+    return JSONResponse(status_code=200 if body["ready"] else 503, content=body)
+
+
+def compile_faq(output: str, paths: List[str]) -> int:
+    """Parse Q&A spreadsheets into an index file at output; returns the number of pairs"""
+    from doc_processor import DocumentProcessor
+
+    processor = DocumentProcessor()
+    qa_pairs = CompactQAStore()
+    for path in paths:
+        if not path.lower().endswith(('.csv', '.xlsx', '.xls')):
+            logger.warning(f"Skipping {path}: only CSV and Excel files hold Q&A pairs")
+            continue
+        store_qa_documents(processor.load_file(path, Path(path).name), qa_pairs)
+    write_qa_index(qa_pairs, output)
+    logger.info(f"📚 Compiled {len(qa_pairs)} Q&A pairs into {output}")
+    return len(qa_pairs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    compile_parser = commands.add_parser("compile", help="build a Q&A index file from spreadsheets")
+    compile_parser.add_argument("output", help="index file to write")
+    compile_parser.add_argument("files", nargs="+", help="CSV / Excel files with question and answer columns")
+    serve_parser = commands.add_parser("serve", help="serve FAQ_INDEX_PATH")
+    serve_parser.add_argument("--host", default="0.0.0.0")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    if args.command == "compile":
+        if not compile_faq(args.output, args.files):
+            sys.exit("No Q&A pairs found")
+        return
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional
+
+import logging
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class IndexSnapshot:
+    """One generation of searchable state: vector indexes plus the exact-match Q&A pairs.
+
+    A full ingest builds a new snapshot next to the live one and swaps it in
+    when complete; queries pin the snapshot they started with.
+    """
+
+    def __init__(
+        self,
+        version: int,
+        indexes: Dict[str, Any],
+        vector_stores: Dict[str, Any],
+        exact_qa_pairs: Mapping[str, Dict[str, Any]],
+        collections: Optional[List[str]] = None
+    ):
+        self.version = version
+        self.indexes = indexes  # content type -> VectorStoreIndex
+        self.vector_stores = vector_stores  # content type -> vector store
+        self.exact_qa_pairs = exact_qa_pairs
+        # Collections owned by this snapshot alone, dropped when it is freed
+        self.collections = collections or []
+        self.created_at = time.time()
+        self.pins = 0
+        self.retired = False
+
+
+class SnapshotManager:
+    """Holds the live IndexSnapshot and frees retired ones once no query pins them"""
+
+    def __init__(self, snapshot: IndexSnapshot, on_free: Optional[Callable[[IndexSnapshot], None]] = None):
+        self._current = snapshot
+        self._next_version = snapshot.version + 1
+        self._retired: List[IndexSnapshot] = []
+        self._on_free = on_free
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> IndexSnapshot:
+        return self._current
+
+    def next_version(self) -> int:
+        """Reserve a version number for a snapshot about to be built"""
+        with self._lock:
+            version = self._next_version
+            self._next_version += 1
+            return version
+
+    @contextmanager
+    def pinned(self) -> Iterator[IndexSnapshot]:
+        """Use the live snapshot for the duration of the block, even if a newer one is swapped in"""
+        with self._lock:
+            snapshot = self._current
+            snapshot.pins += 1
+        try:
+            yield snapshot
+        finally:
+            with self._lock:
+                snapshot.pins -= 1
+                free = snapshot.retired and snapshot.pins == 0
+                if free:
+                    self._retired.remove(snapshot)
+            if free:
+                self._free(snapshot)
+
+    def swap(self, snapshot: IndexSnapshot):
+        """Atomically make snapshot the live one and retire the previous snapshot"""
+        with self._lock:
+            old = self._current
+            self._current = snapshot
+            old.retired = True
+            free = old.pins == 0
+            if not free:
+                self._retired.append(old)
+        logger.info(f"🔄 Swapped index snapshot v{old.version} -> v{snapshot.version}")
+        if free:
+            self._free(old)
+
+    def _free(self, snapshot: IndexSnapshot):
+        logger.info(f"🧹 Freeing index snapshot v{snapshot.version}")
+        if self._on_free is not None:
+            try:
+                self._on_free(snapshot)
+            except Exception as e:
+                logger.error(f"❌ Error freeing snapshot v{snapshot.version}: {str(e)}")
+        snapshot.indexes = {}
+        snapshot.vector_stores = {}
+        snapshot.exact_qa_pairs = {}
+
+    def stats(self) -> Dict[str, Any]:
+        """Live version and the retired versions still pinned by in-flight queries"""
+        with self._lock:
+            return {
+                "version": self._current.version,
+                "pins": self._current.pins,
+                "retired_pinned": {snapshot.version: snapshot.pins for snapshot in self._retired}
+            }
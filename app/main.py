@@ -1,14 +1,26 @@
-from pydantic_models import ChatResponse, QueryRequest, UploadResponse
-from utils.funs import save_uploaded_file
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from pydantic_models import ChatResponse, DeleteResponse, QueryRequest, ResumableUploadRequest, UploadResponse
+from utils.funs import save_uploaded_file, upload_size, MAX_UPLOAD_BYTES, BUFFER_PARSEABLE_EXTENSIONS
+from fastapi import BackgroundTasks, Depends, FastAPI, Header, Request, Response, UploadFile, File, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, PlainTextResponse
 import os
 from pathlib import Path
+import shutil
+import sys
 import tempfile
-from typing import List
-from rag_system import AgenticRAGSystem
+import threading
+import time
+from typing import List, Optional
 from utils.configs import html
+from admission import AdmissionRejected, admission_error, model_admission
+from deadline import Deadline
+from resilience import backend_policies
+from profiling import PROFILE_HEADER, list_reports, profile_call, profiling_requested, report_path
+from request_log import request_recorder
+from snapshot_archive import SNAPSHOT_DIR, SNAPSHOT_HEADER, export_snapshot, import_snapshot, snapshot_access_allowed
+from tenants import TENANT_BASE_BYTES, TENANT_DATA_DIR, TENANT_HEADER, TenantRegistry, validate_tenant_id
+from uploads import RESUMABLE_CHUNK_BYTES, RESUMABLE_CHUNK_MAX_BYTES, ResumableUploads
 import uvicorn
 
 # Initialize FastAPI app
@@ -29,28 +41,159 @@ app.add_middleware(
 
 # Global variable to store RAG system instance
 rag_system = None
+# Lazily loaded per-tenant systems (None unless TENANT_DATA_DIR is set)
+tenant_registry = None
+# Sessions of initiate / PUT chunk / finalize uploads
+resumable_uploads = ResumableUploads()
+# Background initialization state reported by /health and /ready:
+# not_started -> initializing (-> retrying -> initializing ...) -> warming -> ready, or failed
+startup_state = {
+    "status": "not_started", "error": None, "started_at": None, "ready_at": None, "warmup": None, "attempts": 0
+}
+# Attempts at building the RAG system before the worker reports itself unhealthy, and the
+# capped exponential backoff (seconds) between them, for transient Weaviate / Gemini errors
+INIT_ATTEMPTS = int(os.getenv("INIT_ATTEMPTS", "5"))
+INIT_BACKOFF_BASE = float(os.getenv("INIT_BACKOFF_BASE", "2"))
+INIT_BACKOFF_MAX = float(os.getenv("INIT_BACKOFF_MAX", "60"))
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize the RAG system on startup"""
-    global rag_system
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """Reject oversized uploads from the Content-Length header before the body is spooled"""
+    if (request.method == "POST" and request.url.path.startswith("/upload_documents")) or (
+        request.method == "PUT" and request.url.path.startswith("/documents/")
+    ):
+        content_length = request.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"Upload exceeds the {MAX_UPLOAD_BYTES} byte limit"}
+            )
+    return await call_next(request)
+
+def initialize_rag_system():
+    """Build the RAG system; runs in a background thread so probes answer immediately.
+
+    Failed attempts are retried with capped backoff; after INIT_ATTEMPTS the
+    status is "failed" and /health turns 503 so the worker gets restarted.
+    """
+    for attempt in range(1, INIT_ATTEMPTS + 1):
+        startup_state["status"] = "initializing"
+        startup_state["attempts"] = attempt
+        if build_rag_system():
+            return
+        if attempt < INIT_ATTEMPTS:
+            backoff = min(INIT_BACKOFF_MAX, INIT_BACKOFF_BASE * 2 ** (attempt - 1))
+            startup_state["status"] = "retrying"
+            print(f"🔁 Retrying RAG system initialization in {backoff:.0f}s (attempt {attempt}/{INIT_ATTEMPTS} failed)")
+            time.sleep(backoff)
+    startup_state["status"] = "failed"
+    print(f"❌ Giving up on RAG system initialization after {INIT_ATTEMPTS} attempts")
+
+def build_rag_system() -> bool:
+    """One initialization attempt; returns whether it succeeded"""
+    global rag_system, tenant_registry
     try:
-        # Check if required environment variables are set
-        required_vars = ["GOOGLE_API_KEY", "WEAVIATE_URL", "WEAVIATE_API_KEY"]
-        missing_vars = [var for var in required_vars if not os.getenv(var)]
-        
-        if missing_vars:
-            raise ValueError(f"Missing required environment variables: {missing_vars}")
+        # Imported here so the heavy llama_index / Weaviate stack loads off the startup path
+        from rag_system import AgenticRAGSystem
+        from warmup import WARMUP_ENABLED, warm_up
         
         rag_system = AgenticRAGSystem()
-        print("✅ Agentic RAG system initialized successfully")
+        if TENANT_DATA_DIR:
+            os.makedirs(TENANT_DATA_DIR, exist_ok=True)
+            tenant_registry = TenantRegistry(
+                load=lambda tenant_id: AgenticRAGSystem(tenant_id=tenant_id, weaviate_client=rag_system.weaviate_client),
+                size_of=lambda system: system.exact_qa_pairs.nbytes() + TENANT_BASE_BYTES
+            )
+        if WARMUP_ENABLED:
+            # Requests sent straight to this worker are served, but /ready keeps the
+            # load balancer away until connections and caches are warm
+            startup_state["status"] = "warming"
+            startup_state["warmup"] = warm_up(rag_system)
+            if not startup_state["warmup"]["completed"]:
+                # Never route traffic to a worker whose vector store is not up; retry the build
+                raise RuntimeError("vector store not ready, warm-up skipped")
+        startup_state["status"] = "ready"
+        startup_state["ready_at"] = time.time()
+        startup_state["error"] = None
+        print(f"✅ Agentic RAG system initialized successfully in {startup_state['ready_at'] - startup_state['started_at']:.2f}s")
+        return True
         
     except Exception as e:
+        rag_system = None
+        startup_state["error"] = str(e)
         print(f"❌ Failed to initialize RAG system: {str(e)}")
-        raise
+        return False
 
+@app.on_event("startup")
+async def startup_event():
+    """Start initializing the RAG system in the background"""
+    # Check if required environment variables are set
+    required_vars = ["GOOGLE_API_KEY", "WEAVIATE_URL", "WEAVIATE_API_KEY"]
+    missing_vars = [var for var in required_vars if not os.getenv(var)]
+    
+    if missing_vars:
+        print(f"❌ Failed to initialize RAG system: Missing required environment variables: {missing_vars}")
+        raise ValueError(f"Missing required environment variables: {missing_vars}")
+    
+    startup_state["status"] = "initializing"
+    startup_state["started_at"] = time.time()
+    threading.Thread(target=initialize_rag_system, name="rag-init", daemon=True).start()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the document chunking processes"""
+    # Only loaded once the RAG system is; nothing to stop otherwise
+    doc_processor = sys.modules.get("doc_processor")
+    if doc_processor is not None:
+        doc_processor.shutdown_chunk_pool()
 
+def require_rag_system():
+    """Return the RAG system, or fail the request while it is unavailable"""
+    if rag_system:
+        return rag_system
+    if startup_state["status"] in ("initializing", "retrying"):
+        raise HTTPException(status_code=503, detail="RAG system is starting up, retry shortly")
+    raise HTTPException(status_code=500, detail="RAG system not initialized")
+
+async def tenant_rag(tenant_id: Optional[str] = Header(None, alias=TENANT_HEADER)):
+    """The RAG system of the request's tenant, kept loaded until the request is done"""
+    system = require_rag_system()
+    if not tenant_id:
+        yield system
+        return
+    if tenant_registry is None:
+        raise HTTPException(status_code=400, detail="Multi-tenancy is not enabled on this server")
+    try:
+        system = await run_in_threadpool(tenant_registry.acquire, tenant_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        yield system
+    finally:
+        tenant_registry.release(tenant_id)
+
+async def run_profiled(kind: str, profile_token: Optional[str], response: Response, fn, *args, memory: bool = False, **kwargs):
+    """Run fn off the event loop, under the profiler when the request carries the profiling token"""
+    if not profiling_requested(profile_token):
+        return await run_in_threadpool(fn, *args, **kwargs)
+    result, report = await run_in_threadpool(profile_call, kind, fn, *args, memory=memory, **kwargs)
+    response.headers["X-Profile-Id"] = report["id"]
+    return result
+
+def record_question(endpoint: str, query: QueryRequest, started: float, status: int, result: Optional[dict] = None):
+    """Append a question request to the traffic log when recording is on"""
+    if request_recorder is None:
+        return
+    request_recorder.record(
+        endpoint,
+        query.question,
+        (time.perf_counter() - started) * 1000,
+        status,
+        use_agent=query.use_agent,
+        filters=query.filters.model_dump(exclude_none=True) if query.filters else None,
+        deadline_ms=query.deadline_ms,
+        result=result
+    )
 
 @app.get("/", response_class=HTMLResponse)
 async def get_chat_interface():
@@ -59,17 +202,21 @@ async def get_chat_interface():
     return HTMLResponse(content=html_content)
 
 @app.post("/upload_documents/", response_model=UploadResponse)
-async def upload_documents(files: List[UploadFile] = File(...)):
+async def upload_documents(
+    response: Response,
+    files: List[UploadFile] = File(...),
+    rag=Depends(tenant_rag),
+    profile_token: Optional[str] = Header(None, alias=PROFILE_HEADER)
+):
     """Upload and process PDF or CSV documents"""
-    if not rag_system:
-        raise HTTPException(status_code=500, detail="RAG system not initialized")
-    
     if not files:
         raise HTTPException(status_code=400, detail="No files uploaded")
 
-    temp_dir = Path(tempfile.gettempdir())
-    file_paths = {}
+    # Per-request spool directory so concurrent uploads never share file names
+    request_dir = Path(tempfile.mkdtemp(prefix="rag_upload_"))
+    file_sources = {}
     processed_files = []
+    total_bytes = 0
     
     try:
         for uploaded_file in files:
@@ -83,118 +230,417 @@ async def upload_documents(files: List[UploadFile] = File(...)):
                     detail=f"Unsupported file type: {file_extension}. Allowed types: {allowed_extensions}"
                 )
             
-            file_location = save_uploaded_file(uploaded_file, temp_dir)
-            file_paths[uploaded_file.filename] = str(file_location)
+            total_bytes += upload_size(uploaded_file)
+            if total_bytes > MAX_UPLOAD_BYTES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Upload exceeds the {MAX_UPLOAD_BYTES} byte limit"
+                )
+            
+            if file_extension in BUFFER_PARSEABLE_EXTENSIONS:
+                # Parse straight from the spooled upload, no extra copy
+                await uploaded_file.seek(0)
+                file_sources[uploaded_file.filename] = uploaded_file.file
+            else:
+                file_location = await save_uploaded_file(uploaded_file, request_dir)
+                file_sources[uploaded_file.filename] = str(file_location)
             processed_files.append(uploaded_file.filename)
         
-        # Process documents
-        doc_count, node_count = rag_system.process_documents(file_paths)
-        
-        # Clean up temporary files
-        for file_path in file_paths.values():
-            try:
-                os.unlink(file_path)
-            except:
-                pass
+        # Process documents off the event loop
+        doc_count, node_count, dedup_stats = await run_profiled(
+            "ingest", profile_token, response, rag.process_documents, file_sources, memory=True
+        )
         
         return UploadResponse(
             message=f"Successfully processed {doc_count} documents into {node_count} chunks!",
             document_count=doc_count,
             node_count=node_count,
-            files_processed=processed_files
+            files_processed=processed_files,
+            dedup=dedup_stats
         )
         
+    except HTTPException:
+        raise
+    except AdmissionRejected as e:
+        raise admission_error(e)
     except Exception as e:
-        # Clean up temporary files in case of error
-        for file_path in file_paths.values():
-            try:
-                os.unlink(file_path)
-            except:
-                pass
-        
         raise HTTPException(status_code=500, detail=f"Error processing documents: {str(e)}")
+    finally:
+        # Clean up spooled files
+        shutil.rmtree(request_dir, ignore_errors=True)
+
+@app.put("/documents/{file_name:path}", response_model=UploadResponse)
+async def replace_document(file_name: str, file: UploadFile = File(...), rag=Depends(tenant_rag)):
+    """Replace one document's chunks and Q&A pairs, leaving every other file indexed as-is.
+
+    file_name may contain slashes (bulk-ingested files are keyed by their path under the ingest root).
+    """
+    allowed_extensions = ['.pdf', '.csv', '.xlsx', '.xls']
+    file_extension = Path(file_name).suffix.lower()
+    if file_extension not in allowed_extensions:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type: {file_extension}. Allowed types: {allowed_extensions}"
+        )
+    if upload_size(file) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the {MAX_UPLOAD_BYTES} byte limit")
+    
+    request_dir = Path(tempfile.mkdtemp(prefix="rag_upload_"))
+    try:
+        if file_extension in BUFFER_PARSEABLE_EXTENSIONS:
+            await file.seek(0)
+            source = file.file
+        else:
+            source = str(await save_uploaded_file(file, request_dir))
+        
+        # Stored under the path's name so later deletes and replaces find it
+        doc_count, node_count, dedup_stats = await run_in_threadpool(
+            rag.process_documents, {file_name: source}, replace=True
+        )
+        
+        return UploadResponse(
+            message=f"Replaced {file_name} with {doc_count} documents in {node_count} chunks",
+            document_count=doc_count,
+            node_count=node_count,
+            files_processed=[file_name],
+            dedup=dedup_stats
+        )
+        
+    except HTTPException:
+        raise
+    except AdmissionRejected as e:
+        raise admission_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error replacing document: {str(e)}")
+    finally:
+        shutil.rmtree(request_dir, ignore_errors=True)
+
+@app.post("/uploads/", status_code=201)
+async def initiate_resumable_upload(
+    upload: ResumableUploadRequest,
+    tenant_id: Optional[str] = Header(None, alias=TENANT_HEADER)
+):
+    """Start a resumable upload; send the file with PUT /uploads/{id}?offset=N, then finalize"""
+    require_rag_system()
+    
+    allowed_extensions = ['.pdf', '.csv', '.xlsx', '.xls']
+    file_extension = Path(upload.file_name).suffix.lower()
+    if file_extension not in allowed_extensions:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type: {file_extension}. Allowed types: {allowed_extensions}"
+        )
+    if tenant_id:
+        if tenant_registry is None:
+            raise HTTPException(status_code=400, detail="Multi-tenancy is not enabled on this server")
+        try:
+            validate_tenant_id(tenant_id)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    session = await run_in_threadpool(
+        resumable_uploads.create, upload.file_name, upload.size, upload.sha256, tenant_id
+    )
+    return {**session.to_dict(), "chunk_size": RESUMABLE_CHUNK_BYTES, "max_chunk_size": RESUMABLE_CHUNK_MAX_BYTES}
+
+@app.put("/uploads/{upload_id}")
+async def upload_chunk(
+    upload_id: str,
+    offset: int,
+    request: Request,
+    chunk_sha256: Optional[str] = Header(None, alias="X-Chunk-Sha256"),
+    tenant_id: Optional[str] = Header(None, alias=TENANT_HEADER)
+):
+    """Write the raw request body at offset, which must be the session's "received" count"""
+    session = resumable_uploads.get(upload_id, tenant_id)
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > RESUMABLE_CHUNK_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Chunks are limited to {RESUMABLE_CHUNK_MAX_BYTES} bytes")
+    
+    # Streamed straight into the session file; the body is never spooled
+    session = await resumable_uploads.write_chunk(session, offset, request.stream(), chunk_sha256)
+    return session.to_dict()
+
+@app.get("/uploads/{upload_id}")
+async def get_resumable_upload(upload_id: str, tenant_id: Optional[str] = Header(None, alias=TENANT_HEADER)):
+    """Progress of a resumable upload: where to resume, or how ingestion went"""
+    return resumable_uploads.get(upload_id, tenant_id).to_dict()
+
+def ingest_resumable_upload(session, replace: bool):
+    """Index a verified resumable upload in place (runs after the finalize response)"""
+    try:
+        with resumable_uploads.heartbeat(session):
+            if session.tenant_id:
+                with tenant_registry.use(session.tenant_id) as rag:
+                    doc_count, node_count, dedup_stats = rag.process_documents(
+                        {session.file_name: session.data_path}, replace=replace
+                    )
+            else:
+                doc_count, node_count, dedup_stats = rag_system.process_documents(
+                    {session.file_name: session.data_path}, replace=replace
+                )
+        resumable_uploads.finish(session, result={
+            "document_count": doc_count,
+            "node_count": node_count,
+            "dedup": dedup_stats
+        })
+        print(f"✅ Resumable upload {session.upload_id} ingested: {doc_count} documents, {node_count} chunks")
+    except Exception as e:
+        resumable_uploads.finish(session, error=str(e))
+        print(f"❌ Resumable upload {session.upload_id} failed to ingest: {str(e)}")
+
+@app.post("/uploads/{upload_id}/finalize", status_code=202)
+async def finalize_resumable_upload(
+    upload_id: str,
+    background_tasks: BackgroundTasks,
+    sha256: Optional[str] = None,
+    replace: bool = False,
+    tenant_id: Optional[str] = Header(None, alias=TENANT_HEADER)
+):
+    """Verify the assembled file's checksum and hand it to ingestion; poll GET /uploads/{id} for the outcome.
+
+    With replace, only this file's previous chunks and Q&A pairs are swapped
+    out, as with PUT /documents/{file_name}.
+    """
+    require_rag_system()
+    session = resumable_uploads.get(upload_id, tenant_id)
+    session = await run_in_threadpool(resumable_uploads.verify, session, sha256)
+    background_tasks.add_task(ingest_resumable_upload, session, replace)
+    return session.to_dict()
+
+@app.delete("/uploads/{upload_id}")
+async def abort_resumable_upload(upload_id: str, tenant_id: Optional[str] = Header(None, alias=TENANT_HEADER)):
+    """Abandon a resumable upload and delete what was received"""
+    session = resumable_uploads.get(upload_id, tenant_id)
+    if session.status == "ingesting":
+        raise HTTPException(status_code=409, detail="Upload is being ingested")
+    resumable_uploads.abort(session)
+    return {"message": f"Upload {upload_id} aborted"}
+
+@app.delete("/documents/{file_name:path}", response_model=DeleteResponse)
+async def delete_document(file_name: str, rag=Depends(tenant_rag)):
+    """Remove one document's chunks and Q&A pairs from the indexes (file_name may contain slashes)"""
+    try:
+        result = await run_in_threadpool(rag.delete_document, file_name)
+        return DeleteResponse(
+            message=f"Deleted {file_name}",
+            file_name=result["file_name"],
+            qa_pairs_removed=result["qa_pairs_removed"]
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting document: {str(e)}")
 
 @app.post("/chat/", response_model=ChatResponse)
-async def chat_with_documents(query: QueryRequest):
+async def chat_with_documents(
+    query: QueryRequest,
+    response: Response,
+    rag=Depends(tenant_rag),
+    profile_token: Optional[str] = Header(None, alias=PROFILE_HEADER)
+):
     """Chat with documents using conversation memory"""
-    if not rag_system:
-        raise HTTPException(status_code=500, detail="RAG system not initialized")
+    started = time.perf_counter()
+    deadline = Deadline.for_request(query.deadline_ms)
     
     if not query.question.strip():
         raise HTTPException(status_code=400, detail="Question cannot be empty")
     
     try:
-        result = rag_system.chat(query.question, use_agent=query.use_agent)
+        filters = query.filters.model_dump(exclude_none=True) if query.filters else None
+        result = await run_profiled(
+            "chat", profile_token, response,
+            rag.chat, query.question, use_agent=query.use_agent, filters=filters, deadline=deadline
+        )
+        record_question("/chat/", query, started, 200, result)
         return ChatResponse(
             answer=result["answer"],
             sources=result["sources"],
-            conversation_id=result["conversation_id"]
+            conversation_id=result["conversation_id"],
+            prompt_tokens=result.get("prompt_tokens"),
+            degraded=result.get("degraded", False),
+            agent=result.get("agent")
         )
+    except AdmissionRejected as e:
+        record_question("/chat/", query, started, e.status_code)
+        raise admission_error(e)
     except Exception as e:
+        record_question("/chat/", query, started, 500)
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
 @app.post("/ask_question/")
-async def ask_question(query: QueryRequest):
+async def ask_question(
+    query: QueryRequest,
+    response: Response,
+    rag=Depends(tenant_rag),
+    profile_token: Optional[str] = Header(None, alias=PROFILE_HEADER)
+):
     """Direct question endpoint (backward compatibility)"""
-    if not rag_system:
-        raise HTTPException(status_code=500, detail="RAG system not initialized")
+    started = time.perf_counter()
+    deadline = Deadline.for_request(query.deadline_ms)
     
     if not query.question.strip():
         raise HTTPException(status_code=400, detail="Question cannot be empty")
     
     try:
-        result = rag_system.query_with_citations(query.question)
+        filters = query.filters.model_dump(exclude_none=True) if query.filters else None
+        result = await run_profiled(
+            "chat", profile_token, response,
+            rag.query_with_citations, query.question, filters=filters, deadline=deadline
+        )
+        record_question("/ask_question/", query, started, 200, result)
         return {
             "question": query.question,
             "answer": result["answer"],
-            "sources": result["sources"]
+            "sources": result["sources"],
+            "degraded": result.get("degraded", False)
         }
+    except AdmissionRejected as e:
+        record_question("/ask_question/", query, started, e.status_code)
+        raise admission_error(e)
     except Exception as e:
+        record_question("/ask_question/", query, started, 500)
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
 @app.get("/conversation_history/")
-async def get_conversation_history():
+async def get_conversation_history(rag=Depends(tenant_rag)):
     """Get conversation history"""
-    if not rag_system:
-        raise HTTPException(status_code=500, detail="RAG system not initialized")
-    
     try:
-        history = rag_system.get_conversation_history()
+        history = rag.get_conversation_history()
         return {"conversation_history": history}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving conversation history: {str(e)}")
 
 @app.post("/clear_conversation/")
-async def clear_conversation():
+async def clear_conversation(rag=Depends(tenant_rag)):
     """Clear conversation history and memory"""
-    if not rag_system:
-        raise HTTPException(status_code=500, detail="RAG system not initialized")
-    
     try:
-        rag_system.clear_conversation_history()
+        rag.clear_conversation_history()
         return {"message": "Conversation history cleared successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error clearing conversation: {str(e)}")
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {
-        "status": "healthy",
+    """Liveness check; answers as soon as the process is serving, 503 once initialization gave up"""
+    failed = startup_state["status"] == "failed"
+    body = {
+        "status": "unhealthy" if failed else "healthy",
+        "startup_status": startup_state["status"],
+        "startup_attempts": startup_state["attempts"],
+        "error": startup_state["error"],
         "rag_system_initialized": rag_system is not None,
-        "has_documents": rag_system.index is not None if rag_system else False
+        "has_documents": bool(rag_system.indexes) if rag_system else False
+    }
+    return JSONResponse(status_code=503 if failed else 200, content=body)
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check; 503 until the RAG system is built and warmed up"""
+    body = {
+        "ready": startup_state["status"] == "ready",
+        "startup_status": startup_state["status"],
+        "error": startup_state["error"],
+        "warmup": startup_state["warmup"]
+    }
+    return JSONResponse(status_code=200 if body["ready"] else 503, content=body)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Runtime metrics for the model-call governor and backend call policies"""
+    return {
+        "admission": model_admission.snapshot(),
+        "backends": {name: policy.snapshot() for name, policy in backend_policies.items()}
     }
 
+@app.get("/profiles")
+async def get_profiles(profile_token: Optional[str] = Header(None, alias=PROFILE_HEADER)):
+    """List stored profiling reports (requires the profiling token)"""
+    if not profiling_requested(profile_token):
+        raise HTTPException(status_code=403, detail="Profiling is disabled or the token is wrong")
+    return {"profiles": list_reports()}
+
+@app.get("/profiles/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    format: str = "txt",
+    profile_token: Optional[str] = Header(None, alias=PROFILE_HEADER)
+):
+    """Download a profiling report: readable summary (txt) or raw pstats data (prof)"""
+    if not profiling_requested(profile_token):
+        raise HTTPException(status_code=403, detail="Profiling is disabled or the token is wrong")
+    
+    path = report_path(profile_id, f".{format}")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "txt":
+        with open(path) as f:
+            return PlainTextResponse(f.read())
+    return FileResponse(path, media_type="application/octet-stream", filename=os.path.basename(path))
+
+@app.post("/snapshots/export")
+async def export_index_snapshot(
+    rag=Depends(tenant_rag),
+    snapshot_token: Optional[str] = Header(None, alias=SNAPSHOT_HEADER)
+):
+    """Write the live indexes and Q&A pairs to a downloadable snapshot archive"""
+    if not snapshot_access_allowed(snapshot_token):
+        raise HTTPException(status_code=403, detail="Snapshots are disabled or the token is wrong")
+    
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    name = f"{rag.tenant_id or 'default'}_{time.strftime('%Y%m%d-%H%M%S')}.snap"
+    try:
+        result = await run_in_threadpool(export_snapshot, rag, os.path.join(SNAPSHOT_DIR, name))
+        return {"name": name, **result}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error exporting snapshot: {str(e)}")
+
+@app.get("/snapshots/{name}")
+async def download_index_snapshot(name: str, snapshot_token: Optional[str] = Header(None, alias=SNAPSHOT_HEADER)):
+    """Download an exported snapshot archive"""
+    if not snapshot_access_allowed(snapshot_token):
+        raise HTTPException(status_code=403, detail="Snapshots are disabled or the token is wrong")
+    
+    path = os.path.join(SNAPSHOT_DIR, os.path.basename(name))
+    if not name.endswith(".snap") or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    return FileResponse(path, media_type="application/zip", filename=os.path.basename(path))
+
+@app.post("/snapshots/import")
+async def import_index_snapshot(
+    file: UploadFile = File(...),
+    force: bool = False,
+    rag=Depends(tenant_rag),
+    snapshot_token: Optional[str] = Header(None, alias=SNAPSHOT_HEADER)
+):
+    """Load a snapshot archive in place of the current indexes, without re-parsing or re-embedding"""
+    if not snapshot_access_allowed(snapshot_token):
+        raise HTTPException(status_code=403, detail="Snapshots are disabled or the token is wrong")
+    
+    request_dir = Path(tempfile.mkdtemp(prefix="rag_snapshot_"))
+    try:
+        # Archives hold whole corpora, so the document upload limit does not apply
+        path = await save_uploaded_file(file, request_dir, max_bytes=sys.maxsize)
+        result = await run_in_threadpool(import_snapshot, rag, str(path), force=force)
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error importing snapshot: {str(e)}")
+    finally:
+        shutil.rmtree(request_dir, ignore_errors=True)
+
 @app.get("/system_info")
 async def get_system_info():
     """Get system information"""
-    if not rag_system:
-        raise HTTPException(status_code=500, detail="RAG system not initialized")
+    require_rag_system()
     
     return {
-        "system_ready": rag_system.index is not None,
-        "has_chat_engine": rag_system.chat_engine is not None,
-        "has_agent": rag_system.agent is not None,
+        "system_ready": bool(rag_system.indexes),
+        "indexes": sorted(rag_system.indexes),
+        "index_snapshot": rag_system.snapshots.stats(),
+        "tenants": tenant_registry.stats() if tenant_registry else None,
+        "has_agent": getattr(rag_system, "agent", None) is not None,
         "conversation_length": len(rag_system.conversation_history),
         "exact_qa_pairs": len(rag_system.exact_qa_pairs),
         "supported_formats": [".pdf", ".csv", ".xlsx", ".xls"]
@@ -0,0 +1,211 @@
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import logging
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Profiling is available only when a token is configured; a request opts in by
+# sending it in the PROFILE_HEADER header
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+PROFILE_HEADER = "X-Profile-Token"
+# Where reports are written, and how many of the newest are kept
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "rag_profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+# Functions listed in the text report
+PROFILE_TOP_FUNCTIONS = 40
+# Allocation sites listed for memory profiles
+MEMORY_TOP_SITES = 20
+
+T = TypeVar("T")
+
+_session: contextvars.ContextVar[Optional["ProfileSession"]] = contextvars.ContextVar("profile_session", default=None)
+# tracemalloc is process-wide, so only one memory profile runs at a time
+_memory_lock = threading.Lock()
+# Set while a thread runs under one of our profilers, so nested wraps do not start another
+_active = threading.local()
+
+
+def profiling_requested(token: Optional[str]) -> bool:
+    """Whether a request's profile header unlocks profiling"""
+    return bool(PROFILING_TOKEN) and token == PROFILING_TOKEN
+
+
+class ProfileSession:
+    """cProfile data for one request, gathered from every thread that works on it"""
+
+    def __init__(self, kind: str):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{kind}-{uuid.uuid4().hex[:8]}"
+        self.kind = kind
+        self._profilers: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        # Calls that ran unprofiled because another profiler was already active
+        self.skipped = 0
+
+    def wrap(self, fn: Callable[..., T]) -> Callable[..., T]:
+        """fn, profiled in whichever thread ends up calling it.
+
+        A call on a thread that is already being profiled is covered by that
+        profiler. Python 3.12+ allows one active profiler per process, so a
+        call whose profiler cannot be enabled runs unprofiled; profiling
+        errors never reach fn's caller.
+        """
+        def profiled(*args, **kwargs):
+            if getattr(_active, "profiling", False):
+                return fn(*args, **kwargs)
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                with self._lock:
+                    self.skipped += 1
+                return fn(*args, **kwargs)
+            with self._lock:
+                self._profilers.append(profiler)
+            _active.profiling = True
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _active.profiling = False
+                profiler.disable()
+        return profiled
+
+    def stats(self) -> Optional[pstats.Stats]:
+        with self._lock:
+            profilers = list(self._profilers)
+        if not profilers:
+            return None
+        stats = pstats.Stats(profilers[0])
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+        return stats
+
+
+def wrap(fn: Callable[..., T]) -> Callable[..., T]:
+    """Profile fn as part of the current request's session, if one is active.
+
+    Used before handing work to another thread (e.g. a backend attempt), which
+    does not inherit the session; a no-op when nothing is being profiled.
+    """
+    session = _session.get()
+    return fn if session is None else session.wrap(fn)
+
+
+def profile_call(kind: str, fn: Callable[..., T], *args, memory: bool = False, **kwargs) -> Tuple[T, Dict[str, Any]]:
+    """Run fn under cProfile (and tracemalloc when memory=True) and save the report.
+
+    Returns fn's result and a summary of the stored report.
+    """
+    session = ProfileSession(kind)
+    token = _session.set(session)
+    trace_memory = memory and _memory_lock.acquire(blocking=False)
+    start = time.perf_counter()
+    memory_report = None
+    try:
+        if trace_memory:
+            tracemalloc.start()
+        result = session.wrap(fn)(*args, **kwargs)
+    finally:
+        wall_ms = (time.perf_counter() - start) * 1000
+        _session.reset(token)
+        if trace_memory:
+            memory_report = _memory_report()
+            tracemalloc.stop()
+            _memory_lock.release()
+        report = _save_report(session, wall_ms, memory_report, memory and not trace_memory)
+    return result, report
+
+
+def _memory_report() -> Dict[str, Any]:
+    current, peak = tracemalloc.get_traced_memory()
+    top = tracemalloc.take_snapshot().statistics("lineno")[:MEMORY_TOP_SITES]
+    return {
+        "current_bytes": current,
+        "peak_bytes": peak,
+        "top_allocations": [
+            {"site": str(stat.traceback[0]), "size_bytes": stat.size, "count": stat.count}
+            for stat in top
+        ]
+    }
+
+
+def _save_report(
+    session: ProfileSession,
+    wall_ms: float,
+    memory_report: Optional[Dict[str, Any]],
+    memory_skipped: bool
+) -> Dict[str, Any]:
+    """Write <id>.prof (pstats) and <id>.txt (readable summary) under PROFILE_DIR"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    text = io.StringIO()
+    text.write(f"{session.kind} profile {session.id}\nwall time: {wall_ms:.1f} ms\n\n")
+
+    stats = session.stats()
+    if stats is not None:
+        stats.dump_stats(os.path.join(PROFILE_DIR, f"{session.id}.prof"))
+        stats.stream = text
+        stats.sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+
+    if memory_report is not None:
+        text.write(f"\ntracemalloc peak: {memory_report['peak_bytes']} bytes "
+                   f"(process-wide, includes concurrent requests)\n")
+        for site in memory_report["top_allocations"]:
+            text.write(f"{site['size_bytes']:>12}  {site['count']:>8}  {site['site']}\n")
+    elif memory_skipped:
+        text.write("\ntracemalloc skipped: another memory profile was running\n")
+    if session.skipped:
+        text.write(f"\n{session.skipped} calls ran unprofiled: another profiler was already active\n")
+
+    with open(os.path.join(PROFILE_DIR, f"{session.id}.txt"), "w") as f:
+        f.write(text.getvalue())
+    _prune_reports()
+
+    logger.info(f"📊 Saved {session.kind} profile {session.id} ({wall_ms:.0f} ms)")
+    return {
+        "id": session.id,
+        "kind": session.kind,
+        "wall_ms": round(wall_ms, 1),
+        "peak_memory_bytes": memory_report["peak_bytes"] if memory_report else None
+    }
+
+
+def _prune_reports():
+    """Keep only the PROFILE_KEEP newest reports"""
+    reports = list_reports()
+    for report in reports[PROFILE_KEEP:]:
+        for extension in (".prof", ".txt"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, report["id"] + extension))
+            except FileNotFoundError:
+                pass
+
+
+def list_reports() -> List[Dict[str, Any]]:
+    """Stored reports, newest first"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    reports = []
+    for name in os.listdir(PROFILE_DIR):
+        if name.endswith(".txt"):
+            path = os.path.join(PROFILE_DIR, name)
+            reports.append({"id": name[:-4], "created_at": os.path.getmtime(path)})
+    reports.sort(key=lambda report: report["created_at"], reverse=True)
+    return reports
+
+
+def report_path(report_id: str, extension: str) -> Optional[str]:
+    """Path of a stored report file, or None for unknown or malformed ids"""
+    if os.path.basename(report_id) != report_id or extension not in (".prof", ".txt"):
+        return None
+    path = os.path.join(PROFILE_DIR, report_id + extension)
+    return path if os.path.isfile(path) else None
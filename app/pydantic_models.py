@@ -1,18 +1,42 @@
 from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+class QueryFilters(BaseModel):
+    file_name: Optional[str] = None
+    document_type: Optional[str] = None
+    type: Optional[str] = None
+    page_from: Optional[int] = None
+    page_to: Optional[int] = None
 
 class QueryRequest(BaseModel):
     question: str
     use_agent: Optional[bool] = True
+    filters: Optional[QueryFilters] = None
+    # Time budget in milliseconds; omitted means the server default (CHAT_DEADLINE_MS)
+    deadline_ms: Optional[int] = Field(default=None, gt=0, le=300000)
 
 class ChatResponse(BaseModel):
     answer: str
     sources: List[dict]
     conversation_id: int
+    prompt_tokens: Optional[int] = None
+    degraded: bool = False
+    agent: Optional[dict] = None
 
 class UploadResponse(BaseModel):
     message: str
     document_count: int
     node_count: int
-    files_processed: List[str]
\ No newline at end of file
+    files_processed: List[str]
+    dedup: Optional[dict] = None
+
+class DeleteResponse(BaseModel):
+    message: str
+    file_name: str
+    qa_pairs_removed: int
+
+class ResumableUploadRequest(BaseModel):
+    file_name: str
+    size: int
+    sha256: Optional[str] = None
@@ -0,0 +1,670 @@
+import difflib
+import fcntl
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+import time
+import unicodedata
+from array import array
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+import logging
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Path of the Q&A index file shared by all worker processes (unset = per-process dict)
+QA_INDEX_PATH = os.getenv("QA_INDEX_PATH")
+# How often workers stat the shared file for a new version (seconds)
+QA_INDEX_CHECK_INTERVAL = float(os.getenv("QA_INDEX_CHECK_INTERVAL", "1.0"))
+
+MAGIC = b"RAGQAIDX"
+FORMAT_VERSION = 2
+# magic, format version, data version, record count, interned string count,
+# records offset, interned strings offset, text offset
+HEADER = struct.Struct("<8sIQIIQQQ")
+# key, question, answer and source as (offset, length) into the text buffer,
+# then interned file_name / document_type / sheet_name ids, page number and flags
+RECORD = struct.Struct("<QIQIQIQIIIIiB")
+# Version 1 files have no flags byte; they are still read
+RECORD_V1 = struct.Struct("<QIQIQIQIIIIi")
+RECORD_FORMATS = {1: RECORD_V1, FORMAT_VERSION: RECORD}
+# Record flag: different Q&A pairs share this key, so it is no exact-match answer
+FLAG_AMBIGUOUS = 1
+# (offset, length) of an interned string
+STRING = struct.Struct("<QI")
+INTERNED_FIELDS = ("file_name", "document_type", "sheet_name")
+
+# Arabic tashkeel (fathatan..sukun), superscript alef and tatweel are dropped
+_ARABIC_MARKS = dict.fromkeys([*range(0x064B, 0x0653), 0x0670, 0x0640])
+# Letter variants folded to one form: alef with hamza/madda/wasla -> alef, alef maqsura
+# and Farsi yeh -> yeh, teh marbuta -> heh, keheh -> kaf; Arabic-Indic digits -> ASCII
+_ARABIC_FOLDS = {
+    **{ord(c): "\u0627" for c in "\u0622\u0623\u0625\u0671"},
+    ord("\u0649"): "\u064A", ord("\u06CC"): "\u064A",
+    ord("\u0629"): "\u0647",
+    ord("\u06A9"): "\u0643",
+    **{0x0660 + i: str(i) for i in range(10)},
+    **{0x06F0 + i: str(i) for i in range(10)},
+}
+# Symbols that tell questions apart ("C++" vs "C#") are spelled out
+_SYMBOL_WORDS = {ord("+"): " plus ", ord("#"): " sharp "}
+_QUESTION_FOLDS = {**_ARABIC_MARKS, **_ARABIC_FOLDS, **_SYMBOL_WORDS}
+# Punctuation, except "." and "/" inside a word ("node.js", "tcp/ip", "v1.2")
+_NON_WORD = re.compile(r"[^\w\s./]|(?<!\w)[./]|[./](?!\w)")
+
+
+def normalize_question(text: str) -> str:
+    """Lookup key for a question: NFKC (full-width, ligatures, presentation forms),
+    casefolded, Arabic diacritics removed and letter variants folded, "+" and "#"
+    spelled out, other punctuation dropped (but not "." or "/" within a word)
+    and whitespace collapsed.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold().translate(_QUESTION_FOLDS)
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+class CompactQAStore(Mapping):
+    """In-memory Q&A pairs in columnar arrays over one contiguous text buffer.
+
+    Presents the same key -> entry dict interface as the old exact_qa_pairs
+    dict, but stores each pair as a row: key, question, answer and source are
+    (offset, length) pairs into a single UTF-8 bytearray, the repeated
+    file_name / document_type / sheet_name values are interned ids, and the
+    lookup table is an open-addressing array of row numbers probed by
+    hash(key). Entry dicts are only built when a row is read.
+    """
+
+    def __init__(self):
+        self._text = bytearray()
+        self._offsets = {column: array("Q") for column in ("key", "question", "answer", "source")}
+        self._lengths = {column: array("I") for column in ("key", "question", "answer", "source")}
+        self._interned_ids = {field: array("I") for field in INTERNED_FIELDS}
+        self._page_numbers = array("i")
+        self._flags = array("B")
+        self._strings: List[str] = []
+        self._string_ids: Dict[str, int] = {}
+        # Per-row key hashes and a linear-probing table of row + 1 (0 = empty slot)
+        self._hashes = array("q")
+        self._slots = array("q", bytes(8 * 16))
+        # Buffer bytes no longer referenced by any row
+        self._dead_bytes = 0
+
+    def _add_text(self, column: str, value: str, row: Optional[int] = None):
+        data = value.encode("utf-8")
+        offset = len(self._text)
+        self._text.extend(data)
+        if row is None:
+            self._offsets[column].append(offset)
+            self._lengths[column].append(len(data))
+        else:
+            self._offsets[column][row] = offset
+            self._lengths[column][row] = len(data)
+
+    def _read_text(self, column: str, row: int) -> str:
+        offset = self._offsets[column][row]
+        return self._text[offset:offset + self._lengths[column][row]].decode("utf-8")
+
+    def _intern(self, value: str) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = len(self._strings)
+            self._strings.append(value)
+            self._string_ids[value] = string_id
+        return string_id
+
+    def _probe(self, key: str, key_hash: int) -> Tuple[int, int]:
+        """(slot, row) for key; row is -1 and slot is the free slot when key is absent"""
+        mask = len(self._slots) - 1
+        slot = key_hash & mask
+        while True:
+            stored = self._slots[slot]
+            if stored == 0:
+                return slot, -1
+            row = stored - 1
+            if self._hashes[row] == key_hash and self._read_text("key", row) == key:
+                return slot, row
+            slot = (slot + 1) & mask
+
+    def _find(self, key: str) -> int:
+        """Row holding key, or -1"""
+        return self._probe(key, hash(key))[1]
+
+    def _grow(self):
+        """Double the probing table and reinsert every row"""
+        self._slots = array("q", bytes(8 * len(self._slots) * 2))
+        mask = len(self._slots) - 1
+        for row, key_hash in enumerate(self._hashes):
+            slot = key_hash & mask
+            while self._slots[slot]:
+                slot = (slot + 1) & mask
+            self._slots[slot] = row + 1
+
+    def __setitem__(self, key: str, entry: Dict[str, Any]):
+        key_hash = hash(key)
+        slot, row = self._probe(key, key_hash)
+        new_row = row < 0
+        if new_row:
+            row = len(self._page_numbers)
+            self._add_text("key", key)
+            self._hashes.append(key_hash)
+            self._slots[slot] = row + 1
+        # Replaced values leave their old bytes behind in the buffer until it is compacted
+        if not new_row:
+            self._dead_bytes += sum(self._lengths[column][row] for column in ("question", "answer", "source"))
+        self._add_text("question", entry.get("original_question", ""), None if new_row else row)
+        self._add_text("answer", entry.get("original_answer", ""), None if new_row else row)
+        self._add_text("source", str(entry.get("source", "")), None if new_row else row)
+        for field in INTERNED_FIELDS:
+            string_id = self._intern(str(entry.get(field, "") or ""))
+            if new_row:
+                self._interned_ids[field].append(string_id)
+            else:
+                self._interned_ids[field][row] = string_id
+        page_number = int(entry.get("page_number", 1) or 1)
+        flags = FLAG_AMBIGUOUS if entry.get("ambiguous") else 0
+        if new_row:
+            self._page_numbers.append(page_number)
+            self._flags.append(flags)
+            # Keep the table at most half full so probe runs stay short
+            if 2 * len(self._hashes) > len(self._slots):
+                self._grow()
+        else:
+            self._page_numbers[row] = page_number
+            self._flags[row] = flags
+
+    def __delitem__(self, key: str):
+        key_hash = hash(key)
+        slot, row = self._probe(key, key_hash) if isinstance(key, str) else (-1, -1)
+        if row < 0:
+            raise KeyError(key)
+        self._dead_bytes += sum(self._lengths[column][row] for column in self._lengths)
+        self._clear_slot(slot)
+
+        # Fill the hole with the last row so the columns stay dense
+        last = len(self) - 1
+        if row != last:
+            last_slot, _ = self._probe(self._read_text("key", last), self._hashes[last])
+            for columns in (self._offsets, self._lengths, self._interned_ids):
+                for column in columns.values():
+                    column[row] = column[last]
+            self._page_numbers[row] = self._page_numbers[last]
+            self._flags[row] = self._flags[last]
+            self._hashes[row] = self._hashes[last]
+            self._slots[last_slot] = row + 1
+        for columns in (self._offsets, self._lengths, self._interned_ids):
+            for column in columns.values():
+                column.pop()
+        self._page_numbers.pop()
+        self._flags.pop()
+        self._hashes.pop()
+
+        if self._dead_bytes > len(self._text) // 2:
+            self._compact_text()
+
+    def _clear_slot(self, slot: int):
+        """Empty a probing slot, shifting later entries of its run back (no tombstones)"""
+        mask = len(self._slots) - 1
+        hole = slot
+        self._slots[hole] = 0
+        slot = (slot + 1) & mask
+        while self._slots[slot]:
+            home = self._hashes[self._slots[slot] - 1] & mask
+            # Move the entry into the hole unless its home lies cyclically in (hole, slot]
+            if (slot - home) & mask >= (slot - hole) & mask:
+                self._slots[hole] = self._slots[slot]
+                self._slots[slot] = 0
+                hole = slot
+            slot = (slot + 1) & mask
+
+    def _compact_text(self):
+        """Rewrite the text buffer without the bytes of deleted and replaced values"""
+        text = bytearray()
+        for column, offsets in self._offsets.items():
+            lengths = self._lengths[column]
+            for row in range(len(offsets)):
+                offset = offsets[row]
+                offsets[row] = len(text)
+                text.extend(self._text[offset:offset + lengths[row]])
+        self._text = text
+        self._dead_bytes = 0
+
+    def remove_file(self, file_name: str) -> int:
+        """Delete every pair that came from file_name; returns the number removed"""
+        string_id = self._string_ids.get(file_name)
+        if string_id is None:
+            return 0
+        file_ids = self._interned_ids["file_name"]
+        keys = [self._read_text("key", row) for row in range(len(self)) if file_ids[row] == string_id]
+        for key in keys:
+            del self[key]
+        return len(keys)
+
+    def _entry(self, row: int) -> Dict[str, Any]:
+        return {
+            'original_question': self._read_text("question", row),
+            'original_answer': self._read_text("answer", row),
+            'source': self._read_text("source", row),
+            'file_name': self._strings[self._interned_ids["file_name"][row]],
+            'page_number': self._page_numbers[row],
+            'document_type': self._strings[self._interned_ids["document_type"][row]],
+            'sheet_name': self._strings[self._interned_ids["sheet_name"][row]],
+            'ambiguous': bool(self._flags[row] & FLAG_AMBIGUOUS)
+        }
+
+    def __len__(self) -> int:
+        return len(self._page_numbers)
+
+    def __contains__(self, key) -> bool:
+        return isinstance(key, str) and self._find(key) >= 0
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        row = self._find(key) if isinstance(key, str) else -1
+        if row < 0:
+            raise KeyError(key)
+        return self._entry(row)
+
+    def __iter__(self) -> Iterator[str]:
+        for row in range(len(self)):
+            yield self._read_text("key", row)
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for row in range(len(self)):
+            yield self._read_text("key", row), self._entry(row)
+
+    def nbytes(self) -> int:
+        """Approximate heap footprint in bytes"""
+        columns = (
+            list(self._offsets.values()) + list(self._lengths.values()) + list(self._interned_ids.values())
+            + [self._page_numbers, self._flags, self._hashes, self._slots]
+        )
+        return (
+            sys.getsizeof(self._text)
+            + sum(sys.getsizeof(column) for column in columns)
+            + sum(sys.getsizeof(value) for value in self._strings)
+            + sys.getsizeof(self._string_ids)
+        )
+
+
+def write_qa_index(qa_pairs: Mapping[str, Dict[str, Any]], path: str, version: Optional[int] = None) -> int:
+    """Serialize Q&A pairs to a versioned index file, replacing path atomically.
+
+    Records are sorted by key so readers can binary-search the mapped file,
+    and repeated fields are stored once in an interned string table.
+    Returns the data version written.
+    """
+    version = time.time_ns() if version is None else version
+    text = bytearray()
+    interned = {}
+
+    def add_text(value: str) -> Tuple[int, int]:
+        data = value.encode("utf-8")
+        offset = len(text)
+        text.extend(data)
+        return offset, len(data)
+
+    def intern(value: str) -> int:
+        if value not in interned:
+            interned[value] = len(interned)
+        return interned[value]
+
+    records = []
+    for key in sorted(qa_pairs, key=lambda k: k.encode("utf-8")):
+        entry = qa_pairs[key]
+        records.append(RECORD.pack(
+            *add_text(key),
+            *add_text(entry.get("original_question", "")),
+            *add_text(entry.get("original_answer", "")),
+            *add_text(str(entry.get("source", ""))),
+            *(intern(str(entry.get(field, "") or "")) for field in INTERNED_FIELDS),
+            int(entry.get("page_number", 1) or 1),
+            FLAG_AMBIGUOUS if entry.get("ambiguous") else 0
+        ))
+
+    strings = []
+    for value in interned:  # dicts keep insertion order, i.e. id order
+        strings.append(STRING.pack(*add_text(value)))
+
+    records_offset = HEADER.size
+    strings_offset = records_offset + RECORD.size * len(records)
+    text_offset = strings_offset + STRING.size * len(strings)
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, version, len(records), len(strings),
+        records_offset, strings_offset, text_offset
+    )
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".qa_index_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.writelines(records)
+            f.writelines(strings)
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    logger.info(f"Wrote {len(records)} Q&A pairs to {path} (version {version}, {text_offset + len(text)} bytes)")
+    return version
+
+
+class MappedQAIndex(Mapping):
+    """Read-only Q&A pairs backed by a memory-mapped index file.
+
+    Behaves like the exact_qa_pairs dict (key -> entry dict); entries are
+    decoded on access, so every process mapping the file shares its pages.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, format_version, self.version, self._count, string_count,
+         self._records_offset, strings_offset, self._text_offset) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or format_version not in RECORD_FORMATS:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} Q&A index file")
+        self._record_format = RECORD_FORMATS[format_version]
+        self._strings = [
+            self._text(*STRING.unpack_from(self._mm, strings_offset + i * STRING.size))
+            for i in range(string_count)
+        ]
+
+    def _text(self, offset: int, length: int) -> str:
+        start = self._text_offset + offset
+        return self._mm[start:start + length].decode("utf-8")
+
+    def _record(self, i: int) -> tuple:
+        return self._record_format.unpack_from(self._mm, self._records_offset + i * self._record_format.size)
+
+    def _key_bytes(self, i: int) -> bytes:
+        key_offset, key_length = self._record(i)[:2]
+        start = self._text_offset + key_offset
+        return self._mm[start:start + key_length]
+
+    def _entry(self, record: tuple) -> Dict[str, Any]:
+        (_, _, q_off, q_len, a_off, a_len, s_off, s_len,
+         file_id, doc_type_id, sheet_id, page_number) = record[:12]
+        flags = record[12] if len(record) > 12 else 0
+        return {
+            'original_question': self._text(q_off, q_len),
+            'original_answer': self._text(a_off, a_len),
+            'source': self._text(s_off, s_len),
+            'file_name': self._strings[file_id],
+            'page_number': page_number,
+            'document_type': self._strings[doc_type_id],
+            'sheet_name': self._strings[sheet_id],
+            'ambiguous': bool(flags & FLAG_AMBIGUOUS)
+        }
+
+    def _find(self, key: str) -> int:
+        """Binary search for key; returns record number or -1"""
+        target = key.encode("utf-8")
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            if self._key_bytes(mid) < target:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self._count and self._key_bytes(low) == target:
+            return low
+        return -1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, key) -> bool:
+        return isinstance(key, str) and self._find(key) >= 0
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        i = self._find(key) if isinstance(key, str) else -1
+        if i < 0:
+            raise KeyError(key)
+        return self._entry(self._record(i))
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._count):
+            yield self._key_bytes(i).decode("utf-8")
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for i in range(self._count):
+            record = self._record(i)
+            yield self._text(record[0], record[1]), self._entry(record)
+
+    def nbytes(self) -> int:
+        """Size of the mapped file; its pages are shared with other processes"""
+        return len(self._mm)
+
+
+class SharedQAIndex:
+    """Tracks the shared Q&A index file and remaps it when another worker replaces it.
+
+    Writers hold an flock on a sidecar lock file from reading the latest
+    published version until their own is in place, so concurrent uploads
+    and deletes in different workers never drop each other's changes.
+    """
+
+    def __init__(self, path: str, check_interval: float = QA_INDEX_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._index = None
+        self._identity = None
+        self._checked_at = 0.0
+
+    def _file_identity(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def current(self) -> Optional[MappedQAIndex]:
+        """Mapped index for the newest version on disk (None if no file yet)"""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._index
+        with self._lock:
+            self._checked_at = now
+            identity = self._file_identity()
+            if identity is not None and identity != self._identity:
+                # The old mapping is released once no reader references it
+                self._index = MappedQAIndex(self.path)
+                self._identity = identity
+                logger.info(f"Mapped Q&A index version {self._index.version} ({len(self._index)} pairs)")
+            return self._index
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """Exclusive across threads and processes: the thread lock, then an flock on path.lock"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with self._lock, open(f"{self.path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _publish_locked(self, qa_pairs: Mapping[str, Dict[str, Any]]):
+        write_qa_index(qa_pairs, self.path)
+        self._checked_at = 0.0
+
+    def publish(self, qa_pairs: Mapping[str, Dict[str, Any]]) -> MappedQAIndex:
+        """Write qa_pairs as the whole new shared version and map it"""
+        with self._write_lock():
+            self._publish_locked(qa_pairs)
+        return self.current()
+
+    def update(self, remove_files: Iterable[str] = (),
+               added: Optional[Mapping[str, Dict[str, Any]]] = None) -> MappedQAIndex:
+        """Publish the latest version on disk minus remove_files' pairs plus added, and map it.
+
+        The change is applied to whatever was last published, by any worker,
+        not to this worker's possibly stale copy.
+        """
+        remove_files = set(remove_files)
+        with self._write_lock():
+            qa_pairs = CompactQAStore()
+            if os.path.exists(self.path):
+                for question_key, qa_data in MappedQAIndex(self.path).items():
+                    if qa_data["file_name"] not in remove_files:
+                        qa_pairs[question_key] = qa_data
+            for question_key, qa_data in (added or {}).items():
+                put_qa_pair(qa_pairs, question_key, qa_data)
+            self._publish_locked(qa_pairs)
+        return self.current()
+
+
+# Similarity a stored question needs to be accepted as a fuzzy exact match
+FUZZY_MATCH_RATIO = 0.95
+
+
+def put_qa_pair(qa_pairs: CompactQAStore, question_key: str, qa_data: Dict[str, Any]) -> bool:
+    """Store qa_data under question_key; returns whether the key is ambiguous.
+
+    A key already holding a different answer is not overwritten: it is marked
+    ambiguous, and match_question then leaves it to semantic search rather
+    than confidently returning one of the answers.
+    """
+    existing = qa_pairs.get(question_key)
+    ambiguous = bool(qa_data.get('ambiguous')) or (existing is not None and (
+        existing['ambiguous'] or existing['original_answer'] != qa_data['original_answer']
+    ))
+    if ambiguous and existing is not None:
+        if not existing['ambiguous']:
+            logger.warning(
+                f"⚠️ Q&A key '{question_key[:50]}' has different answers in {existing['file_name']} "
+                f"and {qa_data.get('file_name', '')}; skipping exact matches for it"
+            )
+        qa_pairs[question_key] = {**existing, 'ambiguous': True}
+    else:
+        qa_pairs[question_key] = {**qa_data, 'ambiguous': ambiguous}
+    return ambiguous
+
+
+def store_qa_documents(documents, qa_pairs: CompactQAStore):
+    """Store the Q&A-pair documents among documents for exact matching"""
+    for doc in documents:
+        if doc.metadata.get('type') == 'qa_pair':
+            original_q = doc.metadata.get('original_question', '').strip()
+            original_a = doc.metadata.get('original_answer', '').strip()
+            
+            if original_q and original_a:
+                question_key = normalize_question(original_q)
+                put_qa_pair(qa_pairs, question_key, {
+                    'original_question': original_q,
+                    'original_answer': original_a,
+                    'source': doc.metadata.get('source', ''),
+                    'file_name': doc.metadata.get('file_name', ''),
+                    'page_number': doc.metadata.get('page_number', 1),
+                    'document_type': doc.metadata.get('document_type', ''),
+                    'sheet_name': doc.metadata.get('sheet_name', '')
+                })
+
+
+def matches_filters(qa_data: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
+    """Check a stored Q&A pair against query filters"""
+    if not filters:
+        return True
+    if filters.get('file_name') and qa_data['file_name'] != filters['file_name']:
+        return False
+    if filters.get('document_type') and qa_data['document_type'] != filters['document_type']:
+        return False
+    if filters.get('page_from') is not None and qa_data['page_number'] < filters['page_from']:
+        return False
+    if filters.get('page_to') is not None and qa_data['page_number'] > filters['page_to']:
+        return False
+    return True
+
+
+def match_question(
+    question: str,
+    qa_pairs: Mapping[str, Dict[str, Any]],
+    filters: Optional[Dict[str, Any]] = None
+) -> Optional[Dict[str, Any]]:
+    """Exact (normalized) or fuzzy (FUZZY_MATCH_RATIO+) match of question among qa_pairs"""
+    if filters and filters.get('type', 'qa_pair') != 'qa_pair':
+        # Only Q&A pairs live in the exact-match store
+        return None
+    
+    question_clean = normalize_question(question)
+    
+    # Direct exact match
+    if question_clean in qa_pairs and matches_filters(qa_pairs[question_clean], filters):
+        match = qa_pairs[question_clean]
+        if match['ambiguous']:
+            # Stored questions with different answers share this key; none of them is the answer
+            logger.info(f"❔ Ambiguous exact-match key for: '{question[:50]}...'")
+            return None
+        logger.info(f"🎯 Found EXACT match for: '{question[:50]}...'")
+        return {
+            'answer': match['original_answer'],
+            'source': match,
+            'match_type': 'exact'
+        }
+    
+    # Very high similarity matching, best ratio wins (first one on ties)
+    best_key = None
+    best_ratio = 0
+    matcher = difflib.SequenceMatcher(None, question_clean)
+    query_length = len(question_clean)
+    
+    # Entries are only decoded when filters need their fields
+    candidates = qa_pairs.items() if filters else ((key, None) for key in qa_pairs)
+    for stored_question, qa_data in candidates:
+        # ratio() is bounded by the lengths alone, then by shared characters;
+        # candidates that cannot reach the threshold or beat the best are skipped
+        total_length = query_length + len(stored_question)
+        floor = max(best_ratio, FUZZY_MATCH_RATIO)
+        if not total_length or 2.0 * min(query_length, len(stored_question)) / total_length < floor:
+            continue
+        if filters and not matches_filters(qa_data, filters):
+            continue
+        matcher.set_seq2(stored_question)
+        if matcher.quick_ratio() < floor:
+            continue
+        ratio = matcher.ratio()
+        if ratio >= floor and ratio > best_ratio:
+            best_ratio = ratio
+            best_key = stored_question
+    
+    if best_key is not None:
+        best_match = qa_pairs[best_key]
+        if best_match['ambiguous']:
+            logger.info(f"❔ Ambiguous fuzzy-match key for: '{question[:50]}...'")
+            return None
+        logger.info(f"🔍 Found FUZZY EXACT match (similarity: {best_ratio:.3f}) for: '{question[:50]}...'")
+        return {
+            'answer': best_match['original_answer'],
+            'source': best_match,
+            'match_type': 'fuzzy_exact',
+            'similarity': best_ratio
+        }
+    
+    logger.info(f"❌ No exact match found for: '{question[:50]}...'")
+    return None
+
+
+def exact_source(exact_match: Dict[str, Any]) -> Dict[str, Any]:
+    """Citation for an exact or fuzzy-exact Q&A match"""
+    return {
+        'file_name': exact_match['source']['file_name'],
+        'page_number': exact_match['source']['page_number'],
+        'document_type': 'exact_match',
+        'source': exact_match['source']['source'],
+        'match_type': exact_match['match_type'],
+        'similarity_score': exact_match.get('similarity', 1.0),
+        'original_question': exact_match['source']['original_question'],
+        'original_answer': exact_match['source']['original_answer']
+    }
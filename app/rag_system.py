@@ -1,20 +1,28 @@
 
 from utils.ai_utils import setup_models
-import weaviate
-from weaviate.auth import Auth
+from utils.configs import prompt, context_prompt
 import os
-from typing import List, Dict, Any, Optional
-import difflib
+import re
+import threading
+from typing import List, Dict, Any, Callable, Iterator, Optional, Set, Tuple, Union, BinaryIO
 from llama_index.core import (
+    Settings,
     VectorStoreIndex,
     StorageContext,
 )
-from llama_index.vector_stores.weaviate import WeaviateVectorStore
 from llama_index.core.schema import TextNode
-from llama_index.core.memory import ChatMemoryBuffer
-from llama_index.core.postprocessor import SimilarityPostprocessor
+from llama_index.core.vector_stores import MetadataFilter, MetadataFilters, FilterOperator
 import logging
 from doc_processor import DocumentProcessor
+from context_packer import ContextPacker
+from qa_store import QA_INDEX_PATH, CompactQAStore, SharedQAIndex, exact_source, match_question, store_qa_documents
+from index_snapshot import IndexSnapshot, SnapshotManager
+from admission import AdmissionRejected, model_admission
+from deadline import Deadline, DeadlineExceeded, MIN_RETRIEVAL_MS, MIN_SYNTHESIS_MS
+from resilience import BackendUnavailable, backend_policies
+from agent import ParallelAgent
+from dedup import DEDUP_ENABLED, deduplicate_nodes, rehomed_duplicate, strip_repeated_lines
+from tenants import tenant_collection, tenant_qa_index_path
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -24,29 +32,119 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 WEAVIATE_URL = os.getenv("WEAVIATE_URL")
 WEAVIATE_API_KEY = os.getenv("WEAVIATE_API_KEY")
 
+# One collection per content type, each with its own chunking and retrieval settings.
+# Queries are routed through them in this order; the small Q&A index is tried first.
+INDEX_LAYOUT = {
+    "qa": {
+        "collection": "QAPairs",
+        "chunk_size": 2048,  # Keep each Q&A pair in a single chunk
+        "chunk_overlap": 0,
+        "top_k": int(os.getenv("QA_TOP_K", "1")),
+        "similarity_cutoff": 0.75
+    },
+    "pdf": {
+        "collection": "Documents",
+        "chunk_size": 1024,
+        "chunk_overlap": 100,
+        "top_k": int(os.getenv("PDF_TOP_K", "3")),
+        "similarity_cutoff": 0.75
+    },
+}
+
+
+# Nodes embedded per admission slot during ingest; chat queries can overtake between batches
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "100"))
+# Nodes fetched per request when reading one file's nodes back from Weaviate
+STORED_NODES_PAGE = 500
+
+
+def content_type_of(metadata: Dict[str, Any]) -> str:
+    """Index a document or node belongs to"""
+    return "qa" if metadata.get("type") == "qa_pair" else "pdf"
+
+
+def chunk_documents(
+    doc_processor: DocumentProcessor,
+    documents: List,
+    count_tokens: Callable[[str], int]
+) -> Tuple[Dict[str, List[TextNode]], Dict[str, int]]:
+    """Split documents into nodes per content type with that index's chunking, minus duplicates"""
+    dedup_stats = {}
+    if DEDUP_ENABLED:
+        # Drop per-page boilerplate before it is chunked and embedded
+        documents, dedup_stats = strip_repeated_lines(documents, count_tokens)
+    
+    # Create nodes per content type, each with its own chunking
+    nodes_by_type = {}
+    for content_type, layout in INDEX_LAYOUT.items():
+        type_documents = [doc for doc in documents if content_type_of(doc.metadata) == content_type]
+        nodes = doc_processor.create_nodes_with_metadata(
+            type_documents,
+            chunk_size=layout["chunk_size"],
+            chunk_overlap=layout["chunk_overlap"]
+        )
+        if DEDUP_ENABLED:
+            nodes, node_stats = deduplicate_nodes(nodes, count_tokens)
+            for key, value in node_stats.items():
+                dedup_stats[key] = dedup_stats.get(key, 0) + value
+        nodes_by_type[content_type] = nodes
+    return nodes_by_type, dedup_stats
 
 
 class AgenticRAGSystem:
-    def __init__(self):
+    def __init__(self, tenant_id: Optional[str] = None, weaviate_client=None):
+        """One system per tenant; tenant systems reuse the default system's models and Weaviate client"""
+        self.tenant_id = tenant_id
         self.doc_processor = DocumentProcessor()
-        self.index = None
-        self.query_engine = None
-        self.chat_engine = None
-        self.agent = None
-        self.chat_memory = ChatMemoryBuffer.from_defaults(token_limit=3000)
-        self.vector_store = None
+        self.context_packer = ContextPacker()
+        self.admission = model_admission
+        self.backends = backend_policies
+        # Stateless over the pinned snapshot, so it survives index swaps
+        self.agent = ParallelAgent(self)
         self.weaviate_client = None
         self.conversation_history = []
         
-        # Initialize storage for exact Q&A pairs
-        self.exact_qa_pairs = {}  # For exact matching
+        # Memory-mapped Q&A index shared by all worker processes, if configured.
+        # Tenants always have one, so an evicted tenant can be reloaded from it.
+        if tenant_id:
+            self.shared_qa_index = SharedQAIndex(tenant_qa_index_path(tenant_id))
+        else:
+            self.shared_qa_index = SharedQAIndex(QA_INDEX_PATH) if QA_INDEX_PATH else None
+        # Indexes and exact Q&A pairs live in versioned snapshots swapped in after each full ingest
+        self.snapshots = SnapshotManager(IndexSnapshot(0, {}, {}, CompactQAStore()), on_free=self._drop_collections)
+        # Full ingests build into fresh per-version collections; workers sharing collections cannot
+        self.versioned_collections = self.shared_qa_index is None
+        self._ingest_lock = threading.Lock()
         
         # Initialize models and setup
-        setup_models()
-        self.setup_weaviate()
+        if weaviate_client is None:
+            setup_models()
+            self.setup_weaviate()
+        else:
+            self.weaviate_client = weaviate_client
+            self.setup_collections()
+        self._refresh_shared_qa_pairs()
+
+    @property
+    def indexes(self) -> Dict[str, VectorStoreIndex]:
+        """Per-type vector indexes of the live snapshot"""
+        return self.snapshots.current.indexes
+
+    @property
+    def vector_stores(self) -> Dict[str, Any]:
+        """Per-type vector stores of the live snapshot"""
+        return self.snapshots.current.vector_stores
+
+    @property
+    def exact_qa_pairs(self):
+        """Exact-match Q&A pairs of the live snapshot"""
+        return self.snapshots.current.exact_qa_pairs
 
     def setup_weaviate(self):
         """Setup Weaviate vector database connection"""
+        import weaviate
+        from weaviate.auth import Auth
+        
         try:
             if not WEAVIATE_URL or not WEAVIATE_API_KEY:
                 raise ValueError("WEAVIATE_URL and WEAVIATE_API_KEY environment variables are required")
@@ -60,227 +158,439 @@ class AgenticRAGSystem:
                 raise Exception("Weaviate client not ready")
                 
             logger.info("✅ Successfully connected to Weaviate")
-            self.setup_collection()
+            self.setup_collections()
             
         except Exception as e:
             logger.error(f"❌ Failed to connect to Weaviate: {str(e)}")
             raise
 
-    def setup_collection(self):
+    def setup_collections(self):
+        """Setup one Weaviate collection per content type"""
+        # Workers sharing a Q&A index also share collections, so they must not wipe each other's data
+        reset = self.shared_qa_index is None
+        if reset:
+            self._drop_stale_collections()
+        snapshot = self.snapshots.current
+        for content_type in INDEX_LAYOUT:
+            snapshot.vector_stores[content_type] = self.setup_collection(self.collection_name(content_type), reset=reset)
+        if reset:
+            snapshot.collections = [self.collection_name(content_type) for content_type in INDEX_LAYOUT]
+
+    def collection_name(self, content_type: str) -> str:
+        """Base Weaviate collection of a content type for this system's tenant"""
+        return tenant_collection(INDEX_LAYOUT[content_type]["collection"], self.tenant_id)
+
+    def _drop_stale_collections(self):
+        """Delete per-version collections left behind by a previous run"""
+        versioned = re.compile(
+            "^(" + "|".join(re.escape(self.collection_name(content_type)) for content_type in INDEX_LAYOUT) + r")_v\d+$"
+        )
+        for collection_name in self.weaviate_client.collections.list_all(simple=True):
+            if versioned.match(collection_name):
+                self.weaviate_client.collections.delete(collection_name)
+                logger.info(f"Deleted stale collection: {collection_name}")
+
+    def _drop_collections(self, snapshot: IndexSnapshot):
+        """Delete the collections owned by a snapshot that is no longer referenced"""
+        for collection_name in snapshot.collections:
+            if self.weaviate_client is not None:
+                self.weaviate_client.collections.delete(collection_name)
+                logger.info(f"Deleted collection: {collection_name}")
+
+    def _new_snapshot(self) -> IndexSnapshot:
+        """Empty snapshot for a full ingest, built alongside the live one"""
+        version = self.snapshots.next_version()
+        if self.versioned_collections:
+            collections = {
+                content_type: f"{self.collection_name(content_type)}_v{version}"
+                for content_type in INDEX_LAYOUT
+            }
+            vector_stores = {
+                content_type: self.setup_collection(collection_name)
+                for content_type, collection_name in collections.items()
+            }
+            return IndexSnapshot(version, {}, vector_stores, CompactQAStore(), list(collections.values()))
+        
+        # Shared collections: the new snapshot keeps serving what is already stored
+        current = self.snapshots.current
+        return IndexSnapshot(version, dict(current.indexes), current.vector_stores, CompactQAStore())
+
+    def _swap_snapshot(self, snapshot: IndexSnapshot):
+        """Make snapshot live"""
+        current = self.snapshots.current
+        if snapshot.vector_stores is current.vector_stores:
+            # Edited in place: the collections now belong to the new snapshot, so freeing
+            # the old one must not drop them
+            snapshot.collections, current.collections = current.collections, []
+        self.snapshots.swap(snapshot)
+
+    def setup_collection(self, collection_name: str, reset: bool = True) -> "WeaviateVectorStore":
         """Setup Weaviate collection for document storage"""
-        collection_name = "Documents"
+        import weaviate
+        from llama_index.vector_stores.weaviate import WeaviateVectorStore
+        
         try:
+            exists = self.weaviate_client.collections.exists(collection_name)
             # Delete existing collection if it exists
-            if self.weaviate_client.collections.exists(collection_name):
+            if exists and reset:
                 self.weaviate_client.collections.delete(collection_name)
                 logger.info(f"Deleted existing collection: {collection_name}")
+                exists = False
 
             # Create new collection
-            self.weaviate_client.collections.create(
-                name=collection_name,
-                properties=[
-                    weaviate.classes.config.Property(
-                        name="content", 
-                        data_type=weaviate.classes.config.DataType.TEXT
-                    ),
-                    weaviate.classes.config.Property(
-                        name="file_name", 
-                        data_type=weaviate.classes.config.DataType.TEXT
-                    ),
-                    weaviate.classes.config.Property(
-                        name="page_number", 
-                        data_type=weaviate.classes.config.DataType.INT
-                    ),
-                    weaviate.classes.config.Property(
-                        name="document_type", 
-                        data_type=weaviate.classes.config.DataType.TEXT
-                    ),
-                ],
-                vectorizer_config=weaviate.classes.config.Configure.Vectorizer.none()
-            )
+            if not exists:
+                self.weaviate_client.collections.create(
+                    name=collection_name,
+                    properties=[
+                        weaviate.classes.config.Property(
+                            name="content", 
+                            data_type=weaviate.classes.config.DataType.TEXT
+                        ),
+                        weaviate.classes.config.Property(
+                            name="file_name", 
+                            data_type=weaviate.classes.config.DataType.TEXT,
+                            # Whole-value matching, so deleting "report.pdf" never hits "old report.pdf"
+                            tokenization=weaviate.classes.config.Tokenization.FIELD
+                        ),
+                        weaviate.classes.config.Property(
+                            name="page_number", 
+                            data_type=weaviate.classes.config.DataType.INT
+                        ),
+                        weaviate.classes.config.Property(
+                            name="document_type", 
+                            data_type=weaviate.classes.config.DataType.TEXT
+                        ),
+                        weaviate.classes.config.Property(
+                            name="type", 
+                            data_type=weaviate.classes.config.DataType.TEXT
+                        ),
+                    ],
+                    vectorizer_config=weaviate.classes.config.Configure.Vectorizer.none()
+                )
             
-            self.vector_store = WeaviateVectorStore(
+            vector_store = WeaviateVectorStore(
                 weaviate_client=self.weaviate_client,
                 index_name=collection_name,
                 text_key="content"
             )
             
-            logger.info(f"✅ Created collection: {collection_name}")
+            logger.info(f"✅ Using collection: {collection_name}")
+            return vector_store
             
         except Exception as e:
             logger.error(f"❌ Error setting up collection: {str(e)}")
             raise
 
-    def process_documents(self, file_paths: Dict[str, str]):
-        """Process uploaded documents and build index"""
+    def _load_documents(self, file_paths: Dict[str, Union[str, BinaryIO]]) -> List:
+        """Parse uploaded files into documents, skipping unsupported or unreadable ones"""
         all_documents = []
         
-        # Clear previous exact Q&A pairs
-        self.exact_qa_pairs = {}
-        
         for filename, filepath in file_paths.items():
             logger.info(f"Processing file: {filename}")
             
             try:
-                if filename.lower().endswith('.pdf'):
-                    docs = self.doc_processor.extract_text_from_pdf(filepath, filename)
-                    all_documents.extend(docs)
-                elif filename.lower().endswith('.csv'):
-                    docs = self.doc_processor.load_qa_from_csv(filepath)
-                    all_documents.extend(docs)
-                    # Store Q&A pairs for exact matching
-                    self._store_exact_qa_pairs(docs)
-                elif filename.lower().endswith(('.xlsx', '.xls')):
-                    docs = self.doc_processor.load_qa_from_excel(filepath)
-                    all_documents.extend(docs)
-                    # Store Q&A pairs for exact matching
-                    self._store_exact_qa_pairs(docs)
-                else:
-                    logger.warning(f"Skipping unsupported file type: {filename}")
-                    
+                all_documents.extend(self.doc_processor.load_file(filepath, filename))
             except Exception as e:
                 logger.error(f"Error processing {filename}: {str(e)}")
                 continue
-                
+        
+        return all_documents
+
+    def process_documents(self, file_paths: Dict[str, Union[str, BinaryIO]], replace: bool = False):
+        """Process uploaded documents and build index.
+
+        Values may be file paths or open binary streams (e.g. an upload's spool).
+        With replace, only the given files' existing chunks and Q&A pairs are
+        swapped out, in place: the new chunks are added before the stale ones
+        are deleted, and nothing else is touched. Without it a new snapshot is
+        built in the background and swapped in when complete, so queries keep
+        being answered from the previous one meanwhile. Shared collections
+        cannot be rebuilt aside, so there a full ingest also replaces the
+        given files in place: re-uploading a file never leaves both versions.
+        Returns (document count, node count, dedup stats).
+        """
+        # Parse before touching existing data so a bad file never loses the old version
+        all_documents = self._load_documents(file_paths)
         if not all_documents:
             raise ValueError("No documents could be processed successfully")
+        
+        with self._ingest_lock:
+            if replace:
+                snapshot, _ = self._edit_snapshot(exclude_files=set(file_paths))
+            else:
+                snapshot = self._new_snapshot()
+            in_place = snapshot.vector_stores is self.snapshots.current.vector_stores
+            if in_place:
+                # Before new chunks with the same IDs overwrite the old ones and their merge record
+                self._rehome_duplicates(snapshot, set(file_paths))
+            try:
+                result, node_ids = self._index_documents(all_documents, snapshot)
+            except Exception:
+                self._drop_collections(snapshot)
+                raise
+            if in_place:
+                # The collections are edited in place: new chunks went in first, now drop the stale ones
+                for filename in file_paths:
+                    self._delete_file_nodes(snapshot.vector_stores, filename, keep_node_ids=node_ids)
+            self._commit_snapshot(snapshot, set(file_paths))
+            return result
 
-        logger.info(f"Loaded {len(all_documents)} documents")
-        logger.info(f"Stored {len(self.exact_qa_pairs)} exact Q&A pairs")
-        logger.info(f"all docsa re {all_documents}")
+    def _index_documents(self, all_documents: List, snapshot: IndexSnapshot):
+        """Store Q&A pairs and embed chunks of all_documents into snapshot.
+
+        Returns ((document count, node count, dedup stats), ids of the indexed nodes).
+        """
+        # Store Q&A pairs for exact matching
+        self._store_exact_qa_pairs(all_documents, snapshot.exact_qa_pairs)
         
-        # Create nodes from documents
-        nodes = self.doc_processor.create_nodes_with_metadata(all_documents)
-        logger.info(f"Created {len(nodes)} nodes")
+        logger.info(f"Loaded {len(all_documents)} documents")
+        logger.info(f"Stored {len(snapshot.exact_qa_pairs)} exact Q&A pairs")
         
-        # Build the index and engines
-        self.build_index_and_engines(nodes)
+        nodes_by_type, dedup_stats = chunk_documents(
+            self.doc_processor, all_documents, self.context_packer.count_tokens
+        )
+        node_count = sum(len(nodes) for nodes in nodes_by_type.values())
+        logger.info(f"Created {node_count} nodes (dedup: {dedup_stats})")
         
-        return len(all_documents), len(nodes)
-
-    def _store_exact_qa_pairs(self, documents):
-        """Store Q&A pairs for exact matching with length limits"""
-        for doc in documents:
-            if doc.metadata.get('type') == 'qa_pair':
-                original_q = doc.metadata.get('original_question', '').strip()
-                original_a = doc.metadata.get('original_answer', '').strip()
-                
-                if original_q and original_a:
-                    # Ensure reasonable lengths for storage
-                    if len(original_q) > 300:
-                        original_q = original_q[:300] + "..."
-                    if len(original_a) > 1000:
-                        original_a = original_a[:1000] + "..."
-                        
-                    question_key = original_q.lower()
-                    self.exact_qa_pairs[question_key] = {
-                        'original_question': original_q,
-                        'original_answer': original_a,
-                        'source': doc.metadata.get('source', ''),
-                        'file_name': doc.metadata.get('file_name', ''),
-                        'page_number': doc.metadata.get('page_number', 1),
-                        'document_type': doc.metadata.get('document_type', ''),
-                        'sheet_name': doc.metadata.get('sheet_name', '')[:20] if doc.metadata.get('sheet_name') else ''
-                    }
-
-    def find_exact_match(self, question: str) -> Optional[Dict[str, Any]]:
-        """Find exact question match in stored Q&A pairs"""
-        question_clean = question.strip().lower()
+        # Embed the chunks into the per-type indexes
+        self.build_indexes(nodes_by_type, snapshot)
         
-        # Direct exact match
-        if question_clean in self.exact_qa_pairs:
-            match = self.exact_qa_pairs[question_clean]
-            logger.info(f"🎯 Found EXACT match for: '{question[:50]}...'")
-            return {
-                'answer': match['original_answer'],
-                'source': match,
-                'match_type': 'exact'
+        node_ids = {node.node_id for nodes in nodes_by_type.values() for node in nodes}
+        return (len(all_documents), node_count, dedup_stats), node_ids
+
+    def _commit_snapshot(self, snapshot: IndexSnapshot, changed_files: Set[str]):
+        """Publish changed_files' Q&A pairs to the other workers and make snapshot live.
+
+        The shared index gets changed_files' pairs swapped for the snapshot's,
+        on top of the latest version any worker published.
+        """
+        if self.shared_qa_index is not None:
+            # An ambiguous key keeps the entry stored first, which may be another file's
+            added = {
+                question_key: qa_data for question_key, qa_data in snapshot.exact_qa_pairs.items()
+                if qa_data['file_name'] in changed_files or qa_data['ambiguous']
             }
+            snapshot.exact_qa_pairs = self.shared_qa_index.update(remove_files=changed_files, added=added)
+        self._swap_snapshot(snapshot)
+
+    def _edit_snapshot(self, exclude_files: Set[str]) -> Tuple[IndexSnapshot, int]:
+        """New snapshot over the live collections, without exclude_files' Q&A pairs.
+
+        The collections are shared with the live snapshot rather than copied,
+        so an edit costs only the files it touches; the caller changes their
+        nodes in place and queries see the change as it is made.
+        Returns the snapshot and the number of Q&A pairs left out.
+        """
+        current = self.snapshots.current
+        snapshot = IndexSnapshot(
+            self.snapshots.next_version(), dict(current.indexes), current.vector_stores, CompactQAStore()
+        )
+        qa_pairs_removed = 0
+        for question_key, qa_data in current.exact_qa_pairs.items():
+            if qa_data['file_name'] in exclude_files:
+                qa_pairs_removed += 1
+            else:
+                snapshot.exact_qa_pairs[question_key] = qa_data
+        return snapshot, qa_pairs_removed
+
+    def stored_nodes(self, content_type: str, snapshot: IndexSnapshot, file_name: Optional[str] = None) -> Iterator[TextNode]:
+        """Every node of a snapshot's content type (or of one file), with its embedding, read back from the store"""
+        vector_store = snapshot.vector_stores[content_type]
+        if getattr(vector_store, "stores_text", False):
+            # Weaviate: page through the collection with vectors, as the store's own queries parse them
+            from llama_index.vector_stores.weaviate.utils import to_node
+            collection = self.weaviate_client.collections.get(vector_store.index_name)
+            if file_name is None:
+                for obj in collection.iterator(include_vector=True):
+                    yield to_node(dict(obj.__dict__), text_key=vector_store.text_key)
+                return
+            # The cursor iterator takes no filter, so one file's nodes are paged by offset
+            from weaviate.classes.query import Filter
+            offset = 0
+            while True:
+                response = self.backends["ingest"].call(
+                    collection.query.fetch_objects, filters=Filter.by_property("file_name").equal(file_name),
+                    include_vector=True, limit=STORED_NODES_PAGE, offset=offset
+                )
+                for obj in response.objects:
+                    yield to_node(dict(obj.__dict__), text_key=vector_store.text_key)
+                if len(response.objects) < STORED_NODES_PAGE:
+                    return
+                offset += STORED_NODES_PAGE
+        # Stores without text keep the nodes in the index's docstore
+        for node in snapshot.indexes[content_type].docstore.docs.values():
+            if file_name is None or node.metadata.get("file_name") == file_name:
+                yield node.model_copy(update={"embedding": vector_store.get(node.node_id)})
+
+    def _rehome_duplicates(self, snapshot: IndexSnapshot, file_names: Set[str]):
+        """Before file_names' nodes go, re-store chunks other files' duplicates were merged into under one of those files.
+
+        Deduplication keeps one chunk for content several files share, so
+        deleting or replacing the file that owns it would otherwise take the
+        other files' copy out of the index too. Stored embeddings are reused.
+        """
+        rehomed_count = 0
+        for content_type in snapshot.vector_stores:
+            if content_type not in snapshot.indexes:
+                continue
+            for file_name in file_names:
+                rehomed = [
+                    copy for copy in (
+                        rehomed_duplicate(node, file_names)
+                        for node in self.stored_nodes(content_type, snapshot, file_name)
+                        if node.metadata.get("duplicate_files")
+                    ) if copy is not None
+                ]
+                if rehomed:
+                    self.build_indexes({content_type: rehomed}, snapshot)
+                    rehomed_count += len(rehomed)
+        if rehomed_count:
+            logger.info(f"♻️ Kept {rehomed_count} shared chunks for the files they were merged from")
+
+    def _store_exact_qa_pairs(self, documents, qa_pairs: CompactQAStore):
+        """Store Q&A pairs for exact matching"""
+        store_qa_documents(documents, qa_pairs)
+
+    def delete_document(self, file_name: str) -> Dict[str, Any]:
+        """Remove one file's chunks and Q&A pairs without touching any other file's"""
+        with self._ingest_lock:
+            snapshot, qa_pairs_removed = self._edit_snapshot(exclude_files={file_name})
+            self._rehome_duplicates(snapshot, {file_name})
+            self._delete_file_nodes(snapshot.vector_stores, file_name)
+            self._commit_snapshot(snapshot, {file_name})
         
-        # Very high similarity matching (95%+ similarity)
-        best_match = None
-        best_ratio = 0
-        
-        for stored_question, qa_data in self.exact_qa_pairs.items():
-            # Use sequence matching for similarity
-            ratio = difflib.SequenceMatcher(None, question_clean, stored_question).ratio()
-            if ratio > best_ratio:
-                best_ratio = ratio
-                best_match = qa_data
-        
-        # Only accept very high similarity (95%+) for exact match category
-        if best_match and best_ratio >= 0.95:
-            logger.info(f"🔍 Found FUZZY EXACT match (similarity: {best_ratio:.3f}) for: '{question[:50]}...'")
-            return {
-                'answer': best_match['original_answer'],
-                'source': best_match,
-                'match_type': 'fuzzy_exact',
-                'similarity': best_ratio
-            }
+        logger.info(f"🗑️ Deleted {file_name} ({qa_pairs_removed} Q&A pairs)")
+        return {"file_name": file_name, "qa_pairs_removed": qa_pairs_removed}
+
+    def _delete_file_nodes(self, vector_stores: Dict[str, Any], file_name: str, keep_node_ids: Optional[Set[str]] = None):
+        """Delete file_name's nodes from vector stores in place, except the nodes in keep_node_ids"""
+        if keep_node_ids:
+            from weaviate.classes.query import Filter
+            where = Filter.by_property("file_name").equal(file_name) & Filter.by_id().contains_none(list(keep_node_ids))
+            for vector_store in vector_stores.values():
+                collection = self.weaviate_client.collections.get(vector_store.index_name)
+                self.backends["ingest"].call(collection.data.delete_many, where=where)
+            return
         
-        logger.info(f"❌ No exact match found for: '{question[:50]}...'. Best similarity: {best_ratio:.3f}")
-        return None
+        file_filter = MetadataFilters(filters=[
+            MetadataFilter(key='file_name', value=file_name, operator=FilterOperator.EQ)
+        ])
+        for vector_store in vector_stores.values():
+            self.backends["ingest"].call(vector_store.delete_nodes, filters=file_filter)
 
-    def build_index_and_engines(self, nodes: List[TextNode]):
-        """Build vector index and create query/chat engines"""
+    def _refresh_shared_qa_pairs(self):
+        """Switch to the newest shared Q&A index published by any worker"""
+        if self.shared_qa_index is None:
+            return
+        shared = self.shared_qa_index.current()
+        current = self.snapshots.current
+        if shared is None or shared is current.exact_qa_pairs:
+            return
+        # A local ingest in progress publishes its own version when done; don't wait for it
+        if not self._ingest_lock.acquire(blocking=False):
+            return
         try:
-            # Build vector index
-            storage_context = StorageContext.from_defaults(vector_store=self.vector_store)
-            self.index = VectorStoreIndex(nodes, storage_context=storage_context)
-            
-            # Create query engine for semantic search
-            self.query_engine = self.index.as_query_engine(
-                similarity_top_k=5,
-                response_mode="compact",
-                node_postprocessors=[
-                    SimilarityPostprocessor(similarity_cutoff=0.7)  # Moderate threshold for semantic
-                ]
-            )
-            
-            # Create chat engine for conversation memory
-            self.chat_engine = self.index.as_chat_engine(
-                chat_mode="condense_plus_context",
-                memory=self.chat_memory,
-                verbose=True,
-                similarity_top_k=5,
-                node_postprocessors=[
-                    SimilarityPostprocessor(similarity_cutoff=0.7)
-                ]
+            current = self.snapshots.current
+            if shared is current.exact_qa_pairs:
+                return
+            # Another worker may have ingested into the shared collections
+            indexes = dict(current.indexes)
+            for content_type, vector_store in current.vector_stores.items():
+                if content_type not in indexes:
+                    indexes[content_type] = VectorStoreIndex.from_vector_store(vector_store)
+            snapshot = IndexSnapshot(self.snapshots.next_version(), indexes, current.vector_stores, shared)
+            self._swap_snapshot(snapshot)
+        finally:
+            self._ingest_lock.release()
+
+    def find_exact_match(
+        self,
+        question: str,
+        filters: Optional[Dict[str, Any]] = None,
+        qa_pairs=None
+    ) -> Optional[Dict[str, Any]]:
+        """Find exact question match in stored Q&A pairs, restricted to pairs matching filters"""
+        qa_pairs = self.exact_qa_pairs if qa_pairs is None else qa_pairs
+        return match_question(question, qa_pairs, filters)
+
+    def _build_metadata_filters(self, filters: Optional[Dict[str, Any]]) -> Optional[MetadataFilters]:
+        """Translate query filters into vector-store metadata filters"""
+        if not filters:
+            return None
+        
+        metadata_filters = [
+            MetadataFilter(key=key, value=filters[key], operator=FilterOperator.EQ)
+            for key in ('file_name', 'document_type', 'type')
+            if filters.get(key)
+        ]
+        if filters.get('page_from') is not None:
+            metadata_filters.append(
+                MetadataFilter(key='page_number', value=filters['page_from'], operator=FilterOperator.GTE)
             )
-            
-            # Create agentic tools
-            from llama_index.core.tools import QueryEngineTool, ToolMetadata
-            
-            query_tool = QueryEngineTool(
-                query_engine=self.query_engine,
-                metadata=ToolMetadata(
-                    name="document_search",
-                    description="Search through uploaded documents to find relevant information and citations"
-                )
+        if filters.get('page_to') is not None:
+            metadata_filters.append(
+                MetadataFilter(key='page_number', value=filters['page_to'], operator=FilterOperator.LTE)
             )
+        
+        return MetadataFilters(filters=metadata_filters) if metadata_filters else None
+
+    def build_indexes(self, nodes_by_type: Dict[str, List[TextNode]], snapshot: Optional[IndexSnapshot] = None):
+        """Embed nodes into a snapshot's per-type vector indexes (the live one by default)"""
+        snapshot = snapshot or self.snapshots.current
+        try:
+            # Build a vector index per content type that received nodes
+            for content_type, nodes in nodes_by_type.items():
+                if not nodes:
+                    continue
+                index = snapshot.indexes.get(content_type)
+                if index is None:
+                    storage_context = StorageContext.from_defaults(vector_store=snapshot.vector_stores[content_type])
+                    index = VectorStoreIndex([], storage_context=storage_context)
+                # Embed in batches, each under an ingest slot of the model-call governor.
+                # Node IDs are deterministic, so a retried batch overwrites rather than duplicates.
+                for start in range(0, len(nodes), INGEST_BATCH_SIZE):
+                    with self.admission.slot("ingest"):
+                        self.backends["ingest"].call(index.insert_nodes, nodes[start:start + INGEST_BATCH_SIZE])
+                snapshot.indexes[content_type] = index
             
-            # Create simple agent (fallback if ReAct agent fails)
-            try:
-                from llama_index.core.agent import ReActAgent
-                self.agent = ReActAgent.from_tools(
-                    [query_tool],
-                    llm=self.llm,
-                    verbose=True,
-                    max_iterations=3
-                )
-            except Exception as e:
-                logger.warning(f"Could not create ReAct agent, using simple query engine: {e}")
-                self.agent = None
-            
-            logger.info("✅ Successfully built index, query engine, chat engine, and agent")
+            logger.info(f"✅ Successfully built indexes for v{snapshot.version}: {sorted(snapshot.indexes)}")
             
         except Exception as e:
-            logger.error(f"❌ Error building engines: {str(e)}")
+            logger.error(f"❌ Error building indexes: {str(e)}")
             raise
 
-    def chat(self, message: str, use_agent: bool = True) -> Dict[str, Any]:
-        """2-Priority Hybrid Search: 1) Exact Match 2) Single Best Semantic Match"""
-        if not self.chat_engine:
+    def chat(
+        self,
+        message: str,
+        use_agent: bool = True,
+        filters: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, Any]:
+        """2-Priority Hybrid Search: 1) Exact Match 2) Single Best Semantic Match
+
+        With use_agent, a multi-part question that misses the exact match is
+        split into sub-queries that are retrieved concurrently and answered
+        with one synthesis (see agent.py). Optional filters (file_name, document_type, type, page_from, page_to)
+        scope both the exact-match lookup and the vector search. With a
+        deadline, steps that no longer fit the remaining budget are skipped
+        and the best retrieved answer is returned flagged as degraded.
+        """
+        deadline = deadline or Deadline(None)
+        self._refresh_shared_qa_pairs()
+        # Pin one snapshot so an ingest swapping in a new one never changes data mid-query
+        with self.snapshots.pinned() as snapshot:
+            return self._answer(message, filters, deadline, snapshot, use_agent)
+
+    def _answer(
+        self,
+        message: str,
+        filters: Optional[Dict[str, Any]],
+        deadline: Deadline,
+        snapshot: IndexSnapshot,
+        use_agent: bool = False
+    ) -> Dict[str, Any]:
+        """Run the hybrid search against one pinned snapshot"""
+        if not snapshot.indexes:
             raise ValueError("System not initialized. Please upload documents first.")
         
         try:
@@ -288,80 +598,42 @@ class AgenticRAGSystem:
             self.conversation_history.append({"role": "user", "content": message})
             
             # PRIORITY 1: Try exact question matching first
-            exact_match = self.find_exact_match(message)
+            exact_match = self.find_exact_match(message, filters, snapshot.exact_qa_pairs)
             
             if exact_match:
-                response_text = exact_match['answer']
-                sources = [{
-                    'file_name': exact_match['source']['file_name'],
-                    'page_number': exact_match['source']['page_number'],
-                    'document_type': 'exact_match',
-                    'source': exact_match['source']['source'],
-                    'match_type': exact_match['match_type'],
-                    'similarity_score': exact_match.get('similarity', 1.0),
-                    'original_question': exact_match['source']['original_question'],
-                    'original_answer': exact_match['source']['original_answer']
-                }]
+                result = {
+                    "answer": exact_match['answer'],
+                    "sources": [exact_source(exact_match)],
+                    "prompt_tokens": 0,
+                    "degraded": False
+                }
                 
                 logger.info(f"✅ PRIORITY 1: Exact match found ({exact_match['match_type']})")
                 
-            else:
-                # PRIORITY 2: Single best semantic search (top_k=1)
-                logger.info("PRIORITY 2: Using semantic search with top_k=1...")
-                
-                # Create a single-result query engine for this specific query
-                single_result_engine = self.index.as_query_engine(
-                    similarity_top_k=1,  # Only get the single best match
-                    response_mode="compact",
-                    node_postprocessors=[
-                        SimilarityPostprocessor(similarity_cutoff=0.75)  # High threshold
-                    ]
-                )
-                
-                response = single_result_engine.query(message)
-                response_text = str(response)
-                sources = self._extract_sources_from_response(response)
+            elif not deadline.allows(MIN_RETRIEVAL_MS):
+                logger.info(f"⏱️ PRIORITY 2 skipped: {deadline.remaining_ms():.0f}ms left")
+                result = self._no_answer(degraded=True)
                 
-                # Check if the single semantic result is good enough
-                if sources and len(sources) > 0:
-                    best_source = sources[0]
-                    similarity_score = best_source.get('similarity_score', 0)
-                    
-                    logger.info(f"Best semantic match similarity: {similarity_score}")
-                    
-                    # If similarity is high enough, use it
-                    if similarity_score >= 0.75:  # High similarity threshold
-                        logger.info("✅ PRIORITY 2: High-similarity semantic match found")
-                        
-                        # If it's from Q&A pairs, use the exact answer
-                        if 'original_answer' in best_source:
-                            response_text = best_source['original_answer']
-                            logger.info("Using exact answer from Q&A pair")
-                        
-                        # Mark as semantic match
-                        for source in sources:
-                            source['match_type'] = 'semantic_high'
-                            
+            else:
+                with self.admission.slot("chat", timeout=deadline.remaining_ms() / 1000):
+                    agent = getattr(self, "agent", None)
+                    plan = agent.plan(message, deadline) if use_agent and agent is not None else None
+                    if plan and len(plan["sub_queries"]) > 1:
+                        # Multi-part question: parallel sub-query retrieval, one synthesis
+                        result = agent.run(message, plan, filters, deadline, snapshot)
                     else:
-                        # Similarity too low
-                        logger.info(f"❌ PRIORITY 2: Similarity too low ({similarity_score:.2f} < 0.75)")
-                        response_text = "No information available in our RAG system."
-                        sources = []
-                else:
-                    # No semantic matches found
-                    logger.info("❌ PRIORITY 2: No semantic matches found")
-                    response_text = "No information available in our RAG system."
-                    sources = []
+                        # PRIORITY 2: Semantic search routed through the per-type indexes
+                        result = self._route_semantic_search(message, filters, deadline, snapshot.indexes)
             
             # Store assistant response
-            self.conversation_history.append({"role": "assistant", "content": response_text})
+            self.conversation_history.append({"role": "assistant", "content": result["answer"]})
             
-            return {
-                "answer": response_text,
-                "sources": sources,
-                "conversation_id": len(self.conversation_history) // 2
-            }
+            result["conversation_id"] = len(self.conversation_history) // 2
+            return result
             
+        except AdmissionRejected:
+            # Shed load quickly instead of answering with a generic apology
+            raise
         except Exception as e:
             logger.error(f"❌ Error during hybrid search: {str(e)}")
             return {
@@ -370,28 +642,168 @@ class AgenticRAGSystem:
                 "conversation_id": len(self.conversation_history) // 2
             }
 
-    def _extract_sources_from_response(self, response) -> List[Dict[str, Any]]:
-        """Extract source citations from response with original answer extraction"""
+    def _no_answer(self, degraded: bool = False) -> Dict[str, Any]:
+        return {
+            "answer": "No information available in our RAG system.",
+            "sources": [],
+            "prompt_tokens": 0,
+            "degraded": degraded
+        }
+
+    def _route_order(self, filters: Optional[Dict[str, Any]], indexes: Optional[Dict[str, VectorStoreIndex]] = None) -> List[str]:
+        """Indexes to search for a query, cheapest first, skipping ones the filters exclude"""
+        indexes = self.indexes if indexes is None else indexes
+        route = list(INDEX_LAYOUT)
+        if filters:
+            if filters.get('type') == 'qa_pair' or filters.get('document_type') in ('csv', 'excel'):
+                route = ["qa"]
+            elif filters.get('type') or filters.get('document_type') == 'pdf':
+                route = ["pdf"]
+        return [content_type for content_type in route if content_type in indexes]
+
+    def _route_semantic_search(
+        self,
+        message: str,
+        filters: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None,
+        indexes: Optional[Dict[str, VectorStoreIndex]] = None
+    ) -> Dict[str, Any]:
+        """Search the small Q&A index first and fall back to document chunks only on a miss.
+
+        prompt_tokens in the result is 0 unless an answer had to be
+        synthesized by the LLM.
+        """
+        hit = self._retrieve_relevant(message, filters, deadline, indexes)
+        if not hit["nodes"]:
+            return self._no_answer(degraded=hit["degraded"])
+        
+        sources = hit["sources"]
+        # If it's from Q&A pairs, use the exact answer
+        if 'original_answer' in sources[0]:
+            logger.info("Using exact answer from Q&A pair")
+            return {"answer": sources[0]['original_answer'], "sources": sources, "prompt_tokens": 0, "degraded": False}
+        
+        return self._synthesize(message, hit["nodes"], sources, deadline or Deadline(None))
+
+    def _retrieve_relevant(
+        self,
+        message: str,
+        filters: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None,
+        indexes: Optional[Dict[str, VectorStoreIndex]] = None
+    ) -> Dict[str, Any]:
+        """Route message through the per-type indexes, cheapest first.
+
+        Returns the above-cutoff nodes and their sources from the first index
+        with a high-similarity match (both empty on a miss), and whether the
+        search was cut short by the deadline or a failing backend.
+        """
+        deadline = deadline or Deadline(None)
+        indexes = self.indexes if indexes is None else indexes
+        metadata_filters = self._build_metadata_filters(filters)
+        miss = {"nodes": [], "sources": [], "degraded": False}
+        
+        for content_type in self._route_order(filters, indexes):
+            layout = INDEX_LAYOUT[content_type]
+            cutoff = layout["similarity_cutoff"]
+            logger.info(f"PRIORITY 2: Searching {content_type} index with top_k={layout['top_k']}...")
+            
+            retriever = indexes[content_type].as_retriever(
+                similarity_top_k=layout["top_k"],
+                filters=metadata_filters
+            )
+            try:
+                retrieved = self.backends["retrieval"].call(retriever.retrieve, message, deadline=deadline)
+            except DeadlineExceeded:
+                logger.info(f"⏱️ PRIORITY 2: {content_type} retrieval ran out of time")
+                return {"nodes": [], "sources": [], "degraded": True}
+            except BackendUnavailable as e:
+                logger.warning(f"⚠️ PRIORITY 2: {content_type} retrieval failed: {e}")
+                miss["degraded"] = True
+                continue
+            sources = self._sources_from_nodes(retrieved)
+            
+            if not sources:
+                logger.info(f"❌ PRIORITY 2: No semantic matches in {content_type} index")
+                continue
+            
+            best_source = sources[0]
+            similarity_score = best_source.get('similarity_score') or 0
+            logger.info(f"Best semantic match similarity in {content_type} index: {similarity_score}")
+            
+            if similarity_score < cutoff:
+                logger.info(f"❌ PRIORITY 2: Similarity too low ({similarity_score:.2f} < {cutoff})")
+                if not deadline.allows(MIN_RETRIEVAL_MS):
+                    return {"nodes": [], "sources": [], "degraded": True}
+                continue
+            
+            logger.info(f"✅ PRIORITY 2: High-similarity semantic match found in {content_type} index")
+            
+            # Only chunks above the cutoff are cited and sent to the LLM
+            relevant = [node for node in retrieved if (node.score or 0) >= cutoff]
+            sources = sources[:len(relevant)]
+            
+            # Mark as semantic match
+            for source in sources:
+                source['match_type'] = 'semantic_high'
+            
+            return {"nodes": relevant, "sources": sources, "degraded": False}
+        
+        return miss
+
+    def _synthesize(self, message: str, nodes, sources: List[Dict[str, Any]], deadline: Deadline) -> Dict[str, Any]:
+        """Answer from a token-budgeted packing of the retrieved chunks.
+
+        Falls back to the most relevant sentences of the best chunk when the
+        deadline leaves too little time for the LLM, the LLM overruns it or
+        the LLM is unavailable.
+        """
+        packed = self.context_packer.pack(message, nodes)
+        prompt_text = context_prompt.format(context=packed["context"], query=message)
+        prompt_tokens = self.context_packer.count_tokens(prompt) + self.context_packer.count_tokens(prompt_text)
+        
+        if deadline.allows(MIN_SYNTHESIS_MS):
+            logger.info(f"Synthesizing answer with {prompt_tokens} prompt tokens ({packed['context_tokens']} context)")
+            try:
+                response = self.backends["llm"].call(
+                    Settings.llm.complete, prompt_text, deadline=deadline, idempotent=False
+                )
+                return {"answer": response.text, "sources": sources, "prompt_tokens": prompt_tokens, "degraded": False}
+            except DeadlineExceeded:
+                logger.info("⏱️ LLM synthesis overran the deadline, returning best chunk")
+            except BackendUnavailable as e:
+                logger.warning(f"⚠️ LLM unavailable ({e}), returning best chunk")
+        else:
+            logger.info(f"⏱️ Skipping LLM synthesis: {deadline.remaining_ms():.0f}ms left")
+        
+        best_chunk = self.context_packer.pack(message, nodes[:1])
+        return {"answer": best_chunk["context"], "sources": sources[:1], "prompt_tokens": 0, "degraded": True}
+
+    def _sources_from_nodes(self, source_nodes) -> List[Dict[str, Any]]:
+        """Build source citations from retrieved nodes"""
         sources = []
         
-        if hasattr(response, 'source_nodes'):
-            for node in response.source_nodes:
-                source_info = {
-                    "file_name": node.metadata.get("file_name", "Unknown"),
-                    "page_number": node.metadata.get("page_number", "Unknown"),
-                    "document_type": node.metadata.get("document_type", "Unknown"),
-                    "source": node.metadata.get("source", "Unknown"),
-                    "type": node.metadata.get("type", "Unknown"),
-                    "similarity_score": getattr(node, 'score', None)
-                }
+        for node in source_nodes:
+            source_info = {
+                "file_name": node.metadata.get("file_name", "Unknown"),
+                "page_number": node.metadata.get("page_number", "Unknown"),
+                "document_type": node.metadata.get("document_type", "Unknown"),
+                "source": node.metadata.get("source", "Unknown"),
+                "type": node.metadata.get("type", "Unknown"),
+                "similarity_score": getattr(node, 'score', None)
+            }
+            
+            # Near-duplicates merged into this chunk at ingest
+            if node.metadata.get('duplicate_sources'):
+                source_info['also_found_in'] = node.metadata['duplicate_sources']
+            
+            # Add original Q&A if available
+            if 'original_question' in node.metadata:
+                source_info['original_question'] = node.metadata['original_question']
+            if 'original_answer' in node.metadata:
+                source_info['original_answer'] = node.metadata['original_answer']
                 
-                # Add original Q&A if available
-                if 'original_question' in node.metadata:
-                    source_info['original_question'] = node.metadata['original_question']
-                if 'original_answer' in node.metadata:
-                    source_info['original_answer'] = node.metadata['original_answer']
-                    
-                sources.append(source_info)
+            sources.append(source_info)
         
         return sources
 
@@ -443,12 +855,15 @@ class AgenticRAGSystem:
         return self.conversation_history.copy()
 
     def clear_conversation_history(self):
-        """Clear conversation history and memory"""
+        """Clear conversation history"""
         self.conversation_history = []
-        if self.chat_memory:
-            self.chat_memory.reset()
         logger.info("Conversation history cleared")
 
-    def query_with_citations(self, question: str) -> Dict[str, Any]:
+    def query_with_citations(
+        self,
+        question: str,
+        filters: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Dict[str, Any]:
         """Direct query method for backward compatibility"""
-        return self.chat(question, use_agent=False)
\ No newline at end of file
+        return self.chat(question, use_agent=False, filters=filters, deadline=deadline)
\ No newline at end of file
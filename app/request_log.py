@@ -0,0 +1,66 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import logging
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# JSONL file that /chat/ and /ask_question/ traffic is appended to (unset = recording off)
+REQUEST_LOG_PATH = os.getenv("REQUEST_LOG_PATH")
+# Set REQUEST_LOG_QUESTIONS=0 to record timings and outcomes without the question text
+REQUEST_LOG_QUESTIONS = os.getenv("REQUEST_LOG_QUESTIONS", "1") == "1"
+
+
+def match_type_of(result: Dict[str, Any]) -> str:
+    """Which answer path served a chat result: exact, fuzzy_exact, semantic_high or no_answer"""
+    sources = result.get("sources") or []
+    if not sources:
+        return "no_answer"
+    return sources[0].get("match_type", "semantic_high")
+
+
+class RequestRecorder:
+    """Appends one JSON line per question request, for later replay with benchmarks/replay.py"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+        logger.info(f"📝 Recording chat traffic to {path}")
+
+    def record(
+        self,
+        endpoint: str,
+        question: str,
+        latency_ms: float,
+        status: int,
+        use_agent: Optional[bool] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        deadline_ms: Optional[int] = None,
+        result: Optional[Dict[str, Any]] = None
+    ):
+        entry = {
+            "ts": time.time(),
+            "endpoint": endpoint,
+            "question": question if REQUEST_LOG_QUESTIONS else None,
+            "use_agent": use_agent,
+            "filters": filters,
+            "deadline_ms": deadline_ms,
+            "latency_ms": round(latency_ms, 1),
+            "status": status,
+            "match_type": match_type_of(result) if result is not None else None,
+            "degraded": result.get("degraded", False) if result is not None else None
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        try:
+            with self._lock:
+                self._file.write(line)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not record request: {e}")
+
+
+request_recorder = RequestRecorder(REQUEST_LOG_PATH) if REQUEST_LOG_PATH else None
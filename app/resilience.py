@@ -0,0 +1,370 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+import profiling
+from deadline import Deadline, DeadlineExceeded
+
+import logging
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Per-backend call policy. timeout is per attempt (seconds); hedge sends a duplicate
+# request when an attempt is slower than hedge_after_ms, or than the backend's
+# observed p95 when that is 0. Only idempotent reads are hedged. max_in_flight caps
+# the attempts running against the backend at once, including ones a caller has
+# stopped waiting for, so timed-out calls cannot pile up past the admission limit.
+BACKEND_POLICIES = {
+    "retrieval": {
+        "timeout": float(os.getenv("RETRIEVAL_TIMEOUT", "5")),
+        "retries": int(os.getenv("RETRIEVAL_RETRIES", "2")),
+        "hedge": os.getenv("RETRIEVAL_HEDGE", "1") == "1",
+        "hedge_after_ms": float(os.getenv("RETRIEVAL_HEDGE_AFTER_MS", "0")),
+        "max_in_flight": int(os.getenv("RETRIEVAL_MAX_IN_FLIGHT", "16"))
+    },
+    "llm": {
+        "timeout": float(os.getenv("LLM_TIMEOUT", "30")),
+        "retries": int(os.getenv("LLM_RETRIES", "1")),
+        "hedge": os.getenv("LLM_HEDGE", "0") == "1",
+        "hedge_after_ms": float(os.getenv("LLM_HEDGE_AFTER_MS", "0")),
+        "max_in_flight": int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+    },
+    "ingest": {
+        "timeout": float(os.getenv("INGEST_TIMEOUT", "120")),
+        "retries": int(os.getenv("INGEST_RETRIES", "3")),
+        "hedge": False,
+        "hedge_after_ms": 0.0,
+        "max_in_flight": int(os.getenv("INGEST_MAX_IN_FLIGHT", "8"))
+    },
+}
+# Consecutive failures that open a backend's circuit, and how long it stays open (seconds)
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+# Backoff before retry n is uniform in [0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2**n)]
+RETRY_BACKOFF_BASE = float(os.getenv("RETRY_BACKOFF_BASE", "0.1"))
+RETRY_BACKOFF_MAX = float(os.getenv("RETRY_BACKOFF_MAX", "2"))
+# Same for retries after a rate limit (429 / RESOURCE_EXHAUSTED), which need longer to clear
+RATE_LIMIT_BACKOFF_BASE = float(os.getenv("RATE_LIMIT_BACKOFF_BASE", "1"))
+RATE_LIMIT_BACKOFF_MAX = float(os.getenv("RATE_LIMIT_BACKOFF_MAX", "8"))
+# Successful latencies kept per backend for the hedge delay; fewer than
+# HEDGE_MIN_SAMPLES means no hedging on the observed p95 yet
+LATENCY_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+
+T = TypeVar("T")
+
+# Threads that run backend attempts so callers can stop waiting on a slow one; sized
+# for the sum of the max_in_flight caps above
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("BACKEND_WORKERS", "32")), thread_name_prefix="backend")
+
+
+# Exception class names client libraries use for network and timeout failures
+# (httpx, requests, Weaviate, gRPC and google-api-core wrap them in their own types)
+TRANSPORT_ERROR_MARKERS = ("Connect", "Timeout", "Transport", "Unavailable", "ServerError")
+# gRPC status codes that mean the server, not the request, is at fault
+GRPC_SERVER_CODES = {"UNAVAILABLE", "DEADLINE_EXCEEDED", "INTERNAL", "UNKNOWN"}
+# Exception class names for quota / rate-limit rejections (google-api-core, gRPC)
+RATE_LIMIT_MARKERS = ("ResourceExhausted", "TooManyRequests", "RateLimit")
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    """HTTP status carried by a client library's error, if any"""
+    for value in (getattr(error, "status_code", None), getattr(error, "code", None),
+                  getattr(getattr(error, "response", None), "status_code", None)):
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def _grpc_code_name(error: BaseException) -> Optional[str]:
+    """Name of the gRPC status code carried by error, if any"""
+    code = getattr(error, "code", None)
+    if not callable(code):
+        return None
+    try:
+        return getattr(code(), "name", None)
+    except Exception:
+        return None
+
+
+def _class_name_has(error: BaseException, markers) -> bool:
+    return any(marker in cls.__name__ for cls in type(error).__mro__ for marker in markers)
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """Whether error is a quota / rate-limit rejection (HTTP 429, gRPC RESOURCE_EXHAUSTED).
+
+    The backend is healthy but busy: worth retrying after a longer backoff,
+    but no reason to open the circuit.
+    """
+    status = _status_code(error)
+    if status is not None:
+        return status == 429
+    return _grpc_code_name(error) == "RESOURCE_EXHAUSTED" or _class_name_has(error, RATE_LIMIT_MARKERS)
+
+
+def is_backend_failure(error: BaseException) -> bool:
+    """Whether error says the backend is unhealthy: a transport error, a
+    timeout or a 5xx. Anything else (a 4xx, a TypeError from bad input) is
+    the caller's fault and must not open the circuit.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = _status_code(error)
+    if status is not None:
+        return status >= 500
+    if _grpc_code_name(error) in GRPC_SERVER_CODES:
+        return True
+    return _class_name_has(error, TRANSPORT_ERROR_MARKERS)
+
+
+class BackendUnavailable(Exception):
+    """Raised when a backend call failed on every attempt or its circuit is open"""
+
+    def __init__(self, backend: str, reason: str):
+        super().__init__(f"{backend} unavailable: {reason}")
+        self.backend = backend
+        self.reason = reason
+
+
+class CircuitOpen(BackendUnavailable):
+    """Raised without calling the backend while its circuit is open"""
+
+
+class BackendSaturated(BackendUnavailable):
+    """Raised without calling the backend while max_in_flight attempts are still running"""
+
+
+class CircuitBreaker:
+    """Closed -> open after threshold consecutive failures -> half-open after
+    reset_timeout, where one trial call decides between closed and open again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout: float = CIRCUIT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpen unless a call may go to the backend now"""
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    raise CircuitOpen(self.name, "circuit open")
+                self.state = "half_open"
+                self._trial_running = False
+            if self.state == "half_open":
+                if self._trial_running:
+                    raise CircuitOpen(self.name, "circuit half-open, trial call running")
+                self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                logger.info(f"✅ {self.name} circuit closed")
+            self.state = "closed"
+            self.failures = 0
+            self._trial_running = False
+
+    def record_abandoned(self):
+        """The caller gave up (e.g. its deadline passed); says nothing about backend health"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self.times_opened += 1
+                logger.warning(f"⛔ {self.name} circuit opened after {self.failures} consecutive failures")
+
+
+class BackendPolicy:
+    """Timeouts, jittered retries, hedged duplicates and circuit breaking for one backend"""
+
+    def __init__(self, name: str, timeout: float, retries: int, hedge: bool = False,
+                 hedge_after_ms: float = 0.0, max_in_flight: int = 8, breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.hedge = hedge
+        self.hedge_after_ms = hedge_after_ms
+        self.max_in_flight = max_in_flight
+        self.breaker = breaker or CircuitBreaker(name)
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        # Held from submitting an attempt until it finishes, even after its caller gave up
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self.stats = {
+            "calls": 0, "failures": 0, "retries": 0, "timeouts": 0,
+            "hedges": 0, "hedge_wins": 0, "circuit_rejections": 0,
+            "rejected_errors": 0, "saturated": 0, "rate_limited": 0
+        }
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def hedge_delay_ms(self) -> Optional[float]:
+        """How long an attempt may run before a duplicate is sent, or None for no hedging"""
+        if not self.hedge:
+            return None
+        if self.hedge_after_ms:
+            return self.hedge_after_ms
+        with self._lock:
+            if len(self._latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def call(self, fn: Callable[..., T], *args, deadline: Optional[Deadline] = None,
+             idempotent: bool = True, **kwargs) -> T:
+        """Call fn under this backend's policy.
+
+        Raises DeadlineExceeded when the request's budget runs out and
+        BackendUnavailable when every attempt failed, the circuit is open or
+        max_in_flight attempts are still running. Non-idempotent calls are
+        never hedged. Transport, timeout and 5xx errors are retried and count
+        toward the circuit; rate limits (429) are retried after a longer
+        backoff without counting. Any other error is the caller's (a bad
+        request, a bug) and propagates unchanged at once.
+        """
+        deadline = deadline or Deadline(None)
+        self._count("calls")
+        last_error = "no attempt made"
+        rate_limited = False
+        for attempt in range(self.retries + 1):
+            if attempt:
+                base, cap = (
+                    (RATE_LIMIT_BACKOFF_BASE, RATE_LIMIT_BACKOFF_MAX) if rate_limited
+                    else (RETRY_BACKOFF_BASE, RETRY_BACKOFF_MAX)
+                )
+                backoff = random.uniform(0, min(cap, base * 2 ** attempt))
+                if not deadline.allows(backoff * 1000):
+                    break
+                time.sleep(backoff)
+                self._count("retries")
+            try:
+                self.breaker.before_call()
+            except CircuitOpen:
+                self._count("circuit_rejections")
+                raise
+            try:
+                result = self._attempt(fn, args, kwargs, deadline, idempotent)
+            except (DeadlineExceeded, BackendSaturated):
+                self.breaker.record_abandoned()
+                raise
+            except Exception as e:
+                last_error = f"{type(e).__name__}: {e}"
+                rate_limited = is_rate_limited(e)
+                if rate_limited:
+                    # Busy, not broken: back off and retry without opening the circuit
+                    self.breaker.record_abandoned()
+                    self._count("rate_limited")
+                    logger.warning(f"🐢 {self.name} attempt {attempt + 1}/{self.retries + 1} rate limited: {last_error}")
+                    continue
+                if not is_backend_failure(e):
+                    # The backend answered; the request itself was bad
+                    self.breaker.record_abandoned()
+                    self._count("rejected_errors")
+                    raise
+                self.breaker.record_failure()
+                logger.warning(f"⚠️ {self.name} attempt {attempt + 1}/{self.retries + 1} failed: {last_error}")
+                continue
+            self.breaker.record_success()
+            return result
+
+        self._count("failures")
+        raise BackendUnavailable(self.name, last_error)
+
+    def _attempt(self, fn: Callable[..., T], args: tuple, kwargs: Dict[str, Any],
+                 deadline: Deadline, idempotent: bool) -> T:
+        """One attempt, plus a hedged duplicate if it runs past the hedge delay"""
+        timeout = min(self.timeout, deadline.remaining_ms() / 1000)
+        if timeout <= 0:
+            raise DeadlineExceeded("deadline already passed")
+        start = time.monotonic()
+        primary = self._submit(fn, args, kwargs, wait_s=timeout)
+        if primary is None:
+            self._count("saturated")
+            if not deadline.allows(1):
+                raise DeadlineExceeded(f"{self.name} had no free slot within the request deadline")
+            raise BackendSaturated(self.name, f"{self.max_in_flight} calls still in flight")
+        pending = {primary}
+
+        hedge_delay = self.hedge_delay_ms() if idempotent else None
+        if hedge_delay is not None and hedge_delay / 1000 < timeout:
+            done, _ = wait(pending, timeout=hedge_delay / 1000)
+            if not done:
+                # A hedge only goes out if it does not have to wait for a slot
+                hedge = self._submit(fn, args, kwargs, wait_s=0)
+                if hedge is not None:
+                    self._count("hedges")
+                    pending.add(hedge)
+
+        error = None
+        while pending:
+            remaining = timeout - (time.monotonic() - start)
+            done, pending = wait(pending, timeout=max(0.0, remaining), return_when=FIRST_COMPLETED)
+            if not done:
+                for future in pending:
+                    future.cancel()
+                if not deadline.allows(1):
+                    raise DeadlineExceeded(f"{self.name} call did not finish within the request deadline")
+                self._count("timeouts")
+                raise TimeoutError(f"no response within {timeout:.2f}s")
+            for future in done:
+                if future.exception() is None:
+                    with self._lock:
+                        self._latencies.append((time.monotonic() - start) * 1000)
+                    if future is not primary:
+                        self._count("hedge_wins")
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _submit(self, fn: Callable[..., T], args: tuple, kwargs: Dict[str, Any], wait_s: float):
+        """Run fn on the pool once an in-flight slot is free within wait_s; None if none was"""
+        if not self._in_flight.acquire(timeout=max(0.0, wait_s)):
+            return None
+        try:
+            future = _executor.submit(profiling.wrap(fn), *args, **kwargs)
+        except BaseException:
+            self._in_flight.release()
+            raise
+        # Runs when the attempt finishes or is cancelled before starting
+        future.add_done_callback(lambda _: self._in_flight.release())
+        return future
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters, circuit state and current hedge delay"""
+        with self._lock:
+            stats = dict(self.stats)
+        hedge_delay = self.hedge_delay_ms()
+        return {
+            **stats,
+            "circuit": self.breaker.state,
+            "circuit_opened": self.breaker.times_opened,
+            "hedge_delay_ms": round(hedge_delay, 1) if hedge_delay is not None else None
+        }
+
+
+# Process-wide policies shared by every caller of the model and vector-store clients
+backend_policies = {name: BackendPolicy(name, **config) for name, config in BACKEND_POLICIES.items()}
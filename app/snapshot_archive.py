@@ -0,0 +1,245 @@
+"""Export and import self-contained index snapshots.
+
+An archive is a zip file with:
+    manifest.json           format version, embedding model/dimension, counts
+    <type>/nodes.jsonl      one serialized node (text + metadata) per line
+    <type>/vectors.f32      the nodes' embeddings, row-major float32, same order
+    qa.idx                  the exact-match Q&A index in the shared-index format
+
+Importing bulk-loads the nodes with their stored vectors (no parsing, no
+embedding calls) and swaps the result in like a full ingest. With per-version
+collections they go into fresh ones; shared collections (QA_INDEX_PATH) are
+written in place, so the import is refused unless they and the Q&A index are
+empty, and a failed import empties them again. Run from the app directory
+against shared collections:
+    python snapshot_archive.py export /backups/rag.snap --qa-index /srv/rag/qa.idx
+    python snapshot_archive.py import /backups/rag.snap --qa-index /srv/rag/qa.idx
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional
+
+
+import logging
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMAT = 1
+# Where the export endpoint writes archives
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "rag_snapshots"))
+# Snapshot endpoints are disabled unless SNAPSHOT_TOKEN is set and sent in SNAPSHOT_HEADER
+SNAPSHOT_TOKEN = os.getenv("SNAPSHOT_TOKEN")
+SNAPSHOT_HEADER = "X-Snapshot-Token"
+# Nodes held in memory at a time while importing (embedding writes are batched further down)
+IMPORT_BATCH_SIZE = int(os.getenv("SNAPSHOT_IMPORT_BATCH", "1000"))
+
+
+def snapshot_access_allowed(token: Optional[str]) -> bool:
+    """Whether a request's snapshot header unlocks export/import"""
+    return bool(SNAPSHOT_TOKEN) and token == SNAPSHOT_TOKEN
+
+
+def embed_model_name() -> str:
+    from llama_index.core import Settings
+    return getattr(Settings.embed_model, "model_name", None) or type(Settings.embed_model).__name__
+
+
+def write_archive(
+    path: str,
+    nodes_by_type: Mapping[str, Iterable],
+    qa_pairs: Mapping[str, Dict[str, Any]],
+    info: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Write nodes (with embeddings) and Q&A pairs to a new archive at path; returns its manifest"""
+    # Imported here so numpy stays off the server's startup path
+    import numpy as np
+
+    from qa_store import write_qa_index
+
+    manifest = {"format": ARCHIVE_FORMAT, "created_at": time.time(), **info, "dimension": None, "content_types": {}}
+    tmp_path = f"{path}.tmp"
+    with tempfile.TemporaryDirectory() as work_dir, zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for content_type, nodes in nodes_by_type.items():
+            # Vectors go to a side file while the node records stream into the archive
+            vectors_path = os.path.join(work_dir, f"{content_type}.f32")
+            count = 0
+            with open(vectors_path, "wb") as vectors, archive.open(f"{content_type}/nodes.jsonl", "w", force_zip64=True) as records:
+                for node in nodes:
+                    embedding = np.asarray(node.embedding, dtype=np.float32)
+                    if manifest["dimension"] is None:
+                        manifest["dimension"] = len(embedding)
+                    elif len(embedding) != manifest["dimension"]:
+                        raise ValueError(f"Node {node.node_id} has a {len(embedding)}-d embedding, expected {manifest['dimension']}")
+                    vectors.write(embedding.tobytes())
+                    record = node.to_dict()
+                    record.pop("embedding", None)
+                    records.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+                    count += 1
+            # Float vectors barely compress; store them as-is
+            archive.write(vectors_path, f"{content_type}/vectors.f32", compress_type=zipfile.ZIP_STORED)
+            manifest["content_types"][content_type] = count
+
+        qa_path = os.path.join(work_dir, "qa.idx")
+        write_qa_index(qa_pairs, qa_path)
+        archive.write(qa_path, "qa.idx", compress_type=zipfile.ZIP_STORED)
+        manifest["qa_pairs"] = len(qa_pairs)
+        archive.writestr("manifest.json", json.dumps(manifest, indent=2))
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def read_manifest(archive: zipfile.ZipFile) -> Dict[str, Any]:
+    manifest = json.loads(archive.read("manifest.json"))
+    if manifest.get("format") != ARCHIVE_FORMAT:
+        raise ValueError(f"Unsupported snapshot format {manifest.get('format')}, expected {ARCHIVE_FORMAT}")
+    return manifest
+
+
+def read_nodes(archive: zipfile.ZipFile, manifest: Dict[str, Any], content_type: str,
+               batch_size: int = IMPORT_BATCH_SIZE) -> Iterator[List]:
+    """Batches of a content type's nodes with their stored embeddings"""
+    import numpy as np
+    from llama_index.core.schema import TextNode
+
+    row_bytes = 4 * (manifest["dimension"] or 0)
+    batch = []
+    with archive.open(f"{content_type}/nodes.jsonl") as records, archive.open(f"{content_type}/vectors.f32") as vectors:
+        for line in records:
+            node = TextNode.from_dict(json.loads(line))
+            node.embedding = np.frombuffer(vectors.read(row_bytes), dtype=np.float32).tolist()
+            batch.append(node)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def read_qa_pairs(archive: zipfile.ZipFile):
+    """The archive's Q&A pairs as a writable CompactQAStore"""
+    from qa_store import CompactQAStore, MappedQAIndex
+
+    qa_pairs = CompactQAStore()
+    with tempfile.TemporaryDirectory() as work_dir:
+        qa_path = archive.extract("qa.idx", work_dir)
+        mapped = MappedQAIndex(qa_path)
+        for question_key, qa_data in mapped.items():
+            qa_pairs[question_key] = qa_data
+    return qa_pairs
+
+
+def export_snapshot(rag_system, path: str) -> Dict[str, Any]:
+    """Write the live snapshot to path; ingests wait so the archive is a consistent cut"""
+    started = time.perf_counter()
+    with rag_system._ingest_lock:
+        snapshot = rag_system.snapshots.current
+        manifest = write_archive(
+            path,
+            {content_type: rag_system.stored_nodes(content_type, snapshot) for content_type in snapshot.indexes},
+            snapshot.exact_qa_pairs,
+            {"snapshot_version": snapshot.version, "tenant": rag_system.tenant_id, "embed_model": embed_model_name()}
+        )
+    seconds = time.perf_counter() - started
+    logger.info(f"📦 Exported snapshot v{manifest['snapshot_version']} to {path} in {seconds:.2f}s")
+    return {**manifest, "bytes": os.path.getsize(path), "seconds": round(seconds, 3)}
+
+
+def stored_count(rag_system, snapshot) -> int:
+    """Nodes in a snapshot's vector stores"""
+    total = 0
+    for content_type, vector_store in snapshot.vector_stores.items():
+        if getattr(vector_store, "stores_text", False):
+            collection = rag_system.weaviate_client.collections.get(vector_store.index_name)
+            total += collection.aggregate.over_all(total_count=True).total_count
+        elif content_type in snapshot.indexes:
+            total += len(snapshot.indexes[content_type].docstore.docs)
+    return total
+
+
+def _clear_shared_collections(rag_system):
+    """Recreate the shared collections empty, undoing a partial import"""
+    for content_type in rag_system.snapshots.current.vector_stores:
+        rag_system.setup_collection(rag_system.collection_name(content_type), reset=True)
+    logger.info("🧹 Emptied the shared collections after a failed import")
+
+
+def import_snapshot(rag_system, path: str, force: bool = False) -> Dict[str, Any]:
+    """Bulk-load an archive into a new snapshot and swap it in, without parsing or embedding.
+
+    Shared collections must be empty: importing into them in place would
+    merge the archive with what is already stored.
+    """
+    started = time.perf_counter()
+    with zipfile.ZipFile(path) as archive:
+        manifest = read_manifest(archive)
+        if manifest["embed_model"] != embed_model_name() and not force:
+            raise ValueError(
+                f"Snapshot vectors come from {manifest['embed_model']}, but this server embeds queries "
+                f"with {embed_model_name()}"
+            )
+        qa_pairs = read_qa_pairs(archive)
+
+        with rag_system._ingest_lock:
+            shared = not rag_system.versioned_collections
+            if shared:
+                shared_qa_pairs = rag_system.shared_qa_index.current()
+                stored = stored_count(rag_system, rag_system.snapshots.current)
+                stored_qa_pairs = len(shared_qa_pairs) if shared_qa_pairs is not None else 0
+                if stored or stored_qa_pairs:
+                    raise ValueError(
+                        f"The shared collections already hold {stored} nodes and {stored_qa_pairs} Q&A pairs; "
+                        f"importing would merge with them, so import into an empty deployment"
+                    )
+            snapshot = rag_system._new_snapshot()
+            try:
+                for content_type in manifest["content_types"]:
+                    for batch in read_nodes(archive, manifest, content_type):
+                        rag_system.build_indexes({content_type: batch}, snapshot)
+                snapshot.exact_qa_pairs = qa_pairs
+                if shared:
+                    snapshot.exact_qa_pairs = rag_system.shared_qa_index.publish(qa_pairs)
+            except Exception:
+                if shared:
+                    # Nothing was stored before, so empty is the state to go back to
+                    _clear_shared_collections(rag_system)
+                else:
+                    rag_system._drop_collections(snapshot)
+                raise
+            rag_system._swap_snapshot(snapshot)
+
+    seconds = time.perf_counter() - started
+    logger.info(f"📦 Imported {path} as snapshot v{snapshot.version} in {seconds:.2f}s")
+    return {**manifest, "bytes": os.path.getsize(path), "seconds": round(seconds, 3), "snapshot_version": snapshot.version}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path", help="archive file")
+    parser.add_argument("--qa-index", default=os.getenv("QA_INDEX_PATH"), help="shared Q&A index file (QA_INDEX_PATH)")
+    parser.add_argument("--force", action="store_true", help="import even if the embedding model differs")
+    args = parser.parse_args()
+
+    if not args.qa_index:
+        sys.exit("--qa-index (or QA_INDEX_PATH) is required: only shared collections outlive this process")
+    # Must be set before rag_system is imported so collections are shared, not reset
+    os.environ["QA_INDEX_PATH"] = args.qa_index
+
+    from rag_system import AgenticRAGSystem
+
+    rag = AgenticRAGSystem()
+    if args.command == "export":
+        result = export_snapshot(rag, args.path)
+    else:
+        result = import_snapshot(rag, args.path, force=args.force)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
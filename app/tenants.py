@@ -0,0 +1,151 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+
+import logging
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Directory holding one Q&A index file per tenant (unset = multi-tenancy off)
+TENANT_DATA_DIR = os.getenv("TENANT_DATA_DIR")
+# Request header naming the tenant; requests without it use the default indexes
+TENANT_HEADER = "X-Tenant-Id"
+# Loaded tenants are evicted least recently used first above either limit
+TENANT_CACHE_BYTES = int(os.getenv("TENANT_CACHE_BYTES", str(512 * 1024 * 1024)))
+TENANT_CACHE_MAX = int(os.getenv("TENANT_CACHE_MAX", "64"))
+# Approximate footprint of a loaded tenant besides its Q&A pairs (indexes, buffers, history)
+TENANT_BASE_BYTES = int(os.getenv("TENANT_BASE_BYTES", str(2 * 1024 * 1024)))
+
+# Tenant ids become part of Weaviate collection names, which allow only letters, digits and _
+TENANT_ID = re.compile(r"^[A-Za-z0-9_]{1,48}$")
+
+
+def validate_tenant_id(tenant_id: str) -> str:
+    if not TENANT_ID.match(tenant_id or ""):
+        raise ValueError("Tenant id must be 1-48 letters, digits or underscores")
+    return tenant_id
+
+
+def tenant_collection(collection: str, tenant_id: str = None) -> str:
+    """Weaviate collection holding a tenant's share of a content type"""
+    return f"{collection}_t_{tenant_id}" if tenant_id else collection
+
+
+def tenant_qa_index_path(tenant_id: str) -> str:
+    """Q&A index file of a tenant"""
+    return os.path.join(TENANT_DATA_DIR, f"{tenant_id}.qaidx")
+
+
+class TenantRegistry:
+    """Per-tenant RAG systems, loaded on first use and kept in an LRU under a memory cap.
+
+    Tenants in use by a request are never evicted; an evicted tenant's data
+    stays in its collections and Q&A index file and is reloaded on demand.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[str], Any],
+        size_of: Callable[[Any], int],
+        max_bytes: int = TENANT_CACHE_BYTES,
+        max_tenants: int = TENANT_CACHE_MAX
+    ):
+        self._load = load
+        self._size_of = size_of
+        self.max_bytes = max_bytes
+        self.max_tenants = max_tenants
+        # tenant id -> {"system", "in_use", "nbytes"}, least recently used first
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.stats_counters = {"hits": 0, "loads": 0, "evictions": 0}
+
+    def _checkout(self, tenant_id: str):
+        """Loaded system for tenant_id marked in use, or None; caller holds the lock"""
+        entry = self._entries.get(tenant_id)
+        if entry is None:
+            return None
+        self._entries.move_to_end(tenant_id)
+        entry["in_use"] += 1
+        self.stats_counters["hits"] += 1
+        return entry["system"]
+
+    def acquire(self, tenant_id: str):
+        """The tenant's system, loading it if needed; pair with release()"""
+        validate_tenant_id(tenant_id)
+        with self._lock:
+            system = self._checkout(tenant_id)
+            if system is not None:
+                return system
+            load_lock = self._load_locks.setdefault(tenant_id, threading.Lock())
+
+        # Load outside the registry lock so other tenants are not held up; one loader per tenant
+        with load_lock:
+            with self._lock:
+                system = self._checkout(tenant_id)
+                if system is not None:
+                    return system
+            try:
+                system = self._load(tenant_id)
+                nbytes = self._size_of(system)
+            except BaseException:
+                with self._lock:
+                    self._load_locks.pop(tenant_id, None)
+                raise
+            # The entry goes in before the load lock goes away, so a request arriving in
+            # between finds one or the other and never starts a second load
+            with self._lock:
+                self._entries[tenant_id] = {"system": system, "in_use": 1, "nbytes": nbytes}
+                self._load_locks.pop(tenant_id, None)
+                self.stats_counters["loads"] += 1
+                logger.info(f"📂 Loaded tenant {tenant_id} ({nbytes / 1e6:.1f} MB)")
+                self._evict()
+            return system
+
+    def release(self, tenant_id: str):
+        """Done with the tenant for this request; its size is re-measured after ingests"""
+        with self._lock:
+            entry = self._entries.get(tenant_id)
+            if entry is None:
+                return
+            entry["in_use"] -= 1
+        nbytes = self._size_of(entry["system"])
+        with self._lock:
+            entry["nbytes"] = nbytes
+            self._evict()
+
+    @contextmanager
+    def use(self, tenant_id: str) -> Iterator[Any]:
+        system = self.acquire(tenant_id)
+        try:
+            yield system
+        finally:
+            self.release(tenant_id)
+
+    def _evict(self):
+        """Drop idle tenants, oldest first, until within the caps; caller holds the lock"""
+        while (
+            len(self._entries) > self.max_tenants
+            or sum(entry["nbytes"] for entry in self._entries.values()) > self.max_bytes
+        ):
+            victim = next((tenant_id for tenant_id, entry in self._entries.items() if entry["in_use"] <= 0), None)
+            if victim is None:
+                return
+            del self._entries[victim]
+            self.stats_counters["evictions"] += 1
+            logger.info(f"♻️ Evicted idle tenant {victim}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats_counters,
+                "loaded": len(self._entries),
+                "loaded_bytes": sum(entry["nbytes"] for entry in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "max_tenants": self.max_tenants,
+                "in_use": sorted(tenant_id for tenant_id, entry in self._entries.items() if entry["in_use"] > 0)
+            }
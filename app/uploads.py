@@ -0,0 +1,368 @@
+import fcntl
+import hashlib
+import json
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+import aiofiles
+from fastapi import HTTPException
+
+import logging
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Where resumable upload sessions keep their partial file and state
+RESUMABLE_UPLOAD_DIR = os.getenv("RESUMABLE_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "rag_resumable"))
+# Largest file accepted through a resumable upload, and largest single chunk
+RESUMABLE_MAX_BYTES = int(os.getenv("RESUMABLE_MAX_BYTES", str(4 * 1024 * 1024 * 1024)))
+RESUMABLE_CHUNK_MAX_BYTES = int(os.getenv("RESUMABLE_CHUNK_MAX_BYTES", str(64 * 1024 * 1024)))
+# Chunk size suggested to clients
+RESUMABLE_CHUNK_BYTES = int(os.getenv("RESUMABLE_CHUNK_BYTES", str(8 * 1024 * 1024)))
+# Sessions untouched for this long (seconds) are deleted with their data
+RESUMABLE_SESSION_TTL = float(os.getenv("RESUMABLE_SESSION_TTL", str(24 * 3600)))
+# Read size used when hashing a finished file
+HASH_READ_SIZE = 1024 * 1024
+# An ingesting session's state is re-saved this often (seconds); one not re-saved within
+# RESUMABLE_HEARTBEAT_TIMEOUT, or whose owning process is gone, was interrupted by a crash
+RESUMABLE_HEARTBEAT_INTERVAL = float(os.getenv("RESUMABLE_HEARTBEAT_INTERVAL", "30"))
+RESUMABLE_HEARTBEAT_TIMEOUT = float(os.getenv("RESUMABLE_HEARTBEAT_TIMEOUT", "300"))
+
+# Identifies this process as the owner of the sessions it ingests; the random part
+# tells a restarted process that reused the same pid apart from its predecessor
+PROCESS_OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+
+class UploadSession:
+    """State of one resumable upload, persisted next to its partial file"""
+
+    def __init__(
+        self,
+        upload_id: str,
+        file_name: str,
+        size: int,
+        sha256: Optional[str] = None,
+        tenant_id: Optional[str] = None,
+        received: int = 0,
+        status: str = "uploading",
+        created_at: Optional[float] = None,
+        updated_at: Optional[float] = None,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+        owner: Optional[str] = None
+    ):
+        self.upload_id = upload_id
+        self.file_name = file_name
+        self.size = size
+        self.sha256 = sha256
+        self.tenant_id = tenant_id
+        self.received = received
+        self.status = status
+        self.created_at = created_at or time.time()
+        self.updated_at = updated_at or self.created_at
+        self.result = result
+        self.error = error
+        # Process ingesting the file (PROCESS_OWNER), while status is "ingesting"
+        self.owner = owner
+
+    @property
+    def data_path(self) -> str:
+        return os.path.join(RESUMABLE_UPLOAD_DIR, f"{self.upload_id}.part")
+
+    @property
+    def state_path(self) -> str:
+        return os.path.join(RESUMABLE_UPLOAD_DIR, f"{self.upload_id}.json")
+
+    @property
+    def lock_path(self) -> str:
+        return os.path.join(RESUMABLE_UPLOAD_DIR, f"{self.upload_id}.lock")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "upload_id": self.upload_id,
+            "file_name": self.file_name,
+            "size": self.size,
+            "sha256": self.sha256,
+            "tenant_id": self.tenant_id,
+            "received": self.received,
+            "status": self.status,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "result": self.result,
+            "error": self.error,
+            "owner": self.owner
+        }
+
+    def ingest_interrupted(self) -> bool:
+        """Whether an "ingesting" session lost the process that was ingesting it"""
+        if self.status != "ingesting":
+            return False
+        if self.owner == PROCESS_OWNER:
+            return False
+        if time.time() - self.updated_at > RESUMABLE_HEARTBEAT_TIMEOUT:
+            return True
+        host, _, rest = (self.owner or "").partition(":")
+        pid, _, _ = rest.partition(":")
+        if host != socket.gethostname() or not pid.isdigit():
+            # Another machine's process: only its heartbeat can tell
+            return False
+        if int(pid) == os.getpid():
+            # Same pid, different owner: a previous run of this process
+            return True
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+
+    def save(self):
+        self.updated_at = time.time()
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, self.state_path)
+
+
+class ResumableUploads:
+    """Initiate / PUT chunk at offset / finalize uploads that survive dropped connections.
+
+    Chunks must arrive in order: a PUT is accepted only at the offset the
+    server has received up to, so a client that lost a connection asks for
+    the session and continues from its "received". A chunk that is cut off
+    or fails its checksum is rolled back, never half-kept. Writers of a
+    session hold an flock on its lock file, so requests handled by different
+    worker processes cannot interleave either.
+    """
+
+    def __init__(self):
+        os.makedirs(RESUMABLE_UPLOAD_DIR, exist_ok=True)
+
+    @contextmanager
+    def _lock(self, session: UploadSession, busy: str) -> Iterator[None]:
+        """Hold the session's flock, or fail with 409 (detail busy) if another request holds it"""
+        with open(session.lock_path, "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise HTTPException(status_code=409, detail=busy)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def create(self, file_name: str, size: int, sha256: Optional[str] = None,
+               tenant_id: Optional[str] = None) -> UploadSession:
+        if size <= 0 or size > RESUMABLE_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"Size must be between 1 and {RESUMABLE_MAX_BYTES} bytes")
+        if sha256 is not None and not SHA256.match(sha256.lower()):
+            raise HTTPException(status_code=400, detail="sha256 must be 64 hex digits")
+        self.cleanup_expired()
+
+        session = UploadSession(uuid.uuid4().hex, Path(file_name).name, size, sha256.lower() if sha256 else None, tenant_id)
+        with open(session.data_path, "wb") as f:
+            # Reserve the full size up front so a full disk fails now, not at 99%
+            if hasattr(os, "posix_fallocate"):
+                os.posix_fallocate(f.fileno(), 0, size)
+            else:
+                f.truncate(size)
+        session.save()
+        logger.info(f"📤 Resumable upload {session.upload_id} started: {session.file_name} ({size} bytes)")
+        return session
+
+    def get(self, upload_id: str, tenant_id: Optional[str] = None) -> UploadSession:
+        """Session by id; other tenants' sessions are reported as missing.
+
+        An ingest interrupted by a crash is reported as a complete upload
+        again, so it can be finalized once more or aborted.
+        """
+        if not UPLOAD_ID.match(upload_id):
+            raise HTTPException(status_code=404, detail="Upload not found")
+        try:
+            with open(os.path.join(RESUMABLE_UPLOAD_DIR, f"{upload_id}.json")) as f:
+                session = UploadSession(**json.load(f))
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        if session.tenant_id != tenant_id:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        if session.ingest_interrupted():
+            self._reopen(session)
+        return session
+
+    def _reopen(self, session: UploadSession):
+        """Put an interrupted ingest back to a complete, finalizable upload"""
+        logger.warning(f"⚠️ Upload {session.upload_id}: ingest by {session.owner} was interrupted")
+        session.status = "uploading"
+        session.error = "Ingestion was interrupted; finalize again or abort"
+        session.owner = None
+        session.save()
+
+    async def write_chunk(
+        self,
+        session: UploadSession,
+        offset: int,
+        body: AsyncIterator[bytes],
+        chunk_sha256: Optional[str] = None
+    ) -> UploadSession:
+        """Append a streamed chunk at offset, which must equal the bytes received so far"""
+        with self._lock(session, "Another chunk of this upload is being written"):
+            # Re-read under the lock: another request may have advanced the session
+            session = self.get(session.upload_id, session.tenant_id)
+            if session.status != "uploading":
+                raise HTTPException(status_code=409, detail=f"Upload is {session.status}")
+            if offset != session.received:
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Expected offset {session.received}",
+                    headers={"Upload-Offset": str(session.received)}
+                )
+
+            limit = min(RESUMABLE_CHUNK_MAX_BYTES, session.size - offset)
+            digest = hashlib.sha256()
+            written = 0
+            try:
+                async with aiofiles.open(session.data_path, "r+b") as f:
+                    await f.seek(offset)
+                    async for data in body:
+                        written += len(data)
+                        if written > limit:
+                            raise HTTPException(
+                                status_code=413,
+                                detail=f"Chunk exceeds {limit} bytes (chunk limit or remaining size)"
+                            )
+                        digest.update(data)
+                        await f.write(data)
+                if chunk_sha256 and digest.hexdigest() != chunk_sha256.lower():
+                    raise HTTPException(status_code=422, detail="Chunk checksum mismatch")
+            except BaseException:
+                # Bytes past "received" are simply overwritten by the retried chunk
+                logger.info(f"↩️ Upload {session.upload_id}: chunk at {offset} rolled back")
+                raise
+
+            session.received += written
+            session.save()
+            return session
+
+    def verify(self, session: UploadSession, sha256: Optional[str] = None) -> UploadSession:
+        """Check a fully received upload against its checksum and mark it ready for ingestion.
+
+        The checksum is required, given here or when the upload was started.
+        The check and the switch to "ingesting" happen under the session's
+        lock, so concurrent finalize calls, in any process, cannot both ingest
+        the file.
+        """
+        if sha256 is not None and not SHA256.match(sha256.lower()):
+            raise HTTPException(status_code=400, detail="sha256 must be 64 hex digits")
+        with self._lock(session, "This upload is being written or finalized"):
+            # Re-read under the lock: another request may have finalized the session
+            session = self.get(session.upload_id, session.tenant_id)
+            return self._verify(session, sha256)
+
+    def _verify(self, session: UploadSession, sha256: Optional[str]) -> UploadSession:
+        expected = (sha256 or session.sha256 or "").lower() or None
+        if expected is None:
+            raise HTTPException(
+                status_code=400,
+                detail="sha256 of the whole file is required: pass it to finalize or when starting the upload"
+            )
+        if session.status != "uploading":
+            raise HTTPException(status_code=409, detail=f"Upload is {session.status}")
+        if session.received != session.size:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload incomplete: {session.received} of {session.size} bytes",
+                headers={"Upload-Offset": str(session.received)}
+            )
+        digest = hashlib.sha256()
+        with open(session.data_path, "rb") as f:
+            while block := f.read(HASH_READ_SIZE):
+                digest.update(block)
+        if digest.hexdigest() != expected:
+            session.status = "failed"
+            session.error = "File checksum mismatch"
+            session.save()
+            raise HTTPException(status_code=422, detail="File checksum mismatch; start a new upload")
+        session.sha256 = expected
+        session.status = "ingesting"
+        session.error = None
+        session.owner = PROCESS_OWNER
+        session.save()
+        return session
+
+    @contextmanager
+    def heartbeat(self, session: UploadSession) -> Iterator[UploadSession]:
+        """Keep re-saving an ingesting session so other processes can tell it is alive"""
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(RESUMABLE_HEARTBEAT_INTERVAL):
+                session.save()
+
+        thread = threading.Thread(target=beat, name=f"upload-heartbeat-{session.upload_id[:8]}", daemon=True)
+        thread.start()
+        try:
+            yield session
+        finally:
+            stop.set()
+            thread.join()
+
+    def finish(self, session: UploadSession, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        """Record the ingestion outcome and drop the file data"""
+        session.status = "failed" if error else "done"
+        session.result = result
+        session.error = error
+        session.owner = None
+        session.save()
+        self._remove_data(session)
+
+    def abort(self, session: UploadSession):
+        """Delete a session and its data, unless a live process is ingesting it"""
+        with self._lock(session, "This upload is being written or finalized"):
+            # Re-read under the lock: another process may have started ingesting it
+            session = self.get(session.upload_id, session.tenant_id)
+            if session.status == "ingesting":
+                raise HTTPException(status_code=409, detail="Upload is being ingested")
+            self._remove_data(session)
+            for path in (session.state_path, session.lock_path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _remove_data(self, session: UploadSession):
+        try:
+            os.remove(session.data_path)
+        except FileNotFoundError:
+            pass
+
+    def cleanup_expired(self):
+        """Delete sessions (and their data) not touched within RESUMABLE_SESSION_TTL.
+
+        Ingests still running are kept; interrupted ones expire like any other.
+        """
+        cutoff = time.time() - RESUMABLE_SESSION_TTL
+        for state_path in Path(RESUMABLE_UPLOAD_DIR).glob("*.json"):
+            try:
+                with open(state_path) as f:
+                    session = UploadSession(**json.load(f))
+            except (OSError, ValueError, TypeError):
+                continue
+            if session.updated_at < cutoff and (session.status != "ingesting" or session.ingest_interrupted()):
+                logger.info(f"🧹 Removing expired upload {session.upload_id}")
+                try:
+                    self.abort(session)
+                except HTTPException:
+                    # Busy, or resumed meanwhile; a later cleanup will look again
+                    continue
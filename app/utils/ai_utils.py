@@ -3,8 +3,6 @@ from venv import logger
 from llama_index.core import (
     Settings
 )
-from llama_index.embeddings.gemini import GeminiEmbedding
-from llama_index.llms.gemini import Gemini
 from utils.configs import prompt
 
 
@@ -14,6 +12,10 @@ WEAVIATE_API_KEY = os.getenv("WEAVIATE_API_KEY")
 
 def setup_models():
     """Initialize embedding and LLM models"""
+    # The Gemini SDKs are slow to import, so load them only when models are built
+    from llama_index.embeddings.gemini import GeminiEmbedding
+    from llama_index.llms.gemini import Gemini
+    
     logger.info("Setting up Gemini models...")
     
     if not GOOGLE_API_KEY:
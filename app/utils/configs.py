@@ -10,6 +10,23 @@ INSTRUCTIONS:
 Remember: Accuracy is the priority. Only provide information that is supported by the documents."""
 
 
+context_prompt = """Context information is below.
+---------------------
+{context}
+---------------------
+Given the context information and not prior knowledge, answer the query.
+Query: {query}
+Answer: """
+
+
+decompose_prompt = """Split the question below into at most {max_steps} independent sub-questions that can each be answered by one document search.
+If it only asks one thing, return it unchanged.
+Return one sub-question per line, with no numbering or other text.
+Question: {query}
+Sub-questions:
+"""
+
+
 
 html = """
     <!DOCTYPE html>
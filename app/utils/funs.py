@@ -1,11 +1,47 @@
-from fastapi import UploadFile
-import shutil
+from fastapi import UploadFile, HTTPException
+import aiofiles
+import os
+import uuid
 from pathlib import Path
 
+# Maximum total size of the files in one upload request
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+# Read size used when streaming an upload to disk
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Extensions whose parsers can read straight from the upload's spooled buffer
+BUFFER_PARSEABLE_EXTENSIONS = ['.pdf', '.csv', '.xlsx']
 
-def save_uploaded_file(uploaded_file: UploadFile, save_dir: Path) -> Path:
-    """Save uploaded file to the given directory."""
-    file_location = save_dir / uploaded_file.filename
-    with open(file_location, "wb") as f:
-        shutil.copyfileobj(uploaded_file.file, f)
-    return file_location
\ No newline at end of file
+
+def upload_size(uploaded_file: UploadFile) -> int:
+    """Size in bytes of an already spooled upload."""
+    if uploaded_file.size is not None:
+        return uploaded_file.size
+    spool = uploaded_file.file
+    spool.seek(0, os.SEEK_END)
+    size = spool.tell()
+    spool.seek(0)
+    return size
+
+
+async def save_uploaded_file(uploaded_file: UploadFile, save_dir: Path, max_bytes: int = MAX_UPLOAD_BYTES) -> Path:
+    """Stream uploaded file into a uniquely named file in the given directory.
+
+    Writes are done with async I/O so the event loop is not blocked, and the
+    copy is aborted with a 413 as soon as it grows past max_bytes.
+    """
+    file_location = save_dir / f"{uuid.uuid4().hex}_{Path(uploaded_file.filename).name}"
+    written = 0
+    try:
+        async with aiofiles.open(file_location, "wb") as f:
+            while chunk := await uploaded_file.read(UPLOAD_CHUNK_SIZE):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File {uploaded_file.filename} exceeds the {max_bytes} byte upload limit"
+                    )
+                await f.write(chunk)
+    except BaseException:
+        file_location.unlink(missing_ok=True)
+        raise
+    return file_location
@@ -0,0 +1,159 @@
+import json
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+from deadline import Deadline, DeadlineExceeded
+from resilience import BackendUnavailable
+
+import logging
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Set WARMUP_ENABLED=0 to report ready as soon as the RAG system is built
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"
+# Synthetic queries run before readiness flips; taken from WARMUP_QUESTIONS_PATH (one per
+# line) if set, else the most frequent questions in the traffic log, else stored Q&A pairs
+WARMUP_QUESTIONS_PATH = os.getenv("WARMUP_QUESTIONS_PATH")
+WARMUP_TOP_N = int(os.getenv("WARMUP_TOP_N", "20"))
+# Overall warm-up budget (ms); whatever is left undone when it runs out is skipped
+WARMUP_TIMEOUT_MS = int(os.getenv("WARMUP_TIMEOUT_MS", "60000"))
+# Send one tiny completion so the first user does not pay for the LLM client's first call
+WARMUP_LLM = os.getenv("WARMUP_LLM", "1") == "1"
+# Only the most recent requests of the traffic log are read, however long it has grown
+WARMUP_LOG_TAIL_LINES = int(os.getenv("WARMUP_LOG_TAIL_LINES", "10000"))
+# How often the vector store is polled while warm-up waits for it to report ready (ms)
+WARMUP_READY_POLL_MS = int(os.getenv("WARMUP_READY_POLL_MS", "500"))
+TAIL_BLOCK_BYTES = 64 * 1024
+
+
+def tail_lines(path: str, max_lines: int) -> List[str]:
+    """The last max_lines lines of a file, read backwards from its end in blocks"""
+    blocks = []
+    newlines = 0
+    with open(path, "rb") as f:
+        position = f.seek(0, os.SEEK_END)
+        while position > 0 and newlines <= max_lines:
+            size = min(TAIL_BLOCK_BYTES, position)
+            position -= size
+            f.seek(position)
+            blocks.append(f.read(size))
+            newlines += blocks[-1].count(b"\n")
+    lines = b"".join(reversed(blocks)).splitlines()
+    if position > 0:
+        # The first line read is only the end of a longer one
+        lines = lines[1:]
+    return [line.decode("utf-8", errors="replace") for line in lines[-max_lines:]]
+
+
+def warmup_questions(rag_system, top_n: int = WARMUP_TOP_N) -> List[str]:
+    """Questions to prime the caches with, most representative first"""
+    if WARMUP_QUESTIONS_PATH:
+        with open(WARMUP_QUESTIONS_PATH, encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()][:top_n]
+
+    # The recorded traffic says which questions users actually ask most
+    log_path = os.getenv("REQUEST_LOG_PATH")
+    if log_path and os.path.exists(log_path):
+        counts = Counter()
+        for line in tail_lines(log_path, WARMUP_LOG_TAIL_LINES):
+            try:
+                question = json.loads(line).get("question")
+            except ValueError:
+                continue
+            if question:
+                counts[question] += 1
+        if counts:
+            return [question for question, _ in counts.most_common(top_n)]
+
+    questions = []
+    for qa_data in rag_system.exact_qa_pairs.values():
+        if len(questions) >= top_n:
+            break
+        questions.append(qa_data["original_question"])
+    return questions
+
+
+def warm_up(rag_system) -> Dict[str, Any]:
+    """Prime connections and caches; returns a report for /ready.
+
+    Warm-up first waits, within its budget, for the vector store to report
+    ready; if it never does, the other steps are skipped and the report's
+    completed flag is False. After that every step is best effort: a failing
+    step is logged and recorded in the report, and warm-up carries on so a
+    flaky dependency cannot keep the worker out of rotation forever.
+    """
+    from llama_index.core import Settings
+    from rag_system import INDEX_LAYOUT
+
+    deadline = Deadline(WARMUP_TIMEOUT_MS)
+    started = time.perf_counter()
+    report = {"steps": {}, "queries": 0, "errors": [], "completed": False}
+
+    def step(name: str, fn, *args) -> bool:
+        step_started = time.perf_counter()
+        try:
+            if deadline.remaining_ms() <= 0:
+                raise DeadlineExceeded("warm-up budget spent")
+            fn(*args)
+            return True
+        except Exception as e:
+            report["errors"].append(f"{name}: {type(e).__name__}: {e}")
+            logger.warning(f"⚠️ Warm-up step {name} failed: {e}")
+            return False
+        finally:
+            report["steps"][name] = round((time.perf_counter() - step_started) * 1000, 1)
+
+    def call(backend: str, fn, *args):
+        # Bounded by the warm-up budget and the backend's timeouts, like live traffic
+        return rag_system.backends[backend].call(fn, *args, deadline=deadline)
+
+    def wait_for_vector_store():
+        while not call("retrieval", rag_system.weaviate_client.is_ready):
+            if not deadline.allows(WARMUP_READY_POLL_MS):
+                raise DeadlineExceeded("vector store did not report ready within the warm-up budget")
+            time.sleep(WARMUP_READY_POLL_MS / 1000)
+
+    if not step("vector_store", wait_for_vector_store):
+        report["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        logger.warning(f"⚠️ Warm-up skipped: the vector store is not ready after {report['duration_ms']:.0f}ms")
+        return report
+
+    step("embedding", call, "retrieval", Settings.embed_model.get_query_embedding, "warm-up")
+    if WARMUP_LLM:
+        step("llm", call, "llm", Settings.llm.complete, "Reply with OK.")
+
+    def run_queries():
+        questions = warmup_questions(rag_system)
+        with rag_system.snapshots.pinned() as snapshot:
+            retrievers = {
+                content_type: snapshot.indexes[content_type].as_retriever(
+                    similarity_top_k=INDEX_LAYOUT[content_type]["top_k"]
+                )
+                for content_type in rag_system._route_order(None, snapshot.indexes)
+            }
+            for question in questions:
+                if deadline.remaining_ms() <= 0:
+                    logger.info(f"⏱️ Warm-up budget spent after {report['queries']} of {len(questions)} queries")
+                    return
+                # Touches the exact-match pages and embeds + searches every index, without
+                # LLM synthesis or conversation history
+                rag_system.find_exact_match(question, None, snapshot.exact_qa_pairs)
+                for retriever in retrievers.values():
+                    try:
+                        rag_system.backends["retrieval"].call(retriever.retrieve, question, deadline=deadline)
+                    except (DeadlineExceeded, BackendUnavailable) as e:
+                        report["errors"].append(f"query: {e}")
+                report["queries"] += 1
+
+    step("queries", run_queries)
+
+    report["completed"] = True
+    report["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(
+        f"🔥 Warm-up finished in {report['duration_ms']:.0f}ms: {report['queries']} queries, "
+        f"{len(report['errors'])} errors"
+    )
+    return report